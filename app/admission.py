@@ -0,0 +1,203 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from app.metrics import counter, gauge, histogram
+from app.repository.topology import DB_POOL_MAX_SIZE
+
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true') == 'true'
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', DB_POOL_MAX_SIZE))
+ADMISSION_EXPENSIVE_CONCURRENCY = int(
+    os.getenv('ADMISSION_EXPENSIVE_CONCURRENCY', max(1, ADMISSION_MAX_CONCURRENCY // 2))
+)
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 100))
+ADMISSION_INTERACTIVE_DEADLINE_MS = float(os.getenv('ADMISSION_INTERACTIVE_DEADLINE_MS', 1000))
+ADMISSION_DEADLINE_MS = float(os.getenv('ADMISSION_DEADLINE_MS', 2000))
+ADMISSION_EXPENSIVE_DEADLINE_MS = float(os.getenv('ADMISSION_EXPENSIVE_DEADLINE_MS', 5000))
+SERVICE_TIME_SMOOTHING = 0.1
+EXEMPT_PATHS = ("/auth", "/register", "/metrics", "/docs", "/redoc", "/openapi.json", "/recommendations/cache")
+BOOK_FILTERS = ("title", "title_prefix", "search")
+
+admission_queue_depth = gauge("admission_queue_depth", "Requests waiting for admission", ("priority",))
+admission_active = gauge("admission_active", "Admitted requests in progress", ("priority",))
+admission_shed = counter(
+    "admission_shed_total",
+    "Requests rejected with 503 by admission control",
+    ("priority", "reason")
+)
+admission_wait = histogram(
+    "admission_wait_seconds",
+    "Time admitted requests spent waiting in the admission queue",
+    ("priority",),
+    (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+
+@dataclass
+class Priority:
+    name: str
+    rank: int
+    max_concurrency: int
+    deadline_seconds: float
+
+
+INTERACTIVE = Priority("interactive", 0, ADMISSION_MAX_CONCURRENCY, ADMISSION_INTERACTIVE_DEADLINE_MS / 1000)
+STANDARD = Priority("standard", 1, ADMISSION_MAX_CONCURRENCY, ADMISSION_DEADLINE_MS / 1000)
+EXPENSIVE = Priority("expensive", 2, ADMISSION_EXPENSIVE_CONCURRENCY, ADMISSION_EXPENSIVE_DEADLINE_MS / 1000)
+PRIORITIES = (INTERACTIVE, STANDARD, EXPENSIVE)
+
+
+class AdmissionRejected(Exception):
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Request rejected, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def classify(method: str, path: str, query_string: bytes) -> Optional[Priority]:
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    if path.rstrip("/") == "/recommendations/me":
+        return INTERACTIVE
+    if path.rstrip("/").endswith("/bulk") or path.startswith("/recommendations"):
+        return EXPENSIVE
+    if path.startswith("/reviews"):
+        return INTERACTIVE
+    if path.startswith("/books") and method == "GET":
+        if path.rstrip("/") != "/books":
+            return INTERACTIVE
+        params = parse_qs(query_string.decode("latin-1"))
+        if is_stream(params) or not any(f in params for f in BOOK_FILTERS):
+            return EXPENSIVE
+    return STANDARD
+
+
+def has_bounded_duration(path: str, query_string: bytes) -> bool:
+    if path.rstrip("/").endswith("/bulk"):
+        return False
+    return not is_stream(parse_qs(query_string.decode("latin-1")))
+
+
+def is_stream(params: Dict[str, List[str]]) -> bool:
+    return params.get("stream", ["false"])[-1].lower() in ("true", "1")
+
+
+class AdmissionController:
+
+    def __init__(self, max_concurrency: int, queue_size: int, priorities: List[Priority] = PRIORITIES):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.priorities = sorted(priorities, key=lambda p: p.rank)
+        self._active = 0
+        self._active_by_priority: Dict[str, int] = {p.name: 0 for p in self.priorities}
+        self._queues: Dict[str, Deque[asyncio.Future]] = {p.name: deque() for p in self.priorities}
+        self._waiting: Dict[str, int] = {p.name: 0 for p in self.priorities}
+        self._service_seconds: Dict[str, float] = {p.name: 0.0 for p in self.priorities}
+
+    async def acquire(self, priority: Priority) -> None:
+        if self._can_run(priority) and self._waiting_ahead(priority) == 0:
+            self._start(priority)
+            admission_wait.observe(0, priority=priority.name)
+            return
+        if sum(self._waiting.values()) >= self.queue_size and not self._preempt(priority):
+            self._shed(priority, "queue_full")
+        expected_wait = self._expected_wait(priority)
+        timeout = priority.deadline_seconds - self._service_seconds[priority.name]
+        if expected_wait > timeout:
+            self._shed(priority, "deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority.name].append(future)
+        self._set_waiting(priority, 1)
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if not self._granted(future):
+                self._shed(priority, "timeout")
+        except BaseException:
+            if self._granted(future):
+                self.release(priority, 0)
+            raise
+        finally:
+            self._set_waiting(priority, -1)
+        admission_wait.observe(time.perf_counter() - started_at, priority=priority.name)
+
+    def release(self, priority: Priority, service_seconds: float) -> None:
+        self._active -= 1
+        self._active_by_priority[priority.name] -= 1
+        admission_active.dec(priority=priority.name)
+        if service_seconds > 0:
+            self._service_seconds[priority.name] = self._smooth(self._service_seconds[priority.name], service_seconds)
+        self._wake()
+
+    def retry_after(self, priority: Priority) -> int:
+        return max(1, math.ceil(self._expected_wait(priority)))
+
+    def _wake(self) -> None:
+        for priority in self.priorities:
+            queue = self._queues[priority.name]
+            while queue and self._can_run(priority):
+                future = queue.popleft()
+                if future.done():
+                    continue
+                self._start(priority)
+                future.set_result(None)
+
+    def _preempt(self, priority: Priority) -> bool:
+        for lower in reversed(self.priorities):
+            if lower.rank <= priority.rank:
+                break
+            queue = self._queues[lower.name]
+            while queue:
+                future = queue.pop()
+                if not future.done():
+                    admission_shed.inc(priority=lower.name, reason="preempted")
+                    future.set_exception(AdmissionRejected(self.retry_after(lower)))
+                    return True
+        return False
+
+    def _can_run(self, priority: Priority) -> bool:
+        return (
+            self._active < self.max_concurrency
+            and self._active_by_priority[priority.name] < priority.max_concurrency
+        )
+
+    def _start(self, priority: Priority) -> None:
+        self._active += 1
+        self._active_by_priority[priority.name] += 1
+        admission_active.inc(priority=priority.name)
+
+    def _waiting_ahead(self, priority: Priority) -> int:
+        return sum(self._waiting[p.name] for p in self.priorities if p.rank <= priority.rank)
+
+    def _expected_wait(self, priority: Priority) -> float:
+        capacity = min(self.max_concurrency, priority.max_concurrency)
+        queued_seconds = sum(
+            self._waiting[p.name] * self._service_seconds[p.name] for p in self.priorities if p.rank <= priority.rank
+        )
+        return (queued_seconds + self._service_seconds[priority.name]) / capacity
+
+    def _set_waiting(self, priority: Priority, delta: int) -> None:
+        self._waiting[priority.name] += delta
+        admission_queue_depth.inc(delta, priority=priority.name)
+
+    def _granted(self, future: asyncio.Future) -> bool:
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _shed(self, priority: Priority, reason: str) -> None:
+        admission_shed.inc(priority=priority.name, reason=reason)
+        raise AdmissionRejected(self.retry_after(priority))
+
+    def _smooth(self, average: float, value: float) -> float:
+        if average == 0:
+            return value
+        return average + SERVICE_TIME_SMOOTHING * (value - average)
+
+
+admission_controller = AdmissionController(ADMISSION_MAX_CONCURRENCY, ADMISSION_QUEUE_SIZE)
@@ -1,37 +1,141 @@
-from typing import Union
+from typing import AsyncIterator, Iterator, Union
 
-from fastapi import APIRouter
+import anyio
+import orjson
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
 
-from app.service.book import BookService, Book, BookFilter
+from app.api.bulk import read_bulk_chunks
+from app.api.conditional import (
+    cache_headers, content_response, is_conditional, is_not_modified, not_modified, version_etag
+)
+from app.api.dependencies import BookServiceDep, ReviewServiceDep
+from app.model.bulk import BookBulkResult
+from app.model.row import BookRow
+from app.service.book import Book, BookFilter, BookPage, DEFAULT_PAGE_SIZE
 
 router = APIRouter(
     prefix="/books",
     tags=["books"]
 )
 
-service = BookService()
-
 
 @router.post("/", status_code=201)
-def add_book(req: Book):
-    return {"book_id": service.add_book(req)}
+async def add_book(req: Book, service: BookServiceDep):
+    return {"book_id": await service.add_book(req)}
+
+
+@router.post("/bulk")
+async def add_books_bulk(request: Request, service: BookServiceDep) -> BookBulkResult:
+    result = BookBulkResult()
+    async for books, errors in read_bulk_chunks(request, Book):
+        result.errors.extend(errors)
+        if books:
+            result.merge(await service.add_books(books))
+    result.errors.sort(key=lambda error: error.index)
+    return result
 
 
-@router.get("/")
-def get_books(title: Union[str, None] = None):
-    return service.get_books(BookFilter(title=title))
+@router.get("/", response_class=ORJSONResponse)
+async def get_books(
+        request: Request,
+        service: BookServiceDep,
+        review_service: ReviewServiceDep,
+        title: Union[str, None] = None,
+        title_prefix: Union[str, None] = None,
+        search: Union[str, None] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        after: Union[str, None] = None,
+        stream: bool = False,
+        include_rating: bool = False
+):
+    book_filter = BookFilter(title=title, title_prefix=title_prefix, search=search)
+    if stream and include_rating:
+        raise HTTPException(status_code=400, detail="Rating summaries are not supported for streaming")
+    if include_rating:
+        page = await service.get_books(book_filter, limit, after)
+        books = await review_service.get_rated_books(page.books)
+        return with_next_cursor(content_response(request, orjson.dumps(books)), page)
+    if stream:
+        books = await service.stream_books(book_filter)
+        return ClosingStreamingResponse(to_ndjson(books), media_type="application/x-ndjson")
+    if is_conditional(request):
+        etag = version_etag(await service.get_books_version(book_filter, limit, after))
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+    version, page = await service.get_versioned_books(book_filter, limit, after)
+    return with_next_cursor(ORJSONResponse(page.books, headers=cache_headers(version_etag(version))), page)
 
 
-@router.get("/{book_id}")
-def get_book(book_id: str):
-    return service.get_book(book_id)
+@router.get("/{book_id}", response_class=ORJSONResponse)
+async def get_book(
+        book_id: str,
+        request: Request,
+        service: BookServiceDep,
+        review_service: ReviewServiceDep,
+        include_rating: bool = False
+):
+    if include_rating:
+        books = await review_service.get_rated_books([await service.get_book(book_id)])
+        return content_response(request, orjson.dumps(books[0]))
+    if is_conditional(request):
+        version = await service.get_book_version(book_id)
+        etag = version_etag(version.version)
+        if is_not_modified(request, etag, version.updated_at):
+            return not_modified(etag, version.updated_at)
+    book, version = await service.get_versioned_book(book_id)
+    return ORJSONResponse(book, headers=cache_headers(version_etag(version.version), version.updated_at))
 
 
 @router.patch("/{book_id}", status_code=204)
-def update_book(book_id: str, req: Book):
-    service.update_book(book_id, req)
+async def update_book(book_id: str, req: Book, service: BookServiceDep):
+    await service.update_book(book_id, req)
 
 
 @router.delete("/{book_id}", status_code=204)
-def delete_book(book_id: str):
-    service.delete_book(book_id)
+async def delete_book(book_id: str, service: BookServiceDep):
+    await service.delete_book(book_id)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def to_ndjson(books: Union[Iterator[BookRow], AsyncIterator[BookRow]]) -> AsyncIterator[bytes]:
+    if hasattr(books, "__aiter__"):
+        return _async_to_ndjson(books)
+    return _sync_to_ndjson(books)
+
+
+async def _sync_to_ndjson(books: Iterator[BookRow]) -> AsyncIterator[bytes]:
+    try:
+        async for book in iterate_in_threadpool(books):
+            yield orjson.dumps(book, option=orjson.OPT_APPEND_NEWLINE)
+    finally:
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(books.close)
+
+
+async def _async_to_ndjson(books: AsyncIterator[BookRow]) -> AsyncIterator[bytes]:
+    try:
+        async for book in books:
+            yield orjson.dumps(book, option=orjson.OPT_APPEND_NEWLINE)
+    finally:
+        with anyio.CancelScope(shield=True):
+            await books.aclose()
+
+
+def with_next_cursor(response: Response, page: BookPage) -> Response:
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return response
@@ -0,0 +1,59 @@
+import json
+from typing import AsyncIterator, List, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from starlette.requests import Request
+
+from app.model.bulk import BulkError
+
+BULK_CHUNK_SIZE = 1000
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+BulkChunk = Tuple[List[Tuple[int, BaseModel]], List[BulkError]]
+
+
+async def read_bulk_chunks(request: Request, model: Type[BaseModel]) -> AsyncIterator[BulkChunk]:
+    items: List[Tuple[int, BaseModel]] = []
+    errors: List[BulkError] = []
+    async for index, raw in _read_raw_items(request):
+        try:
+            items.append((index, model.model_validate(raw)))
+        except ValidationError as e:
+            errors.append(BulkError(index=index, status_code=422, detail=str(e)))
+        if len(items) + len(errors) >= BULK_CHUNK_SIZE:
+            yield items, errors
+            items, errors = [], []
+    if items or errors:
+        yield items, errors
+
+
+async def _read_raw_items(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_MEDIA_TYPES:
+        try:
+            body = await request.json()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail="Request body should be a JSON array") from e
+        for index, raw in enumerate(body if isinstance(body, list) else [body]):
+            yield index, raw
+        return
+
+    index = 0
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _parse_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, _parse_line(buffer)
+
+
+def _parse_line(line: bytes) -> object:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.decode(errors="replace")
@@ -0,0 +1,31 @@
+from typing import Annotated, Any
+
+from fastapi import Depends
+from starlette.requests import Request
+
+from app.model.user import User
+from app.service.auth import oauth2_scheme
+
+
+async def get_book_service(request: Request) -> Any:
+    return request.app.state.container.book_service
+
+
+async def get_review_service(request: Request) -> Any:
+    return request.app.state.container.review_service
+
+
+async def get_auth_service(request: Request) -> Any:
+    return request.app.state.container.auth_service
+
+
+BookServiceDep = Annotated[Any, Depends(get_book_service)]
+ReviewServiceDep = Annotated[Any, Depends(get_review_service)]
+AuthServiceDep = Annotated[Any, Depends(get_auth_service)]
+
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], auth_service: AuthServiceDep) -> User:
+    return await auth_service.get_user_by_token(token)
+
+
+CurrentUser = Annotated[User, Depends(get_current_user)]
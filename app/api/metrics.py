@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from starlette.responses import PlainTextResponse
+
+from app.metrics import registry
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return registry.render()
@@ -1,14 +1,32 @@
+import orjson
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
 
-from app.service.review import ReviewService
+from app.api.conditional import content_response
+from app.api.dependencies import CurrentUser, ReviewServiceDep
+from app.service.review import TOP_RATED_BOOKS_NUM
 
 router = APIRouter(
     tags=["recommendations"]
 )
 
-service = ReviewService()
 
+@router.get("/recommendations", response_class=ORJSONResponse)
+async def read_reviews(request: Request, service: ReviewServiceDep, limit: int = TOP_RATED_BOOKS_NUM):
+    return content_response(request, orjson.dumps(await service.get_recommendations(limit)))
 
-@router.get("/recommendations")
-def read_reviews():
-    return service.get_recommendations()
+
+@router.get("/recommendations/me", response_class=ORJSONResponse)
+async def read_personal_recommendations(
+        request: Request,
+        user: CurrentUser,
+        service: ReviewServiceDep,
+        limit: int = TOP_RATED_BOOKS_NUM
+):
+    return content_response(request, orjson.dumps(await service.get_personal_recommendations(user.id, limit)))
+
+
+@router.get("/recommendations/cache")
+async def read_cache_stats(service: ReviewServiceDep):
+    return await service.get_recommendation_cache_stats()
@@ -1,60 +1,75 @@
-from typing import Annotated
-
-from fastapi import APIRouter, Depends
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from starlette.requests import Request
 from starlette.responses import Response
 
-from app.model.user import User
-from app.service.auth import AuthService
-from app.service.review import ReviewService, Review
+from app.api.bulk import read_bulk_chunks
+from app.api.dependencies import CurrentUser, ReviewServiceDep
+from app.model.bulk import BulkResult
+from app.service.review import Review
 
 router = APIRouter(
     prefix="/reviews",
     tags=["reviews"]
 )
 
-service = ReviewService()
-auth_service = AuthService()
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
 
 @router.post("/", status_code=201)
-def create_review(
-        user: Annotated[User, Depends(auth_service.get_user_by_token)],
+async def create_review(
+        user: CurrentUser,
+        service: ReviewServiceDep,
         req: Review
 ):
-    service.add_review(user.id, req)
+    await service.add_review(user.id, req)
     return Response(status_code=201)
 
 
-@router.get("/{book_id}")
-def get_review(
-        user: Annotated[User, Depends(auth_service.get_user_by_token)],
+@router.post("/bulk")
+async def create_reviews_bulk(
+        user: CurrentUser,
+        service: ReviewServiceDep,
+        request: Request
+) -> BulkResult:
+    result = BulkResult()
+    async for reviews, errors in read_bulk_chunks(request, Review):
+        result.errors.extend(errors)
+        if reviews:
+            result.merge(await service.add_reviews(user.id, reviews))
+    result.errors.sort(key=lambda error: error.index)
+    return result
+
+
+@router.get("/{book_id}", response_class=ORJSONResponse)
+async def get_review(
+        user: CurrentUser,
+        service: ReviewServiceDep,
         book_id: str
 ):
-    return service.get_review(user.id, book_id)
+    return ORJSONResponse(await service.get_review(user.id, book_id))
 
 
-@router.get("/")
-def get_all_reviews(
-        user: Annotated[User, Depends(auth_service.get_user_by_token)]
+@router.get("/", response_class=ORJSONResponse)
+async def get_all_reviews(
+        user: CurrentUser,
+        service: ReviewServiceDep
 ):
-    return service.get_all_reviews(user.id)
+    return ORJSONResponse(await service.get_all_reviews(user.id))
 
 
 @router.patch("/{book_id}", status_code=204)
-def update_review(
-        user: Annotated[User, Depends(auth_service.get_user_by_token)],
+async def update_review(
+        user: CurrentUser,
+        service: ReviewServiceDep,
         book_id: str,
         req: Review
 ):
-    service.update_review(user.id, book_id, req)
+    await service.update_review(user.id, book_id, req)
 
 
 @router.delete("/{book_id}", status_code=204)
-def delete_review(
-        user: Annotated[User, Depends(auth_service.get_user_by_token)],
+async def delete_review(
+        user: CurrentUser,
+        service: ReviewServiceDep,
         book_id: str
 ):
-    service.delete_review(user.id, book_id)
+    await service.delete_review(user.id, book_id)
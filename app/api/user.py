@@ -3,9 +3,8 @@ from typing import Annotated
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.service.auth import AuthService, create_auth_token, Token
-
-auth_service = AuthService()
+from app.api.dependencies import AuthServiceDep
+from app.service.auth import create_auth_token, Token
 
 router = APIRouter(
     tags=["users"]
@@ -13,12 +12,12 @@ router = APIRouter(
 
 
 @router.post("/auth")
-async def auth(creds: Annotated[OAuth2PasswordRequestForm, Depends()]) -> Token:
-    user = auth_service.authenticate(creds.username, creds.password)
+async def auth(creds: Annotated[OAuth2PasswordRequestForm, Depends()], auth_service: AuthServiceDep) -> Token:
+    user = await auth_service.authenticate(creds.username, creds.password)
     return create_auth_token(user)
 
 
 @router.post("/register", status_code=201)
-def register(creds: Annotated[OAuth2PasswordRequestForm, Depends()]):
-    user_id = auth_service.register_user(creds.username, creds.password)
+async def register(creds: Annotated[OAuth2PasswordRequestForm, Depends()], auth_service: AuthServiceDep):
+    user_id = await auth_service.register_user(creds.username, creds.password)
     return {"user_id": user_id}
@@ -0,0 +1,44 @@
+from starlette.concurrency import run_in_threadpool
+
+from app.repository.async_db import async_pools
+from app.repository.db import sync_pools
+from app.repository.topology import CACHE_INVALIDATION
+from app.service.hashing import password_hasher
+from app.service.invalidation import invalidation_listener
+from app.service.periodic import PeriodicTask
+from app.service.provider import create_auth_service, create_book_service, create_review_service, is_async_mode
+from app.service.review import SIMILARITY_REFRESH_SECONDS
+
+
+class Container:
+
+    def __init__(self):
+        self.book_service = create_book_service()
+        self.review_service = create_review_service()
+        self.auth_service = create_auth_service()
+        self.similarity_refresh = PeriodicTask(
+            "similarity_index", SIMILARITY_REFRESH_SECONDS, self.review_service.refresh_similarity_index
+        )
+
+    async def start(self, prefill: bool) -> None:
+        if prefill:
+            await self.open_pools(prefill)
+        if CACHE_INVALIDATION:
+            invalidation_listener.start()
+        if SIMILARITY_REFRESH_SECONDS > 0:
+            self.similarity_refresh.start()
+
+    async def open_pools(self, prefill: bool) -> None:
+        if is_async_mode():
+            await async_pools.open(prefill)
+        else:
+            await run_in_threadpool(sync_pools.open, prefill)
+
+    async def stop(self) -> None:
+        await self.similarity_refresh.stop()
+        invalidation_listener.stop()
+        password_hasher.shutdown()
+        if is_async_mode():
+            await async_pools.close()
+        else:
+            await run_in_threadpool(sync_pools.close)
@@ -1,10 +1,37 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.api import book, user, reviews, recommendation
+from app.admission import ADMISSION_CONTROL, admission_controller
+from app.api import book, user, reviews, recommendation, metrics
+from app.container import Container
+from app.middleware import AdmissionControlMiddleware, ReadYourWritesMiddleware, ServerTimingMiddleware
+from app.repository.instrumentation import DB_INSTRUMENTATION
+from app.repository.topology import DB_POOL_PREFILL, has_replica
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = Container()
+    await container.start(DB_POOL_PREFILL)
+    app.state.container = container
+    try:
+        yield
+    finally:
+        await container.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+if DB_INSTRUMENTATION:
+    app.add_middleware(ServerTimingMiddleware)
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+if has_replica():
+    app.add_middleware(ReadYourWritesMiddleware)
 
 app.include_router(book.router)
 app.include_router(user.router)
 app.include_router(reviews.router)
 app.include_router(recommendation.router)
+app.include_router(metrics.router)
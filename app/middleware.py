@@ -0,0 +1,98 @@
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.admission import AdmissionController, AdmissionRejected, classify, has_bounded_duration
+from app.repository.instrumentation import RequestStats, request_stats
+from app.repository.topology import (
+    READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_SECONDS, build_write_cookie, start_write_tracking, stop_write_tracking
+)
+
+
+class ServerTimingMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started_at))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            stats.observe()
+
+
+class AdmissionControlMiddleware:
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        priority = classify(scope["method"], scope["path"], scope["query_string"]) if scope["type"] == "http" else None
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(priority)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bounded = has_bounded_duration(scope["path"], scope["query_string"])
+            self.controller.release(priority, time.perf_counter() - started_at if bounded else 0)
+
+
+class ReadYourWritesMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cookies = cookie_parser(Headers(scope=scope).get("cookie", ""))
+        marker, token = start_write_tracking(cookies.get(READ_YOUR_WRITES_COOKIE))
+
+        async def send_with_marker(message: Message) -> None:
+            if message["type"] == "http.response.start" and marker.written:
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{READ_YOUR_WRITES_COOKIE}={build_write_cookie(marker)}; "
+                    f"Max-Age={max(1, int(READ_YOUR_WRITES_SECONDS))}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            stop_write_tracking(token)
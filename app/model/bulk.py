@@ -0,0 +1,27 @@
+from typing import Dict, List
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class BulkError(BaseModel):
+    index: int
+    status_code: int
+    detail: str
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    errors: List[BulkError] = []
+
+    def merge(self, other: "BulkResult") -> None:
+        self.created += other.created
+        self.errors.extend(other.errors)
+
+
+class BookBulkResult(BulkResult):
+    book_ids: Dict[int, UUID] = {}
+
+    def merge(self, other: "BookBulkResult") -> None:
+        super().merge(other)
+        self.book_ids.update(other.book_ids)
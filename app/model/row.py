@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+from uuid import UUID
+
+from psycopg.rows import args_row
+
+
+@dataclass
+class BookRow:
+    __slots__ = ("id", "title", "description")
+    id: UUID
+    title: str
+    description: Optional[str]
+
+
+@dataclass
+class ReviewRow:
+    __slots__ = ("book_id", "user_id", "rating", "review")
+    book_id: UUID
+    user_id: UUID
+    rating: int
+    review: Optional[str]
+
+
+@dataclass
+class BookVersion:
+    __slots__ = ("version", "updated_at")
+    version: int
+    updated_at: datetime
+
+
+@dataclass
+class RatingSummary:
+    __slots__ = ("review_num", "mean", "median", "weighted_rating")
+    review_num: int
+    mean: Optional[float]
+    median: Optional[float]
+    weighted_rating: Optional[float]
+
+
+@dataclass
+class RatedBookRow:
+    __slots__ = ("id", "title", "description", "rating")
+    id: UUID
+    title: str
+    description: Optional[str]
+    rating: RatingSummary
+
+
+NO_RATING = RatingSummary(0, None, None, None)
+BOOK_ROW_COLUMNS = BookRow.__slots__
+BOOK_VERSION_COLUMNS = BookVersion.__slots__
+VERSIONED_BOOK_ROW_COLUMNS = BOOK_ROW_COLUMNS + BOOK_VERSION_COLUMNS
+REVIEW_ROW_COLUMNS = ReviewRow.__slots__
+
+book_row = args_row(BookRow)
+review_row = args_row(ReviewRow)
+book_version = args_row(BookVersion)
+
+
+def versioned_book_row(cursor: Any) -> Callable[[Sequence[Any]], Tuple[BookRow, BookVersion]]:
+    book_size = len(BOOK_ROW_COLUMNS)
+
+    def make_row(values: Sequence[Any]) -> Tuple[BookRow, BookVersion]:
+        return BookRow(*values[:book_size]), BookVersion(*values[book_size:])
+    return make_row
+
+
+def ranked_book_row(cursor: Any) -> Callable[[Sequence[Any]], Tuple[BookRow, float]]:
+    book_size = len(BOOK_ROW_COLUMNS)
+
+    def make_row(values: Sequence[Any]) -> Tuple[BookRow, float]:
+        return BookRow(*values[:book_size]), values[book_size]
+    return make_row
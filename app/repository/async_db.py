@@ -0,0 +1,259 @@
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import DictRow, RowFactory
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app.repository.db import OPEN_TRANSACTION_STATUSES, Fetch, PipelineResult, Statement, check_deferred
+from app.repository.instrumentation import DB_INSTRUMENTATION, connection_kwargs, record_pool_wait, register_pool
+from app.repository.topology import (
+    DB_CONNINFO, DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE, DB_POOL_TIMEOUT, DB_REPLICA_CONNINFO,
+    primary_reads_required, reads_from_replica
+)
+
+
+def create_async_pool(conninfo: str) -> AsyncConnectionPool:
+    return AsyncConnectionPool(
+        conninfo=conninfo,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        kwargs=connection_kwargs({"row_factory": dict_row, "autocommit": True}, is_async=True),
+        open=False
+    )
+
+
+class AsyncPools:
+
+    def __init__(self):
+        self._pools: Dict[str, AsyncConnectionPool] = {}
+
+    async def get(self, read_only: bool) -> Tuple[AsyncConnectionPool, str]:
+        name = "async_read" if DB_REPLICA_CONNINFO and reads_from_replica(read_only) else "async"
+        pool = self._pools.get(name)
+        if pool is None or pool.closed:
+            pool = await self._open(name)
+        return pool, name
+
+    async def open(self, prefill: bool) -> None:
+        for name in self.names():
+            pool = await self._open(name)
+            if prefill:
+                await pool.wait(DB_POOL_TIMEOUT)
+
+    async def close(self) -> None:
+        pools = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            await pool.close()
+
+    def names(self) -> List[str]:
+        return ["async", "async_read"] if DB_REPLICA_CONNINFO else ["async"]
+
+    async def _open(self, name: str) -> AsyncConnectionPool:
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = self._pools[name] = create_async_pool(
+                DB_REPLICA_CONNINFO if name == "async_read" else DB_CONNINFO
+            )
+            register_pool(name, pool)
+        await pool.open()
+        return pool
+
+
+async_pools = AsyncPools()
+
+_transaction_connection: ContextVar[Optional[psycopg.AsyncConnection]] = ContextVar(
+    "async_transaction_connection",
+    default=None
+)
+_deferring_pipeline: ContextVar[Optional["AsyncPipeline"]] = ContextVar("async_deferring_pipeline", default=None)
+
+
+class AsyncPipeline:
+
+    def __init__(self, conn: psycopg.AsyncConnection):
+        self.conn = conn
+        self._pending: List[Tuple[psycopg.AsyncCursor, Fetch, PipelineResult]] = []
+
+    async def defer(self, call: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> PipelineResult:
+        token = _deferring_pipeline.set(self)
+        try:
+            return check_deferred(call, await call(*args, **kwargs))
+        finally:
+            _deferring_pipeline.reset(token)
+
+    async def enqueue(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict],
+            row_factory: RowFactory,
+            prepare: Optional[bool],
+            fetch: Fetch
+    ) -> PipelineResult:
+        cursor = self.conn.cursor(row_factory=row_factory)
+        await cursor.execute(query, params, prepare=prepare)
+        result = PipelineResult()
+        self._pending.append((cursor, fetch, result))
+        return result
+
+    async def fetch_results(self) -> None:
+        pending, self._pending = self._pending, []
+        for cursor, fetch, result in pending:
+            async with cursor:
+                result.value = None if fetch is None else await fetch(cursor)
+            result.ready = True
+
+
+@asynccontextmanager
+async def async_pipelined_transaction(conn: psycopg.AsyncConnection) -> AsyncIterator[None]:
+    try:
+        async with conn.pipeline():
+            await conn.execute("BEGIN")
+            yield
+            await conn.execute("COMMIT")
+    except BaseException:
+        if conn.info.transaction_status in OPEN_TRANSACTION_STATUSES:
+            await conn.execute("ROLLBACK")
+        raise
+
+
+class AsyncRepositoryMixin:
+
+    @asynccontextmanager
+    async def transaction(
+            self,
+            read_only: bool = False,
+            pipelined: bool = False
+    ) -> AsyncIterator[psycopg.AsyncConnection[DictRow]]:
+        conn = _transaction_connection.get()
+        if conn is not None:
+            yield conn
+            return
+        async with self._get_connection(read_only, transactional=True, pipelined=pipelined) as conn:
+            token = _transaction_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _transaction_connection.reset(token)
+
+    @asynccontextmanager
+    async def pipeline(self, read_only: bool = False) -> AsyncIterator[AsyncPipeline]:
+        async with self._get_connection(read_only) as conn:
+            token = _transaction_connection.set(conn)
+            try:
+                pipeline = AsyncPipeline(conn)
+                async with conn.pipeline():
+                    yield pipeline
+                await pipeline.fetch_results()
+            finally:
+                _transaction_connection.reset(token)
+
+    def requires_caller_connection(self) -> bool:
+        return _transaction_connection.get() is not None or primary_reads_required()
+
+    @asynccontextmanager
+    async def _get_connection(
+            self,
+            read_only: bool = False,
+            transactional: bool = False,
+            pipelined: bool = False
+    ) -> AsyncIterator[psycopg.AsyncConnection[DictRow]]:
+        transaction_conn = _transaction_connection.get()
+        if transaction_conn is not None:
+            yield transaction_conn
+            return
+        pool, pool_name = await async_pools.get(read_only)
+        started_at = time.perf_counter()
+        async with pool.connection() as conn:
+            if DB_INSTRUMENTATION:
+                record_pool_wait(pool_name, started_at)
+            async with AsyncExitStack() as stack:
+                if pipelined:
+                    await stack.enter_async_context(async_pipelined_transaction(conn))
+                elif transactional:
+                    await stack.enter_async_context(conn.transaction())
+                yield conn
+
+    async def execute_query(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            row_factory: RowFactory = dict_row,
+            prepare: Optional[bool] = None,
+            read_only: bool = False
+    ) -> List[Any]:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return await pipeline.enqueue(query, params, row_factory, prepare, psycopg.AsyncCursor.fetchall)
+        async with self._get_connection(read_only) as conn:
+            async with conn.cursor(row_factory=row_factory) as cursor:
+                await cursor.execute(query, params, prepare=prepare)
+                return await cursor.fetchall()
+
+    async def execute_query_one(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            row_factory: RowFactory = dict_row,
+            prepare: Optional[bool] = None,
+            read_only: bool = False
+    ) -> Optional[Any]:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return await pipeline.enqueue(query, params, row_factory, prepare, psycopg.AsyncCursor.fetchone)
+        async with self._get_connection(read_only) as conn:
+            async with conn.cursor(row_factory=row_factory) as cursor:
+                await cursor.execute(query, params, prepare=prepare)
+                return await cursor.fetchone()
+
+    async def stream_query(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            chunk_size: int = 1000,
+            row_factory: RowFactory = dict_row,
+            read_only: bool = False
+    ) -> AsyncIterator[Any]:
+        async with self._get_connection(read_only, transactional=True) as conn:
+            async with conn.cursor(name=f"{self.table_name}_stream", row_factory=row_factory) as cursor:
+                cursor.itersize = chunk_size
+                await cursor.execute(query, params)
+                async for row in cursor:
+                    yield row
+
+    async def execute_command(
+            self,
+            command: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            prepare: Optional[bool] = None
+    ) -> None:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return await pipeline.enqueue(command, params, dict_row, prepare, None)
+        async with self._get_connection() as conn:
+            await conn.execute(command, params, prepare=prepare)
+
+    async def execute_commands(self, commands: Sequence[Statement]) -> None:
+        async with self._get_connection(transactional=True) as conn:
+            for command, params in commands:
+                await conn.execute(command, params)
+
+    async def copy_rows(
+            self,
+            columns: Sequence[str],
+            rows: Iterable[Sequence[Any]],
+            after: Sequence[Statement] = ()
+    ) -> None:
+        async with self._get_connection(transactional=True) as conn:
+            async with conn.cursor() as cursor:
+                async with cursor.copy(self.build_copy_command(columns)) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+                for command, params in after:
+                    await cursor.execute(command, params)
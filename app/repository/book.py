@@ -1,9 +1,20 @@
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from psycopg import sql
-from psycopg.rows import DictRow
+from psycopg.rows import DictRow, RowFactory, dict_row
 
-from app.repository.db import BaseRepository
+from app.repository.async_db import AsyncRepositoryMixin
+from app.repository.db import BaseRepository, as_key, memoized
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def keyset_params(after: Optional[Tuple[Any, str]]) -> Dict[str, Any]:
+    if after is None:
+        return {"after_key": None, "after": None}
+    return {"after_key": after[0], "after": after[1]}
 
 
 class BookRepository(BaseRepository):
@@ -11,11 +22,132 @@ class BookRepository(BaseRepository):
     def __init__(self):
         super().__init__('catalog', 'book')
 
-    def find_by_title(self, title: str) -> List[DictRow]:
-        query = sql.SQL("SELECT * FROM catalog.book WHERE title = %(title)s").format()
-        return self.execute_query(query, {"title": title})
+    def find_by_title(
+            self,
+            title: str,
+            limit: int,
+            after: Optional[str] = None,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_by_title_query(as_key(columns), after is not None)
+        params = {"title": title, "limit": limit, "after": after}
+        return self.execute_query(query, params, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_title_query(self, columns: Optional[Tuple[str, ...]], has_after: bool) -> sql.Composed:
+        return sql.SQL(
+            "SELECT {} FROM catalog.book "
+            "WHERE title = %(title)s AND {} "
+            "ORDER BY id LIMIT %(limit)s"
+        ).format(self.build_columns(columns), self.build_after_condition(has_after))
+
+    def stream_by_title(
+            self,
+            title: str,
+            chunk_size: int,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> Iterator[Any]:
+        query = self.build_stream_by_title_query(as_key(columns))
+        return self.stream_query(query, {"title": title}, chunk_size, row_factory, read_only=True)
+
+    @memoized
+    def build_stream_by_title_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM catalog.book WHERE title = %(title)s ORDER BY id").format(
+            self.build_columns(columns)
+        )
+
+    def find_by_title_prefix(
+            self,
+            prefix: str,
+            limit: int,
+            after: Optional[Tuple[str, str]] = None,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_by_title_prefix_query(as_key(columns), after is not None)
+        params = {"pattern": escape_like(prefix) + "%", "limit": limit, **keyset_params(after)}
+        return self.execute_query(query, params, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_title_prefix_query(self, columns: Optional[Tuple[str, ...]], has_after: bool) -> sql.Composed:
+        after_condition = sql.SQL(
+            '(lower(title) COLLATE "C", id) > (lower(%(after_key)s) COLLATE "C", %(after)s::uuid)'
+        ) if has_after else sql.SQL("TRUE")
+        return sql.SQL(
+            "SELECT {} FROM catalog.book "
+            'WHERE lower(title) COLLATE "C" LIKE lower(%(pattern)s) AND {} '
+            'ORDER BY lower(title) COLLATE "C", id LIMIT %(limit)s'
+        ).format(self.build_columns(columns), after_condition)
+
+    def search(
+            self,
+            text: str,
+            limit: int,
+            after: Optional[Tuple[float, str]] = None,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_search_query(as_key(columns), after is not None)
+        params = {"text": text, "limit": limit, **keyset_params(after)}
+        return self.execute_query(query, params, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_search_query(self, columns: Optional[Tuple[str, ...]], has_after: bool) -> sql.Composed:
+        after_condition = sql.SQL(
+            "(-m.rank, m.id) > (-%(after_key)s::real, %(after)s::uuid)"
+        ) if has_after else sql.SQL("TRUE")
+        return sql.SQL(
+            "WITH matches AS ("
+            " SELECT b.id, ts_rank_cd(b.search_vector, q.query) AS rank"
+            " FROM catalog.book b, websearch_to_tsquery('simple', %(text)s) AS q(query)"
+            " WHERE b.search_vector @@ q.query"
+            ") "
+            "SELECT {}, m.rank FROM matches m JOIN catalog.book b ON b.id = m.id "
+            "WHERE {} "
+            "ORDER BY m.rank DESC, m.id LIMIT %(limit)s"
+        ).format(self.build_qualified_columns("b", columns), after_condition)
+
+    def build_qualified_columns(self, alias: str, columns: Optional[Sequence[str]]):
+        if columns is None:
+            return sql.SQL("{}.*").format(sql.Identifier(alias))
+        return sql.SQL(', ').join(sql.Identifier(alias, column) for column in columns)
+
+    def find_catalog_version(self) -> DictRow:
+        return self.execute_query_one(self.build_find_catalog_version_query(), prepare=True, read_only=True)
+
+    @memoized
+    def build_find_catalog_version_query(self) -> sql.Composed:
+        return sql.SQL("SELECT version FROM catalog.book_catalog_version").format()
+
+    def update(self, entity_id: str, data: Dict) -> Optional[DictRow]:
+        params = {"id": entity_id, **data}
+        return self.execute_query_one(self.build_update_query(tuple(data)), params, prepare=True)
+
+    @memoized
+    def build_update_query(self, columns: Tuple[str, ...]) -> sql.Composed:
+        assignments = [self.build_update_params(columns)] if columns else []
+        assignments.append(sql.SQL("version = version + 1, updated_at = now()"))
+        return sql.SQL("UPDATE catalog.book SET {} WHERE id = %(id)s RETURNING id").format(
+            sql.SQL(', ').join(assignments)
+        )
+
+    def find_all_by_id(
+            self,
+            ids: List[str],
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_all_by_id_query(as_key(columns))
+        return self.execute_query(query, {"ids": ids}, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_all_by_id_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM catalog.book WHERE id = ANY(%(ids)s::uuid[])").format(
+            self.build_columns(columns)
+        )
+
 
-    def find_all_by_id(self, ids: List[str]) -> List[DictRow]:
-        placeholders = sql.SQL(',').join([sql.Placeholder() for _ in ids])
-        query = sql.SQL("SELECT * FROM catalog.book WHERE id IN ({})").format(placeholders)
-        return self.execute_query(query, ids)
\ No newline at end of file
+class AsyncBookRepository(AsyncRepositoryMixin, BookRepository):
+    pass
@@ -1,108 +1,427 @@
-import os
-from contextlib import contextmanager
-from typing import Dict, List, Optional, Union
+import functools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import psycopg
-from psycopg import sql
-from psycopg.rows import DictRow
+from psycopg import pq, sql
+from psycopg.rows import DictRow, RowFactory
 from psycopg.rows import dict_row
 from psycopg_pool import ConnectionPool
 
-db_pool = ConnectionPool(
-    conninfo=(
-        f"host={os.getenv('DB_HOST')} "
-        f"port={os.getenv('DB_PORT')} "
-        f"dbname={os.getenv('DB_NAME')} "
-        f"user={os.getenv('DB_USER')} "
-        f"password={os.getenv('DB_PASSWORD')} "
-    ),
-    min_size=1,
-    max_size=10,
-    timeout=5,
-    kwargs={"row_factory": dict_row}
+from app.repository.instrumentation import DB_INSTRUMENTATION, connection_kwargs, record_pool_wait, register_pool
+from app.repository.topology import (
+    DB_CONNINFO, DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE, DB_POOL_TIMEOUT, DB_REPLICA_CONNINFO,
+    primary_reads, primary_reads_required, reads_from_replica, read_your_writes, record_write
 )
 
+Statement = Tuple[Union[str, sql.Composed], Optional[Dict]]
+
+
+def create_pool(conninfo: str) -> ConnectionPool:
+    return ConnectionPool(
+        conninfo=conninfo,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        kwargs=connection_kwargs({"row_factory": dict_row, "autocommit": True}),
+        open=True
+    )
+
+
+class SyncPools:
+
+    def __init__(self):
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, read_only: bool) -> Tuple[ConnectionPool, str]:
+        name = "sync_read" if DB_REPLICA_CONNINFO and reads_from_replica(read_only) else "sync"
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = self._open(name)
+        return pool, name
+
+    def open(self, prefill: bool) -> None:
+        for name in self.names():
+            pool = self._open(name)
+            if prefill:
+                pool.wait(DB_POOL_TIMEOUT)
+
+    def close(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def names(self) -> List[str]:
+        return ["sync", "sync_read"] if DB_REPLICA_CONNINFO else ["sync"]
+
+    def _open(self, name: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = create_pool(DB_REPLICA_CONNINFO if name == "sync_read" else DB_CONNINFO)
+                register_pool(name, pool)
+        return pool
+
+
+sync_pools = SyncPools()
+
+_transaction_connection: ContextVar[Optional[psycopg.Connection]] = ContextVar(
+    "transaction_connection",
+    default=None
+)
+_deferring_pipeline: ContextVar[Optional["Pipeline"]] = ContextVar("deferring_pipeline", default=None)
+
+Fetch = Optional[Callable[[Any], Any]]
+OPEN_TRANSACTION_STATUSES = (pq.TransactionStatus.INTRANS, pq.TransactionStatus.INERROR)
+
+
+class PipelineResult:
+    __slots__ = ("value", "ready")
+
+    def __init__(self):
+        self.value = None
+        self.ready = False
+
+    def result(self) -> Any:
+        if not self.ready:
+            raise RuntimeError("Pipeline result is read before the pipeline is synced")
+        return self.value
+
+
+def check_deferred(call: Callable[..., Any], result: Any) -> PipelineResult:
+    if not isinstance(result, PipelineResult):
+        raise TypeError(f"{call.__qualname__} does not return a statement result and cannot be deferred")
+    return result
+
+
+class Pipeline:
+
+    def __init__(self, conn: psycopg.Connection):
+        self.conn = conn
+        self._pending: List[Tuple[psycopg.Cursor, Fetch, PipelineResult]] = []
+
+    def defer(self, call: Callable[..., Any], *args: Any, **kwargs: Any) -> PipelineResult:
+        token = _deferring_pipeline.set(self)
+        try:
+            return check_deferred(call, call(*args, **kwargs))
+        finally:
+            _deferring_pipeline.reset(token)
+
+    def enqueue(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict],
+            row_factory: RowFactory,
+            prepare: Optional[bool],
+            fetch: Fetch
+    ) -> PipelineResult:
+        cursor = self.conn.cursor(row_factory=row_factory)
+        cursor.execute(query, params, prepare=prepare)
+        result = PipelineResult()
+        self._pending.append((cursor, fetch, result))
+        return result
+
+    def fetch_results(self) -> None:
+        pending, self._pending = self._pending, []
+        for cursor, fetch, result in pending:
+            with cursor:
+                result.value = None if fetch is None else fetch(cursor)
+            result.ready = True
+
+
+@contextmanager
+def pipelined_transaction(conn: psycopg.Connection) -> Iterator[None]:
+    try:
+        with conn.pipeline():
+            conn.execute("BEGIN")
+            yield
+            conn.execute("COMMIT")
+    except BaseException:
+        if conn.info.transaction_status in OPEN_TRANSACTION_STATUSES:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def memoized(build: Callable[..., sql.Composable]) -> Callable[..., str]:
+    @functools.wraps(build)
+    def statement(self: "BaseRepository", *args: Hashable) -> str:
+        key = (build.__name__, *args)
+        query = self._statements.get(key)
+        if query is None:
+            query = self._statements[key] = build(self, *args).as_string(None)
+        return query
+    return statement
+
+
+def as_key(columns: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    return None if columns is None else tuple(columns)
+
 
 class BaseRepository:
 
     def __init__(self, schema_name: str, table_name: str):
         self.schema_name = schema_name
         self.table_name = table_name
+        self._statements: Dict[Hashable, str] = {}
 
     @contextmanager
-    def _get_connection(self) -> psycopg.Connection[DictRow]:
-        conn = None
-        try:
-            with db_pool.connection() as conn:
+    def transaction(self, read_only: bool = False, pipelined: bool = False) -> Iterator[psycopg.Connection[DictRow]]:
+        conn = _transaction_connection.get()
+        if conn is not None:
+            yield conn
+            return
+        with self._get_connection(read_only, transactional=True, pipelined=pipelined) as conn:
+            token = _transaction_connection.set(conn)
+            try:
+                yield conn
+            finally:
+                _transaction_connection.reset(token)
+
+    @contextmanager
+    def pipeline(self, read_only: bool = False) -> Iterator[Pipeline]:
+        with self._get_connection(read_only) as conn:
+            token = _transaction_connection.set(conn)
+            try:
+                pipeline = Pipeline(conn)
+                with conn.pipeline():
+                    yield pipeline
+                pipeline.fetch_results()
+            finally:
+                _transaction_connection.reset(token)
+
+    def primary_reads(self):
+        return primary_reads()
+
+    def read_your_writes(self):
+        return read_your_writes()
+
+    def record_write(self) -> None:
+        record_write()
+
+    def requires_caller_connection(self) -> bool:
+        return _transaction_connection.get() is not None or primary_reads_required()
+
+    @contextmanager
+    def _get_connection(
+            self,
+            read_only: bool = False,
+            transactional: bool = False,
+            pipelined: bool = False
+    ) -> Iterator[psycopg.Connection[DictRow]]:
+        transaction_conn = _transaction_connection.get()
+        if transaction_conn is not None:
+            yield transaction_conn
+            return
+        pool, pool_name = sync_pools.get(read_only)
+        started_at = time.perf_counter()
+        with pool.connection() as conn:
+            if DB_INSTRUMENTATION:
+                record_pool_wait(pool_name, started_at)
+            with ExitStack() as stack:
+                if pipelined:
+                    stack.enter_context(pipelined_transaction(conn))
+                elif transactional:
+                    stack.enter_context(conn.transaction())
                 yield conn
-                conn.commit()
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise e
 
     def execute_query(
             self,
             query: Union[str, sql.Composed],
-            params: Optional[Dict] = None
-    ) -> List[DictRow]:
-        with self._get_connection() as conn:
-            conn.row_factory = dict_row
-            return conn.execute(query, params).fetchall()
+            params: Optional[Dict] = None,
+            row_factory: RowFactory = dict_row,
+            prepare: Optional[bool] = None,
+            read_only: bool = False
+    ) -> List[Any]:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return pipeline.enqueue(query, params, row_factory, prepare, psycopg.Cursor.fetchall)
+        with self._get_connection(read_only) as conn:
+            with conn.cursor(row_factory=row_factory) as cursor:
+                return cursor.execute(query, params, prepare=prepare).fetchall()
+
+    def execute_query_one(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            row_factory: RowFactory = dict_row,
+            prepare: Optional[bool] = None,
+            read_only: bool = False
+    ) -> Optional[Any]:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return pipeline.enqueue(query, params, row_factory, prepare, psycopg.Cursor.fetchone)
+        with self._get_connection(read_only) as conn:
+            with conn.cursor(row_factory=row_factory) as cursor:
+                return cursor.execute(query, params, prepare=prepare).fetchone()
+
+    def stream_query(
+            self,
+            query: Union[str, sql.Composed],
+            params: Optional[Dict] = None,
+            chunk_size: int = 1000,
+            row_factory: RowFactory = dict_row,
+            read_only: bool = False
+    ) -> Iterator[Any]:
+        with self._get_connection(read_only, transactional=True) as conn:
+            with conn.cursor(name=f"{self.table_name}_stream", row_factory=row_factory) as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(query, params)
+                yield from cursor
 
     def execute_command(
             self,
             command: Union[str, sql.Composed],
-            params: Optional[Dict] = None
+            params: Optional[Dict] = None,
+            prepare: Optional[bool] = None
     ) -> None:
+        pipeline = _deferring_pipeline.get()
+        if pipeline is not None:
+            return pipeline.enqueue(command, params, dict_row, prepare, None)
         with self._get_connection() as conn:
-            conn.execute(command, params)
+            conn.execute(command, params, prepare=prepare)
+
+    def execute_commands(self, commands: Sequence[Statement]) -> None:
+        with self._get_connection(transactional=True) as conn:
+            for command, params in commands:
+                conn.execute(command, params)
+
+    def copy_rows(
+            self,
+            columns: Sequence[str],
+            rows: Iterable[Sequence[Any]],
+            after: Sequence[Statement] = ()
+    ) -> None:
+        with self._get_connection(transactional=True) as conn:
+            with conn.cursor() as cursor:
+                with cursor.copy(self.build_copy_command(columns)) as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                for command, params in after:
+                    cursor.execute(command, params)
 
-    def find_by_id(self, entity_id: str) -> Optional[DictRow]:
-        query = sql.SQL("SELECT * FROM {} WHERE id = %(id)s").format(
+    def build_copy_command(self, columns: Sequence[str]) -> sql.Composed:
+        return sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(self.schema_name, self.table_name),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+
+    def find_by_id(
+            self,
+            entity_id: str,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> Optional[Any]:
+        query = self.build_find_by_id_query(as_key(columns))
+        return self.execute_query_one(query, {"id": entity_id}, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_id_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM {} WHERE id = %(id)s").format(
+            self.build_columns(columns),
             sql.Identifier(self.schema_name, self.table_name)
         )
-        result = self.execute_query(query, {"id": entity_id})
-        return result[0] if result else None
 
-    def find_all(self) -> List[DictRow]:
-        query = sql.SQL("SELECT * FROM {}").format(
+    def find_all(
+            self,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_all_query(as_key(columns))
+        return self.execute_query(query, row_factory=row_factory, read_only=True)
+
+    @memoized
+    def build_find_all_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM {}").format(
+            self.build_columns(columns),
             sql.Identifier(self.schema_name, self.table_name)
         )
-        return self.execute_query(query)
 
-    def create(self, data: Dict) -> None:
-        columns = sql.SQL(', ').join(map(sql.Identifier, data.keys()))
-        placeholders = sql.SQL(', ').join(
-            sql.Placeholder(key) for key in data.keys()
+    def find_page(
+            self,
+            limit: int,
+            after: Optional[str] = None,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_page_query(as_key(columns), after is not None)
+        params = {"limit": limit, "after": after}
+        return self.execute_query(query, params, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_page_query(self, columns: Optional[Tuple[str, ...]], has_after: bool) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM {} WHERE {} ORDER BY id LIMIT %(limit)s").format(
+            self.build_columns(columns),
+            sql.Identifier(self.schema_name, self.table_name),
+            self.build_after_condition(has_after)
+        )
+
+    def stream_all(
+            self,
+            chunk_size: int,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> Iterator[Any]:
+        query = self.build_stream_all_query(as_key(columns))
+        return self.stream_query(query, chunk_size=chunk_size, row_factory=row_factory, read_only=True)
+
+    @memoized
+    def build_stream_all_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM {} ORDER BY id").format(
+            self.build_columns(columns),
+            sql.Identifier(self.schema_name, self.table_name)
         )
-        query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+
+    def build_columns(self, columns: Optional[Sequence[str]]):
+        if columns is None:
+            return sql.SQL("*")
+        return sql.SQL(', ').join(map(sql.Identifier, columns))
+
+    def build_after_condition(self, has_after: bool):
+        if not has_after:
+            return sql.SQL("TRUE")
+        return sql.SQL("id > %(after)s")
+
+    def create(self, data: Dict) -> None:
+        return self.execute_command(self.build_create_command(tuple(data)), data, prepare=True)
+
+    @memoized
+    def build_create_command(self, columns: Tuple[str, ...]) -> sql.Composed:
+        return sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
             sql.Identifier(self.schema_name, self.table_name),
-            columns,
-            placeholders
+            sql.SQL(', ').join(map(sql.Identifier, columns)),
+            sql.SQL(', ').join(map(sql.Placeholder, columns))
         )
-        self.execute_command(query, data)
 
     def update(self, entity_id: str, data: Dict) -> None:
-        set_clause = self.build_update_params(data)
+        params = {"id": entity_id, **data}
+        return self.execute_command(self.build_update_command(tuple(data)), params, prepare=True)
 
-        query = sql.SQL("UPDATE {} SET {} WHERE id = %(id)s").format(
+    @memoized
+    def build_update_command(self, columns: Tuple[str, ...]) -> sql.Composed:
+        return sql.SQL("UPDATE {} SET {} WHERE id = %(id)s").format(
             sql.Identifier(self.schema_name, self.table_name),
-            set_clause
+            self.build_update_params(columns)
         )
-        params = {"id": entity_id, **data}
-        self.execute_command(query, params)
 
-    def build_update_params(self, data: Dict):
+    def build_update_params(self, columns: Iterable[str]):
         return sql.SQL(', ').join(
             sql.SQL("{} = {}").format(
                 sql.Identifier(key),
                 sql.Placeholder(key)
-            ) for key in data.keys()
+            ) for key in columns
         )
 
     def delete(self, entity_id: str) -> None:
-        query = sql.SQL("DELETE FROM {} WHERE id = %(id)s").format(
+        return self.execute_command(self.build_delete_command(), {"id": entity_id}, prepare=True)
+
+    @memoized
+    def build_delete_command(self) -> sql.Composed:
+        return sql.SQL("DELETE FROM {} WHERE id = %(id)s").format(
             sql.Identifier(self.schema_name, self.table_name)
         )
-        self.execute_command(query, {"id": entity_id})
@@ -0,0 +1,154 @@
+import functools
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Union
+
+import psycopg
+from psycopg import sql
+
+from app.metrics import counter, gauge, histogram, registry
+
+DB_INSTRUMENTATION = os.getenv('DB_INSTRUMENTATION', 'false') == 'true'
+STATEMENT_FINGERPRINT_LENGTH = 200
+
+query_duration = histogram(
+    "db_query_duration_seconds",
+    "Time spent executing a statement, keyed by statement fingerprint",
+    ("statement",)
+)
+query_rows = counter(
+    "db_query_rows_total",
+    "Rows returned or affected by a statement, keyed by statement fingerprint",
+    ("statement",)
+)
+pool_wait = histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ("pool",),
+    (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+pool_size = gauge("db_pool_size", "Connections currently open by the pool", ("pool",))
+pool_max_size = gauge("db_pool_max_size", "Maximum number of connections of the pool", ("pool",))
+pool_available = gauge("db_pool_available", "Idle connections ready to be used", ("pool",))
+pool_requests_waiting = gauge("db_pool_requests_waiting", "Clients waiting for a connection", ("pool",))
+request_queries = histogram(
+    "db_queries_per_request",
+    "Statements executed while serving one HTTP request",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+request_db_time = histogram(
+    "db_time_per_request_seconds",
+    "Time spent in statements and pool waits while serving one HTTP request"
+)
+
+_pools: Dict[str, Any] = {}
+_whitespace = re.compile(r"\s+")
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "pool_wait_seconds", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+    def add_pool_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.pool_wait_seconds += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.query_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"db-pool;dur={self.pool_wait_seconds * 1000:.2f}, "
+            f"total;dur={total_seconds * 1000:.2f}"
+        )
+
+    def observe(self) -> None:
+        request_queries.observe(self.queries)
+        request_db_time.observe(self.query_seconds + self.pool_wait_seconds)
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize(statement: str) -> str:
+    return _whitespace.sub(" ", statement).strip()[:STATEMENT_FINGERPRINT_LENGTH]
+
+
+def fingerprint(query: Union[str, bytes, sql.Composable], context: Any) -> str:
+    if isinstance(query, sql.Composable):
+        query = query.as_string(context)
+    elif isinstance(query, bytes):
+        query = query.decode()
+    return _normalize(query)
+
+
+def record_query(cursor: Any, query: Union[str, bytes, sql.Composable], seconds: float) -> None:
+    statement = fingerprint(query, cursor)
+    query_duration.observe(seconds, statement=statement)
+    if cursor.rowcount > 0:
+        query_rows.inc(cursor.rowcount, statement=statement)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.add_query(seconds)
+
+
+def record_pool_wait(pool_name: str, started_at: float) -> None:
+    seconds = time.perf_counter() - started_at
+    pool_wait.observe(seconds, pool=pool_name)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.add_pool_wait(seconds)
+
+
+class InstrumentedCursor(psycopg.Cursor):
+
+    def execute(self, query, params=None, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            record_query(self, query, time.perf_counter() - started_at)
+
+
+class AsyncInstrumentedCursor(psycopg.AsyncCursor):
+
+    async def execute(self, query, params=None, **kwargs):
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            record_query(self, query, time.perf_counter() - started_at)
+
+
+def connection_kwargs(kwargs: Dict[str, Any], is_async: bool = False) -> Dict[str, Any]:
+    if not DB_INSTRUMENTATION:
+        return kwargs
+    return {**kwargs, "cursor_factory": AsyncInstrumentedCursor if is_async else InstrumentedCursor}
+
+
+def register_pool(pool_name: str, pool: Any) -> None:
+    _pools[pool_name] = pool
+
+
+def collect_pool_stats() -> None:
+    for pool_name, pool in list(_pools.items()):
+        stats = pool.get_stats()
+        pool_size.set(stats.get("pool_size", 0), pool=pool_name)
+        pool_max_size.set(stats.get("pool_max", pool.max_size), pool=pool_name)
+        pool_available.set(stats.get("pool_available", 0), pool=pool_name)
+        pool_requests_waiting.set(stats.get("requests_waiting", 0), pool=pool_name)
+
+
+registry.add_collector(collect_pool_stats)
@@ -0,0 +1,77 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+import psycopg
+from psycopg import sql
+
+from app.metrics import counter
+from app.repository.topology import DB_CONNINFO
+
+logger = logging.getLogger(__name__)
+
+LISTEN_POLL_SECONDS = 1.0
+LISTEN_RECONNECT_SECONDS = 1.0
+
+notifications_received = counter(
+    "db_notifications_received_total",
+    "Notifications delivered to a LISTEN connection",
+    ("channel",)
+)
+listener_connects = counter(
+    "db_listener_connects_total",
+    "Connections opened by a notification listener, including reconnects",
+    ("channel",)
+)
+listener_handler_errors = counter(
+    "db_listener_handler_errors_total",
+    "Exceptions raised by notification listener callbacks",
+    ("channel",)
+)
+
+
+class NotificationListener:
+
+    def __init__(self, channel: str, handler: Callable[[str], None], on_connect: Callable[[], None]):
+        self.channel = channel
+        self.handler = handler
+        self.on_connect = on_connect
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=f"listen-{self.channel}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except psycopg.Error:
+                self._stopped.wait(LISTEN_RECONNECT_SECONDS)
+
+    def _listen(self) -> None:
+        with psycopg.connect(DB_CONNINFO, autocommit=True) as conn:
+            conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+            listener_connects.inc(channel=self.channel)
+            self._call(self.on_connect)
+            while not self._stopped.is_set():
+                for notify in conn.notifies(timeout=LISTEN_POLL_SECONDS):
+                    notifications_received.inc(channel=self.channel)
+                    self._call(self.handler, notify.payload)
+
+    def _call(self, callback: Callable[..., None], *args: str) -> None:
+        try:
+            callback(*args)
+        except Exception:
+            listener_handler_errors.inc(channel=self.channel)
+            logger.exception("Listener callback for channel %s failed", self.channel)
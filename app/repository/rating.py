@@ -0,0 +1,104 @@
+from typing import List, Sequence
+from uuid import UUID
+
+from psycopg import sql
+from psycopg.rows import DictRow, tuple_row
+
+from app.repository.async_db import AsyncRepositoryMixin
+from app.repository.db import BaseRepository, Statement, memoized
+
+REBUILD_QUERY = sql.SQL(
+    "INSERT INTO catalog.book_rating (book_id, review_num, histogram) "
+    "WITH rating_counts AS ("
+    " SELECT book_id, rating, count(*)::int4 AS review_num"
+    " FROM catalog.book_review"
+    " WHERE {}"
+    " GROUP BY book_id, rating"
+    ") "
+    "SELECT b.book_id,"
+    " sum(coalesce(c.review_num, 0))::int4,"
+    " array_agg(coalesce(c.review_num, 0) ORDER BY r.rating) "
+    "FROM (SELECT DISTINCT book_id FROM rating_counts) AS b "
+    "CROSS JOIN generate_series(0, 100) AS r(rating) "
+    "LEFT JOIN rating_counts c ON c.book_id = b.book_id AND c.rating = r.rating "
+    "GROUP BY b.book_id"
+)
+
+
+class BookRatingRepository(BaseRepository):
+
+    def __init__(self):
+        super().__init__('catalog', 'book_rating')
+
+    def find_all_rated(self) -> List[DictRow]:
+        return self.execute_query(self.build_find_all_rated_query(), read_only=True)
+
+    def find_all_rated_columns(self) -> List[tuple]:
+        return self.execute_query(self.build_find_all_rated_query(), row_factory=tuple_row, read_only=True)
+
+    @memoized
+    def build_find_all_rated_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT book_id, review_num, histogram "
+            "FROM catalog.book_rating "
+            "WHERE review_num > 0"
+        ).format()
+
+    def find_by_book_ids(self, book_ids: Sequence[UUID]) -> List[DictRow]:
+        query = self.build_find_by_book_ids_query()
+        return self.execute_query(query, {"book_ids": list(book_ids)}, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_book_ids_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT book_id, review_num, histogram "
+            "FROM catalog.book_rating "
+            "WHERE book_id = ANY(%(book_ids)s::uuid[])"
+        ).format()
+
+    def add_rating(self, book_id: str, rating: int) -> None:
+        params = {"book_id": book_id, "rating": rating, "index": rating + 1}
+        return self.execute_command(self.build_add_rating_command(), params, prepare=True)
+
+    @memoized
+    def build_add_rating_command(self) -> sql.Composed:
+        return sql.SQL(
+            "INSERT INTO catalog.book_rating AS r (book_id, review_num, histogram) "
+            "VALUES ("
+            " %(book_id)s, 1,"
+            " (SELECT array_agg((i = %(rating)s)::int4 ORDER BY i) FROM generate_series(0, 100) AS i)"
+            ") "
+            "ON CONFLICT (book_id) DO UPDATE SET "
+            "review_num = r.review_num + 1, "
+            "histogram[%(index)s::int4] = r.histogram[%(index)s::int4] + 1"
+        ).format()
+
+    def remove_rating(self, book_id: str, rating: int) -> None:
+        params = {"book_id": book_id, "index": rating + 1}
+        return self.execute_command(self.build_remove_rating_command(), params, prepare=True)
+
+    @memoized
+    def build_remove_rating_command(self) -> sql.Composed:
+        return sql.SQL(
+            "UPDATE catalog.book_rating SET "
+            "review_num = review_num - 1, "
+            "histogram[%(index)s::int4] = histogram[%(index)s::int4] - 1 "
+            "WHERE book_id = %(book_id)s"
+        ).format()
+
+    def rebuild(self) -> None:
+        return self.execute_commands([
+            (sql.SQL("DELETE FROM catalog.book_rating"), None),
+            (REBUILD_QUERY.format(sql.SQL("TRUE")), None)
+        ])
+
+    def build_refresh_commands(self, book_ids: Sequence[str]) -> List[Statement]:
+        params = {"book_ids": list(book_ids)}
+        return [
+            (sql.SQL("DELETE FROM catalog.book_rating WHERE book_id = ANY(%(book_ids)s::uuid[])"), params),
+            (REBUILD_QUERY.format(sql.SQL("book_id = ANY(%(book_ids)s::uuid[])")), params)
+        ]
+
+
+class AsyncBookRatingRepository(AsyncRepositoryMixin, BookRatingRepository):
+    pass
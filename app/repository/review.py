@@ -1,9 +1,10 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Sequence, Tuple
 
 from psycopg import sql
-from psycopg.rows import DictRow
+from psycopg.rows import DictRow, RowFactory, dict_row
 
-from app.repository.db import BaseRepository
+from app.repository.async_db import AsyncRepositoryMixin
+from app.repository.db import BaseRepository, as_key, memoized
 
 
 class ReviewRepository(BaseRepository):
@@ -11,35 +12,125 @@ class ReviewRepository(BaseRepository):
     def __init__(self):
         super().__init__('catalog', 'book_review')
 
-    def find_by_user_id_and_book_id(self, user_id: str, book_id: str) -> DictRow:
-        query = sql.SQL(
-            "SELECT * "
+    def find_by_user_id_and_book_id(
+            self,
+            user_id: str,
+            book_id: str,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> Optional[Any]:
+        query = self.build_find_by_user_id_and_book_id_query(as_key(columns))
+        params = {"book_id": book_id, "user_id": user_id}
+        return self.execute_query_one(query, params, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_user_id_and_book_id_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL(
+            "SELECT {} "
             "FROM catalog.book_review "
             "WHERE book_id = %(book_id)s AND user_id = %(user_id)s"
+        ).format(self.build_columns(columns))
+
+    def create_if_absent(self, data: Dict) -> Optional[DictRow]:
+        return self.execute_query_one(self.build_create_if_absent_query(), data, prepare=True)
+
+    @memoized
+    def build_create_if_absent_query(self) -> sql.Composed:
+        return sql.SQL(
+            "INSERT INTO catalog.book_review (book_id, user_id, rating, review) "
+            "SELECT %(book_id)s::uuid, %(user_id)s::uuid, %(rating)s, %(review)s "
+            "WHERE EXISTS (SELECT 1 FROM catalog.book WHERE id = %(book_id)s::uuid) "
+            "ON CONFLICT (user_id, book_id) DO NOTHING "
+            "RETURNING book_id"
+        ).format()
+
+    def find_reviewed_book_ids(self, user_id: str, book_ids: List[str]) -> List[DictRow]:
+        params = {"user_id": user_id, "book_ids": book_ids}
+        return self.execute_query(self.build_find_reviewed_book_ids_query(), params, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_reviewed_book_ids_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT DISTINCT book_id "
+            "FROM catalog.book_review "
+            "WHERE user_id = %(user_id)s AND book_id = ANY(%(book_ids)s::uuid[])"
         ).format()
-        result = self.execute_query(query, {"book_id": book_id, "user_id": user_id})
-        return result[0] if result else None
 
-    def find_by_user_id(self, user_id: str) -> List[DictRow]:
-        query = sql.SQL("SELECT * FROM catalog.book_review WHERE user_id = %(user_id)s").format()
-        return self.execute_query(query, {"user_id": user_id})
+    def find_top_rated_books(self, limit: int, weighting: Dict) -> List[DictRow]:
+        query = self.build_find_top_rated_books_query()
+        return self.execute_query(query, {"limit": limit, **weighting}, read_only=True)
 
-    def update_by_user_id_and_book_id(self, user_id: str, book_id: str, data: Dict) -> None:
-        set_clause = self.build_update_params(data)
+    @memoized
+    def build_find_top_rated_books_query(self) -> sql.Composed:
+        return sql.SQL(
+            "WITH scores AS ("
+            " SELECT book_id,"
+            " percentile_cont(0.5) WITHIN GROUP (ORDER BY rating) AS median_rating,"
+            " count(*) AS review_num"
+            " FROM catalog.book_review"
+            " GROUP BY book_id"
+            ") "
+            "SELECT b.id, b.title, b.description "
+            "FROM scores s "
+            "JOIN catalog.book b ON b.id = s.book_id "
+            "ORDER BY s.median_rating * ("
+            " %(base_rate)s::float8"
+            " + %(review_num_rate)s::float8 * %(max_weighted_review_num)s::int4"
+            " / greatest(s.review_num, %(max_weighted_review_num)s::int4)"
+            ") DESC, s.book_id "
+            "LIMIT %(limit)s"
+        ).format()
 
-        query = sql.SQL(
-            "UPDATE {} SET {} "
-            "WHERE user_id = %(user_id)s AND book_id = %(book_id)s"
+    def find_by_user_id(
+            self,
+            user_id: str,
+            columns: Optional[Sequence[str]] = None,
+            row_factory: RowFactory = dict_row
+    ) -> List[Any]:
+        query = self.build_find_by_user_id_query(as_key(columns))
+        return self.execute_query(query, {"user_id": user_id}, row_factory, prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_user_id_query(self, columns: Optional[Tuple[str, ...]]) -> sql.Composed:
+        return sql.SQL("SELECT {} FROM catalog.book_review WHERE user_id = %(user_id)s").format(
+            self.build_columns(columns)
+        )
+
+    def update_by_user_id_and_book_id(self, user_id: str, book_id: str, data: Dict) -> List[DictRow]:
+        query = self.build_update_by_user_id_and_book_id_query(tuple(data))
+        params = {"user_id": user_id, "book_id": book_id, **data}
+        return self.execute_query(query, params, prepare=True)
+
+    @memoized
+    def build_update_by_user_id_and_book_id_query(self, columns: Tuple[str, ...]) -> sql.Composed:
+        return sql.SQL(
+            "WITH o AS ("
+            " SELECT user_id, book_id, rating FROM {}"
+            " WHERE user_id = %(user_id)s AND book_id = %(book_id)s"
+            " FOR UPDATE"
+            ") "
+            "UPDATE {} AS n SET {} "
+            "FROM o "
+            "WHERE n.user_id = o.user_id AND n.book_id = o.book_id "
+            "RETURNING o.rating AS old_rating, n.rating"
         ).format(
             sql.Identifier(self.schema_name, self.table_name),
-            set_clause
+            sql.Identifier(self.schema_name, self.table_name),
+            self.build_update_params(columns)
         )
-        params = {"user_id": user_id, "book_id": book_id, **data}
-        self.execute_command(query, params)
 
-    def delete_by_user_id_and_book_id(self, user_id: str, book_id: str) -> None:
-        query = sql.SQL(
+    def delete_by_user_id_and_book_id(self, user_id: str, book_id: str) -> List[DictRow]:
+        query = self.build_delete_by_user_id_and_book_id_query()
+        return self.execute_query(query, {"book_id": book_id, "user_id": user_id}, prepare=True)
+
+    @memoized
+    def build_delete_by_user_id_and_book_id_query(self) -> sql.Composed:
+        return sql.SQL(
             "DELETE FROM catalog.book_review "
-            "WHERE book_id = %(book_id)s AND user_id = %(user_id)s"
+            "WHERE book_id = %(book_id)s AND user_id = %(user_id)s "
+            "RETURNING rating"
         ).format()
-        self.execute_command(query, {"book_id": book_id, "user_id": user_id})
+
+
+class AsyncReviewRepository(AsyncRepositoryMixin, ReviewRepository):
+    pass
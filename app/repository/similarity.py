@@ -0,0 +1,80 @@
+from typing import List, Optional, Tuple
+
+from psycopg import sql
+from psycopg.rows import DictRow, tuple_row
+
+from app.repository.async_db import AsyncRepositoryMixin
+from app.repository.db import BaseRepository, memoized
+
+SIMILARITY_INDEX_LOCK = "catalog.book_similarity_index"
+
+
+class BookSimilarityRepository(BaseRepository):
+
+    def __init__(self):
+        super().__init__('catalog', 'book_similarity_index')
+
+    def find_index(self) -> Optional[DictRow]:
+        return self.execute_query_one(self.build_find_index_query(), read_only=True)
+
+    @memoized
+    def build_find_index_query(self) -> sql.Composed:
+        return sql.SQL("SELECT review_num, built_at, payload FROM catalog.book_similarity_index").format()
+
+    def find_index_changes(self) -> Optional[DictRow]:
+        return self.execute_query_one(self.build_find_index_changes_query(), prepare=True, read_only=True)
+
+    @memoized
+    def build_find_index_changes_query(self) -> sql.Composed:
+        return sql.SQL("SELECT review_num, review_changes FROM catalog.book_similarity_index").format()
+
+    def find_review_changes(self) -> DictRow:
+        return self.execute_query_one(self.build_find_review_changes_query(), prepare=True, read_only=True)
+
+    @memoized
+    def build_find_review_changes_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END AS review_changes "
+            "FROM catalog.book_review_change_seq"
+        ).format()
+
+    def try_lock(self) -> DictRow:
+        return self.execute_query_one(
+            "SELECT pg_try_advisory_xact_lock(hashtext(%(name)s)) AS locked",
+            {"name": SIMILARITY_INDEX_LOCK}
+        )
+
+    def lock(self) -> None:
+        return self.execute_command(
+            "SELECT pg_advisory_xact_lock(hashtext(%(name)s))",
+            {"name": SIMILARITY_INDEX_LOCK}
+        )
+
+    def find_packed_ratings(self) -> List[Tuple[bytes]]:
+        return self.execute_query(self.build_find_packed_ratings_query(), row_factory=tuple_row)
+
+    @memoized
+    def build_find_packed_ratings_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT string_agg(uuid_send(user_id) || uuid_send(book_id) || int4send(rating), ''::bytea) "
+            "FROM catalog.book_review GROUP BY book_id"
+        ).format()
+
+    def save_index(self, review_num: int, review_changes: int, payload: bytes) -> None:
+        params = {"review_num": review_num, "review_changes": review_changes, "payload": payload}
+        return self.execute_command(self.build_save_index_command(), params)
+
+    @memoized
+    def build_save_index_command(self) -> sql.Composed:
+        return sql.SQL(
+            "INSERT INTO catalog.book_similarity_index AS i (review_num, review_changes, built_at, payload) "
+            "VALUES (%(review_num)s, %(review_changes)s, now(), %(payload)s) "
+            "ON CONFLICT (id) DO UPDATE SET "
+            "review_num = EXCLUDED.review_num, review_changes = EXCLUDED.review_changes, "
+            "built_at = EXCLUDED.built_at, payload = EXCLUDED.payload "
+            "WHERE i.review_changes <= EXCLUDED.review_changes"
+        ).format()
+
+
+class AsyncBookSimilarityRepository(AsyncRepositoryMixin, BookSimilarityRepository):
+    pass
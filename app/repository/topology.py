@@ -0,0 +1,130 @@
+import hashlib
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional, Tuple
+
+WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 0))
+CACHE_INVALIDATION = os.getenv('CACHE_INVALIDATION', 'true' if WORKERS > 1 else 'false') == 'true'
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_PREFILL = os.getenv('DB_POOL_PREFILL', 'false') == 'true'
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+DB_REPLICA_PORT = os.getenv('DB_REPLICA_PORT', os.getenv('DB_PORT'))
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+READ_YOUR_WRITES_COOKIE = 'read_your_writes'
+SECRET_KEY = os.getenv('SECRET_KEY')
+
+
+def worker_pool_max_size(requested: int, max_connections: int, workers: int, listener: bool, pools: int = 1) -> int:
+    if max_connections <= 0:
+        return requested
+    budget = (max_connections // workers - (1 if listener else 0)) // pools
+    if budget < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} leaves no pool connections for {workers} workers "
+            f"with {pools} pools each"
+        )
+    return min(requested, budget)
+
+
+DB_POOL_MAX_SIZE = worker_pool_max_size(
+    int(os.getenv('DB_POOL_MAX_SIZE', 10)), DB_MAX_CONNECTIONS, WORKERS, CACHE_INVALIDATION,
+    2 if DB_REPLICA_HOST else 1
+)
+DB_POOL_MIN_SIZE = min(int(os.getenv('DB_POOL_MIN_SIZE', 1)), DB_POOL_MAX_SIZE)
+
+
+def build_conninfo(host: Optional[str], port: Optional[str]) -> str:
+    conninfo = (
+        f"host={host} "
+        f"port={port} "
+        f"dbname={os.getenv('DB_NAME')} "
+        f"user={os.getenv('DB_USER')} "
+        f"password={os.getenv('DB_PASSWORD')} "
+    )
+    if host and "," in host:
+        conninfo += "load_balance_hosts=random "
+    return conninfo
+
+
+DB_CONNINFO = build_conninfo(os.getenv('DB_HOST'), os.getenv('DB_PORT'))
+DB_REPLICA_CONNINFO = build_conninfo(DB_REPLICA_HOST, DB_REPLICA_PORT) if DB_REPLICA_HOST else None
+
+
+class WriteMarker:
+    __slots__ = ("primary_until", "written")
+
+    def __init__(self, primary_until: float):
+        self.primary_until = primary_until
+        self.written = False
+
+
+_write_marker: ContextVar[Optional[WriteMarker]] = ContextVar("write_marker", default=None)
+
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+def has_replica() -> bool:
+    return DB_REPLICA_CONNINFO is not None
+
+
+def primary_reads_required() -> bool:
+    return _primary_reads.get()
+
+
+def reads_from_replica(read_only: bool) -> bool:
+    return read_only and not _primary_reads.get()
+
+
+@contextmanager
+def primary_reads(enabled: bool = True) -> Iterator[None]:
+    token = _primary_reads.set(enabled or _primary_reads.get())
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+def record_write() -> None:
+    marker = _write_marker.get()
+    if marker is not None:
+        marker.written = True
+        marker.primary_until = time.time() + READ_YOUR_WRITES_SECONDS
+
+
+def read_your_writes():
+    marker = _write_marker.get()
+    return primary_reads(marker is not None and marker.primary_until > time.time())
+
+
+def start_write_tracking(cookie: Optional[str]) -> Tuple[WriteMarker, Token]:
+    marker = WriteMarker(parse_write_cookie(cookie))
+    return marker, _write_marker.set(marker)
+
+
+def stop_write_tracking(token: Token) -> None:
+    _write_marker.reset(token)
+
+
+def build_write_cookie(marker: WriteMarker) -> str:
+    primary_until = f"{marker.primary_until:.3f}"
+    return f"{primary_until}.{_sign(primary_until)}"
+
+
+def parse_write_cookie(cookie: Optional[str]) -> float:
+    if not cookie:
+        return 0.0
+    primary_until, _, signature = cookie.rpartition(".")
+    if not hmac.compare_digest(signature, _sign(primary_until)):
+        return 0.0
+    try:
+        return float(primary_until)
+    except ValueError:
+        return 0.0
+
+
+def _sign(value: str) -> str:
+    return hmac.new((SECRET_KEY or "").encode(), value.encode(), hashlib.sha256).hexdigest()
@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import List, Optional
 
 from psycopg import sql
+from psycopg.rows import class_row
 
 from app.model.user import User
-from app.repository.db import BaseRepository
+from app.repository.async_db import AsyncRepositoryMixin
+from app.repository.db import BaseRepository, memoized
 
 
 class UserRepository(BaseRepository):
@@ -12,9 +14,31 @@ class UserRepository(BaseRepository):
         super().__init__('users', 'identity')
 
     def find_by_username(self, username: str) -> Optional[User]:
-        query = sql.SQL("SELECT * FROM users.identity WHERE username = %(username)s").format()
-        result = self.execute_query(query, {"username": username})
-        if result:
-            data = result[0]
-            return User(id=str(data['id']), username=data['username'], secret_hash=data['secret_hash'])
-        return None
+        query = self.build_find_by_username_query()
+        params = {"username": username}
+        return self.execute_query_one(query, params, class_row(User), prepare=True, read_only=True)
+
+    @memoized
+    def build_find_by_username_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT id::text AS id, username, secret_hash "
+            "FROM users.identity "
+            "WHERE username = %(username)s"
+        ).format()
+
+    def find_all_by_username(self, usernames: List[str]) -> List[User]:
+        query = self.build_find_all_by_username_query()
+        params = {"usernames": usernames}
+        return self.execute_query(query, params, class_row(User), prepare=True, read_only=True)
+
+    @memoized
+    def build_find_all_by_username_query(self) -> sql.Composed:
+        return sql.SQL(
+            "SELECT id::text AS id, username, secret_hash "
+            "FROM users.identity "
+            "WHERE username = ANY(%(usernames)s::text[])"
+        ).format()
+
+
+class AsyncUserRepository(AsyncRepositoryMixin, UserRepository):
+    pass
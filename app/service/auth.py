@@ -1,25 +1,37 @@
 import os
+import time
 import uuid
 from datetime import timedelta, datetime, timezone
-from typing import Annotated
+from typing import Annotated, Any, Dict, List, Optional
 from uuid import UUID
 
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import InvalidTokenError
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from app.model.user import User
-from app.repository.user import UserRepository
+from app.repository.user import UserRepository, AsyncUserRepository
+from app.service.cache import LoadingCache
+from app.service.hashing import password_hasher
+from app.service.loader import AsyncDataLoader, DataLoader
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+USER_CACHE_TTL_SECONDS = min(
+    float(os.getenv('USER_CACHE_TTL_SECONDS', ACCESS_TOKEN_EXPIRE_MINUTES * 60)),
+    ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', 10000))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', 10000))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth")
 
+user_cache = LoadingCache("users", ttl_seconds=USER_CACHE_TTL_SECONDS, max_size=USER_CACHE_MAX_SIZE)
+token_cache = LoadingCache("tokens", ttl_seconds=USER_CACHE_TTL_SECONDS, max_size=TOKEN_CACHE_MAX_SIZE)
+
 
 class Token(BaseModel):
     access_token: str
@@ -44,11 +56,15 @@ def create_auth_token(user: User):
 class AuthService:
 
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.password_hasher = password_hasher
         self.user_repository = UserRepository()
+        self.user_cache = user_cache
+        self.token_cache = token_cache
+        self.user_loader = DataLoader("users", self._load_users)
 
     def register_user(self, username: str, password: str) -> UUID:
-        user = self.user_repository.find_by_username(username)
+        with self.user_repository.primary_reads():
+            user = self.user_repository.find_by_username(username)
         if user:
             raise HTTPException(
                 status_code=409,
@@ -60,32 +76,118 @@ class AuthService:
             "username": username,
             "secret_hash": self.get_password_hash(password)
         })
+        self.user_repository.record_write()
+        self.invalidate_user(username)
         return user_id
 
     def get_password_hash(self, password):
-        return self.pwd_context.hash(password)
+        return self.password_hasher.hash(password)
 
     def authenticate(self, username: str, password: str):
         user = self.get_user(username)
-        if not self.pwd_context.verify(password, user.secret_hash):
+        if not self.password_hasher.verify(password, user.secret_hash):
             raise HTTPException(status_code=401, detail="Password is wrong")
         return user
 
     def get_user_by_token(self, token: Annotated[str, Depends(oauth2_scheme)]):
+        return self.get_user(self._decode_username(token))
+
+    def get_user(self, username: str) -> User:
+        return self.user_cache.get(username, lambda: self._load_user(username))
+
+    def invalidate_user(self, username: str) -> None:
+        self.user_cache.invalidate(username)
+
+    def _load_user(self, username: str) -> User:
+        with self.user_repository.read_your_writes():
+            user = self._find_user(username)
+        if not user:
+            raise HTTPException(
+                status_code=401,
+                detail=f"User with username '{username}' doesn't exist"
+            )
+        return user
+
+    def _find_user(self, username: str) -> Optional[User]:
+        if self.user_repository.requires_caller_connection():
+            return self.user_repository.find_by_username(username)
+        return self.user_loader.load(username)
+
+    def _load_users(self, usernames: List[str]) -> Dict[str, User]:
+        return {user.username: user for user in self.user_repository.find_all_by_username(usernames)}
+
+    def _decode_username(self, token: str) -> str:
+        payload = self.token_cache.get(token, lambda: self._decode_token(token))
+        if payload["exp"] <= time.time():
+            raise HTTPException(status_code=401, detail="Token is invalid")
+        return payload["sub"]
+
+    def _decode_token(self, token: str) -> Dict[str, Any]:
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if username is None:
+            if payload.get("sub") is None or payload.get("exp") is None:
                 raise HTTPException(status_code=401, detail="Token is invalid")
         except InvalidTokenError as ex:
             raise HTTPException(status_code=401, detail="Token is invalid") from ex
-        return self.get_user(username)
+        return payload
 
-    def get_user(self, username: str) -> User:
-        user = self.user_repository.find_by_username(username)
+
+class AsyncAuthService(AuthService):
+
+    def __init__(self):
+        self.password_hasher = password_hasher
+        self.user_repository = AsyncUserRepository()
+        self.user_cache = user_cache
+        self.token_cache = token_cache
+        self.user_loader = AsyncDataLoader("users", self._load_users)
+
+    async def register_user(self, username: str, password: str) -> UUID:
+        with self.user_repository.primary_reads():
+            user = await self.user_repository.find_by_username(username)
+        if user:
+            raise HTTPException(
+                status_code=409,
+                detail=f"User with username '{username}' already exists"
+            )
+        user_id = uuid.uuid4()
+        await self.user_repository.create({
+            "id": user_id,
+            "username": username,
+            "secret_hash": await self.get_password_hash(password)
+        })
+        self.user_repository.record_write()
+        self.invalidate_user(username)
+        return user_id
+
+    async def get_password_hash(self, password):
+        return await self.password_hasher.ahash(password)
+
+    async def authenticate(self, username: str, password: str):
+        user = await self.get_user(username)
+        if not await self.password_hasher.averify(password, user.secret_hash):
+            raise HTTPException(status_code=401, detail="Password is wrong")
+        return user
+
+    async def get_user_by_token(self, token: Annotated[str, Depends(oauth2_scheme)]):
+        return await self.get_user(self._decode_username(token))
+
+    async def get_user(self, username: str) -> User:
+        return await self.user_cache.aget(username, lambda: self._load_user(username))
+
+    async def _load_user(self, username: str) -> User:
+        with self.user_repository.read_your_writes():
+            user = await self._find_user(username)
         if not user:
             raise HTTPException(
                 status_code=401,
                 detail=f"User with username '{username}' doesn't exist"
             )
         return user
+
+    async def _find_user(self, username: str) -> Optional[User]:
+        if self.user_repository.requires_caller_connection():
+            return await self.user_repository.find_by_username(username)
+        return await self.user_loader.load(username)
+
+    async def _load_users(self, usernames: List[str]) -> Dict[str, User]:
+        return {user.username: user for user in await self.user_repository.find_all_by_username(usernames)}
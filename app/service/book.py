@@ -1,11 +1,30 @@
+import base64
+import binascii
+import logging
 import uuid
-from typing import Any, Optional, Union
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 from uuid import UUID
 
+import orjson
+import psycopg
 from fastapi import HTTPException
 from pydantic import BaseModel
 
-from app.repository.book import BookRepository
+from app.model.bulk import BookBulkResult, BulkError
+from app.model.row import (
+    BOOK_ROW_COLUMNS, BOOK_VERSION_COLUMNS, VERSIONED_BOOK_ROW_COLUMNS, BookRow, BookVersion,
+    book_row, book_version, ranked_book_row, versioned_book_row
+)
+from app.repository.book import BookRepository, AsyncBookRepository
+from app.service.loader import AsyncDataLoader, DataLoader
+from app.service.review import recommendation_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+BOOK_COLUMNS = ("id", "title", "description")
 
 
 class Book(BaseModel):
@@ -16,17 +35,38 @@ class Book(BaseModel):
 
 class BookFilter(BaseModel):
     title: Union[str, None] = None
+    title_prefix: Union[str, None] = None
+    search: Union[str, None] = None
+
+
+class BookPage(NamedTuple):
+    books: List[BookRow]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(sort_key: Any, book_id: UUID) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([sort_key, str(book_id)])).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type) -> Optional[Tuple[Any, str]]:
+    try:
+        sort_key, book_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(sort_key, bool) or not isinstance(sort_key, key_type):
+            return None
+        return sort_key, str(uuid.UUID(book_id))
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        return None
 
 
 class BookService:
 
     def __init__(self):
         self.repository = BookRepository()
+        self.book_loader = DataLoader("books", self._load_books)
 
     def add_book(self, book: Book) -> UUID:
         book_id = uuid.uuid4()
-        if book.title is None:
-            raise HTTPException(status_code=400, detail="Book should have a title")
+        self._validate_new_book(book)
         self.repository.create({
             "id": book_id,
             "title": book.title,
@@ -34,25 +74,291 @@ class BookService:
         })
         return book_id
 
-    def get_books(self, book_filter: BookFilter) -> list[dict[str, Any]]:
+    def add_books(self, books: List[Tuple[int, Book]]) -> BookBulkResult:
+        rows, result = self._plan_bulk_books(books)
+        if rows:
+            try:
+                self.repository.copy_rows(BOOK_COLUMNS, rows)
+            except psycopg.Error:
+                logger.exception("Bulk copy of %d books failed", len(rows))
+                return self._failed_bulk_books(result)
+            result.created = len(rows)
+        return result
+
+    def get_books(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> BookPage:
+        return self._book_page(book_filter, limit, self.find_books(book_filter, limit, after))
+
+    def find_books(self, book_filter: BookFilter, limit: int, after: Optional[str]) -> List[Any]:
+        self._validate_filter(book_filter)
+        cursor = self._validate_page(book_filter, limit, after)
+        if book_filter.search is not None:
+            return self.repository.search(book_filter.search, limit, cursor, BOOK_ROW_COLUMNS, ranked_book_row)
+        if book_filter.title_prefix is not None:
+            return self.repository.find_by_title_prefix(
+                book_filter.title_prefix, limit, cursor, BOOK_ROW_COLUMNS, book_row
+            )
         if book_filter.title is None:
-            return self.repository.find_all()
-        return self.repository.find_by_title(book_filter.title)
+            return self.repository.find_page(limit, cursor, BOOK_ROW_COLUMNS, book_row)
+        return self.repository.find_by_title(book_filter.title, limit, cursor, BOOK_ROW_COLUMNS, book_row)
 
-    def get_book(self, book_id: str) -> Optional[dict[str, Any]]:
-        book = self.repository.find_by_id(book_id)
-        if book is None:
-            raise HTTPException(status_code=404, detail=f"Book with id '{book_id}' not found")
-        return book
+    def stream_books(self, book_filter: BookFilter) -> Iterator[BookRow]:
+        self._validate_stream_filter(book_filter)
+        if book_filter.title is None:
+            return self.repository.stream_all(STREAM_CHUNK_SIZE, BOOK_ROW_COLUMNS, book_row)
+        return self.repository.stream_by_title(book_filter.title, STREAM_CHUNK_SIZE, BOOK_ROW_COLUMNS, book_row)
+
+    def get_books_version(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> int:
+        self._validate_filter(book_filter)
+        self._validate_page(book_filter, limit, after)
+        return self.repository.find_catalog_version()["version"]
+
+    def get_versioned_books(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> Tuple[int, BookPage]:
+        with self.repository.pipeline(read_only=True) as pipeline:
+            version = pipeline.defer(self.repository.find_catalog_version)
+            books = pipeline.defer(self.find_books, book_filter, limit, after)
+        return version.result()["version"], self._book_page(book_filter, limit, books.result())
+
+    def get_book(self, book_id: str) -> BookRow:
+        return self.get_versioned_book(book_id)[0]
+
+    def get_book_version(self, book_id: str) -> BookVersion:
+        key = self._canonical_id(book_id)
+        version = None if key is None else self.repository.find_by_id(key, BOOK_VERSION_COLUMNS, book_version)
+        return self._ensure_found(version, book_id)
+
+    def get_versioned_book(self, book_id: str) -> Tuple[BookRow, BookVersion]:
+        return self._ensure_found(self._find_versioned_book(book_id), book_id)
+
+    def _find_versioned_book(self, book_id: str) -> Optional[Tuple[BookRow, BookVersion]]:
+        key = self._canonical_id(book_id)
+        if key is None:
+            return None
+        if self.repository.requires_caller_connection():
+            return self.repository.find_by_id(key, VERSIONED_BOOK_ROW_COLUMNS, versioned_book_row)
+        return self.book_loader.load(key)
+
+    def _load_books(self, book_ids: List[str]) -> Dict[str, Tuple[BookRow, BookVersion]]:
+        books = self.repository.find_all_by_id(book_ids, VERSIONED_BOOK_ROW_COLUMNS, versioned_book_row)
+        return {str(book.id): (book, version) for book, version in books}
 
     def update_book(self, book_id: str, updated_book: Book) -> None:
-        self.get_book(book_id)
+        updated_fields = self._build_updated_fields(updated_book)
+        key = self._ensure_found(self._canonical_id(book_id), book_id)
+        self._ensure_found(self.repository.update(key, updated_fields), book_id)
+        recommendation_cache.invalidate()
+
+    def delete_book(self, book_id: str) -> None:
+        self.repository.delete(book_id)
+        recommendation_cache.invalidate()
+
+    def _canonical_id(self, book_id: str) -> Optional[str]:
+        try:
+            return str(uuid.UUID(book_id))
+        except ValueError:
+            return None
+
+    def _ensure_found(self, row: Optional[Any], book_id: str) -> Any:
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Book with id '{book_id}' not found")
+        return row
+
+    def _validate_new_book(self, book: Book) -> None:
+        if book.title is None:
+            raise HTTPException(status_code=400, detail="Book should have a title")
+
+    def _plan_bulk_books(self, books: List[Tuple[int, Book]]) -> Tuple[List[tuple], BookBulkResult]:
+        rows = []
+        result = BookBulkResult()
+        for index, book in books:
+            try:
+                self._validate_new_book(book)
+            except HTTPException as e:
+                result.errors.append(BulkError(index=index, status_code=e.status_code, detail=e.detail))
+                continue
+            book_id = uuid.uuid4()
+            rows.append((book_id, book.title, book.description))
+            result.book_ids[index] = book_id
+        return rows, result
+
+    def _failed_bulk_books(self, result: BookBulkResult) -> BookBulkResult:
+        for index in result.book_ids:
+            result.errors.append(BulkError(index=index, status_code=500, detail="Failed to write books"))
+        result.errors.sort(key=lambda error: error.index)
+        result.book_ids = {}
+        return result
+
+    def _validate_filter(self, book_filter: BookFilter) -> None:
+        filters = (book_filter.title, book_filter.title_prefix, book_filter.search)
+        if sum(value is not None for value in filters) > 1:
+            raise HTTPException(status_code=400, detail="Only one of title, title_prefix and search can be set")
+        if book_filter.title_prefix == "" or book_filter.search is not None and not book_filter.search.strip():
+            raise HTTPException(status_code=400, detail="Search text should not be empty")
+
+    def _validate_stream_filter(self, book_filter: BookFilter) -> None:
+        if book_filter.title_prefix is not None or book_filter.search is not None:
+            raise HTTPException(status_code=400, detail="Streaming supports only the title filter")
+
+    def _validate_page(self, book_filter: BookFilter, limit: int, after: Optional[str]) -> Any:
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Page limit should be in range [1, {MAX_PAGE_SIZE}]"
+            )
+        if after is None:
+            return None
+        if book_filter.search is not None or book_filter.title_prefix is not None:
+            cursor = decode_cursor(after, float if book_filter.search is not None else str)
+            if cursor is None:
+                raise HTTPException(status_code=400, detail=f"Cursor '{after}' is not valid for this filter")
+            return cursor
+        try:
+            uuid.UUID(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Cursor '{after}' is not a book id")
+        return after
+
+    def _book_page(self, book_filter: BookFilter, limit: int, rows: List[Any]) -> BookPage:
+        if book_filter.search is not None:
+            books = [book for book, _ in rows]
+        else:
+            books = rows
+        if len(rows) < limit:
+            return BookPage(books, None)
+        if book_filter.search is not None:
+            book, rank = rows[-1]
+            return BookPage(books, encode_cursor(rank, book.id))
+        if book_filter.title_prefix is not None:
+            return BookPage(books, encode_cursor(books[-1].title, books[-1].id))
+        return BookPage(books, str(books[-1].id))
+
+    def _build_updated_fields(self, updated_book: Book) -> Dict[str, Any]:
         updated_fields = {}
         if updated_book.title is not None:
             updated_fields["title"] = updated_book.title
         if updated_book.description is not None:
             updated_fields["description"] = updated_book.description
-        self.repository.update(book_id, updated_fields)
+        return updated_fields
 
-    def delete_book(self, book_id: str) -> None:
-        self.repository.delete(book_id)
+
+class AsyncBookService(BookService):
+
+    def __init__(self):
+        self.repository = AsyncBookRepository()
+        self.book_loader = AsyncDataLoader("books", self._load_books)
+
+    async def add_book(self, book: Book) -> UUID:
+        book_id = uuid.uuid4()
+        self._validate_new_book(book)
+        await self.repository.create({
+            "id": book_id,
+            "title": book.title,
+            "description": book.description
+        })
+        return book_id
+
+    async def add_books(self, books: List[Tuple[int, Book]]) -> BookBulkResult:
+        rows, result = self._plan_bulk_books(books)
+        if rows:
+            try:
+                await self.repository.copy_rows(BOOK_COLUMNS, rows)
+            except psycopg.Error:
+                logger.exception("Bulk copy of %d books failed", len(rows))
+                return self._failed_bulk_books(result)
+            result.created = len(rows)
+        return result
+
+    async def get_books(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> BookPage:
+        return self._book_page(book_filter, limit, await self.find_books(book_filter, limit, after))
+
+    async def find_books(self, book_filter: BookFilter, limit: int, after: Optional[str]) -> List[Any]:
+        self._validate_filter(book_filter)
+        cursor = self._validate_page(book_filter, limit, after)
+        if book_filter.search is not None:
+            return await self.repository.search(book_filter.search, limit, cursor, BOOK_ROW_COLUMNS, ranked_book_row)
+        if book_filter.title_prefix is not None:
+            return await self.repository.find_by_title_prefix(
+                book_filter.title_prefix, limit, cursor, BOOK_ROW_COLUMNS, book_row
+            )
+        if book_filter.title is None:
+            return await self.repository.find_page(limit, cursor, BOOK_ROW_COLUMNS, book_row)
+        return await self.repository.find_by_title(book_filter.title, limit, cursor, BOOK_ROW_COLUMNS, book_row)
+
+    async def stream_books(self, book_filter: BookFilter) -> AsyncIterator[BookRow]:
+        self._validate_stream_filter(book_filter)
+        if book_filter.title is None:
+            return self.repository.stream_all(STREAM_CHUNK_SIZE, BOOK_ROW_COLUMNS, book_row)
+        return self.repository.stream_by_title(book_filter.title, STREAM_CHUNK_SIZE, BOOK_ROW_COLUMNS, book_row)
+
+    async def get_books_version(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> int:
+        self._validate_filter(book_filter)
+        self._validate_page(book_filter, limit, after)
+        return (await self.repository.find_catalog_version())["version"]
+
+    async def get_versioned_books(
+            self,
+            book_filter: BookFilter,
+            limit: int = DEFAULT_PAGE_SIZE,
+            after: Optional[str] = None
+    ) -> Tuple[int, BookPage]:
+        async with self.repository.pipeline(read_only=True) as pipeline:
+            version = await pipeline.defer(self.repository.find_catalog_version)
+            books = await pipeline.defer(self.find_books, book_filter, limit, after)
+        return version.result()["version"], self._book_page(book_filter, limit, books.result())
+
+    async def get_book(self, book_id: str) -> BookRow:
+        return (await self.get_versioned_book(book_id))[0]
+
+    async def get_book_version(self, book_id: str) -> BookVersion:
+        key = self._canonical_id(book_id)
+        version = None if key is None else await self.repository.find_by_id(key, BOOK_VERSION_COLUMNS, book_version)
+        return self._ensure_found(version, book_id)
+
+    async def get_versioned_book(self, book_id: str) -> Tuple[BookRow, BookVersion]:
+        return self._ensure_found(await self._find_versioned_book(book_id), book_id)
+
+    async def _find_versioned_book(self, book_id: str) -> Optional[Tuple[BookRow, BookVersion]]:
+        key = self._canonical_id(book_id)
+        if key is None:
+            return None
+        if self.repository.requires_caller_connection():
+            return await self.repository.find_by_id(key, VERSIONED_BOOK_ROW_COLUMNS, versioned_book_row)
+        return await self.book_loader.load(key)
+
+    async def _load_books(self, book_ids: List[str]) -> Dict[str, Tuple[BookRow, BookVersion]]:
+        books = await self.repository.find_all_by_id(book_ids, VERSIONED_BOOK_ROW_COLUMNS, versioned_book_row)
+        return {str(book.id): (book, version) for book, version in books}
+
+    async def update_book(self, book_id: str, updated_book: Book) -> None:
+        updated_fields = self._build_updated_fields(updated_book)
+        key = self._ensure_found(self._canonical_id(book_id), book_id)
+        self._ensure_found(await self.repository.update(key, updated_fields), book_id)
+        recommendation_cache.invalidate()
+
+    async def delete_book(self, book_id: str) -> None:
+        await self.repository.delete(book_id)
+        recommendation_cache.invalidate()
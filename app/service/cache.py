@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.metrics import counter
+from app.repository.topology import READ_YOUR_WRITES_SECONDS, primary_reads
+
+cache_hits = counter("cache_hits_total", "Cache lookups answered from the cache", ("cache",))
+cache_misses = counter("cache_misses_total", "Cache lookups not found in the cache", ("cache",))
+cache_recomputes = counter("cache_recomputes_total", "Values computed by cache loaders", ("cache",))
+
+_MISSING = object()
+_caches: Dict[str, "LoadingCache"] = {}
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class LoadingCache:
+
+    def __init__(self, name: str, ttl_seconds: float, max_size: Optional[int] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._async_flights: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        self._invalidated_at: Optional[float] = None
+        self._lock = threading.Lock()
+        _caches[name] = self
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                cache_hits.inc(cache=self.name)
+                return value
+            cache_misses.inc(cache=self.name)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            cache_recomputes.inc(cache=self.name)
+            with primary_reads(self._recently_invalidated()):
+                flight.value = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    async def aget(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                cache_hits.inc(cache=self.name)
+                return value
+            cache_misses.inc(cache=self.name)
+            flight = self._async_flights.get(key)
+            if flight is None:
+                flight = asyncio.get_running_loop().create_task(self._aload(key, loader, self._generation))
+                flight.add_done_callback(_retrieve_exception)
+                self._async_flights[key] = flight
+        return await asyncio.shield(flight)
+
+    async def _aload(self, key: Hashable, loader: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        flight = asyncio.current_task()
+        try:
+            cache_recomputes.inc(cache=self.name)
+            with primary_reads(self._recently_invalidated()):
+                value = await loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                if self._async_flights.get(key) is flight:
+                    del self._async_flights[key]
+
+    def invalidate(self, key: Hashable = _MISSING) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            if key is _MISSING:
+                self._entries.clear()
+                self._flights.clear()
+                self._async_flights.clear()
+            else:
+                self._entries.pop(key, None)
+                self._flights.pop(key, None)
+                self._async_flights.pop(key, None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": cache_hits.value(cache=self.name),
+            "misses": cache_misses.value(cache=self.name),
+            "recomputes": cache_recomputes.value(cache=self.name),
+            "size": len(self._entries)
+        }
+
+    def _recently_invalidated(self) -> bool:
+        invalidated_at = self._invalidated_at
+        return invalidated_at is not None and time.monotonic() - invalidated_at < READ_YOUR_WRITES_SECONDS
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expire_at, value = entry
+        if expire_at <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def _retrieve_exception(flight: asyncio.Task) -> None:
+    if not flight.cancelled():
+        flight.exception()
+
+
+def invalidate_cache(name: str, key: Hashable = _MISSING) -> None:
+    cache = _caches.get(name)
+    if cache is not None:
+        cache.invalidate(key)
+
+
+def invalidate_all_caches() -> None:
+    for cache in list(_caches.values()):
+        cache.invalidate()
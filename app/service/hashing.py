@@ -0,0 +1,114 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.metrics import counter, gauge, histogram
+
+PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'thread')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 32))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+hash_duration = histogram(
+    "password_hash_duration_seconds",
+    "Time from submitting a password hash operation to its completion",
+    ("operation",)
+)
+hash_queue_depth = gauge(
+    "password_hash_queue_depth",
+    "Password hash operations submitted and not yet completed"
+)
+hash_rejected = counter(
+    "password_hash_rejected_total",
+    "Password hash operations rejected because the queue was full",
+    ("operation",)
+)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, secret_hash: str) -> bool:
+    return pwd_context.verify(password, secret_hash)
+
+
+class PasswordHasher:
+
+    def __init__(self, executor_kind: str, workers: int, queue_size: int):
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        return self._submit("hash", hash_password, password).result()
+
+    def verify(self, password: str, secret_hash: str) -> bool:
+        return self._submit("verify", verify_password, password, secret_hash).result()
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit("hash", hash_password, password))
+
+    async def averify(self, password: str, secret_hash: str) -> bool:
+        return await asyncio.wrap_future(
+            self._submit("verify", verify_password, password, secret_hash)
+        )
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _submit(self, operation: str, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            hash_rejected.inc(operation=operation)
+            raise HTTPException(
+                status_code=503,
+                detail="Too many concurrent authentication requests",
+                headers={"Retry-After": "1"}
+            )
+        hash_queue_depth.inc()
+        started_at = time.perf_counter()
+
+        def on_done(_: Future) -> None:
+            hash_duration.observe(time.perf_counter() - started_at, operation=operation)
+            hash_queue_depth.dec()
+            self._slots.release()
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            hash_queue_depth.dec()
+            self._slots.release()
+            raise
+        future.add_done_callback(on_done)
+        return future
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.executor_kind == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="password-hash"
+                    )
+            return self._executor
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_SIZE
+)
@@ -0,0 +1,22 @@
+import json
+
+from app.repository.notifications import NotificationListener
+from app.service.cache import invalidate_all_caches, invalidate_cache
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+
+def handle_invalidation(payload: str) -> None:
+    try:
+        event = json.loads(payload)
+        name = event["cache"]
+    except (ValueError, KeyError, TypeError):
+        invalidate_all_caches()
+        return
+    if "key" in event:
+        invalidate_cache(name, event["key"])
+    else:
+        invalidate_cache(name)
+
+
+invalidation_listener = NotificationListener(INVALIDATION_CHANNEL, handle_invalidation, invalidate_all_caches)
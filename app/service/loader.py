@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from app.metrics import counter, histogram
+
+DATALOADER_WINDOW_MS = float(os.getenv('DATALOADER_WINDOW_MS', 1))
+DATALOADER_MAX_BATCH_SIZE = int(os.getenv('DATALOADER_MAX_BATCH_SIZE', 100))
+
+loader_keys = counter("dataloader_keys_total", "Keys requested from a loader", ("loader",))
+loader_coalesced = counter(
+    "dataloader_coalesced_total",
+    "Keys answered by a batch already pending or in flight for the same key",
+    ("loader",)
+)
+loader_batch_size = histogram(
+    "dataloader_batch_size",
+    "Distinct keys resolved by one batch query",
+    ("loader",),
+    (1, 2, 5, 10, 20, 50, 100)
+)
+
+BatchLoad = Callable[[List[Hashable]], Dict[Hashable, Any]]
+AsyncBatchLoad = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class _Batch:
+
+    def __init__(self):
+        self.keys: List[Hashable] = []
+        self.done = threading.Event()
+        self.results: Dict[Hashable, Any] = {}
+        self.error: Optional[BaseException] = None
+
+
+class DataLoader:
+
+    def __init__(
+            self,
+            name: str,
+            batch_load: BatchLoad,
+            window_seconds: float = DATALOADER_WINDOW_MS / 1000,
+            max_batch_size: int = DATALOADER_MAX_BATCH_SIZE
+    ):
+        self.name = name
+        self.batch_load = batch_load
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: Optional[_Batch] = None
+        self._in_flight: Dict[Hashable, _Batch] = {}
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable) -> Optional[Any]:
+        loader_keys.inc(loader=self.name)
+        with self._lock:
+            batch = self._in_flight.get(key)
+            leader = False
+            if batch is not None:
+                loader_coalesced.inc(loader=self.name)
+            else:
+                batch = self._pending
+                if batch is None:
+                    batch = self._pending = _Batch()
+                    leader = True
+                    wait = self._running > 0
+                batch.keys.append(key)
+                self._in_flight[key] = batch
+                if len(batch.keys) >= self.max_batch_size:
+                    self._pending = None
+
+        if leader:
+            if wait and self.window_seconds > 0:
+                time.sleep(self.window_seconds)
+            self._dispatch(batch)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results.get(key)
+
+    def _dispatch(self, batch: _Batch) -> None:
+        with self._lock:
+            if self._pending is batch:
+                self._pending = None
+            self._running += 1
+        try:
+            loader_batch_size.observe(len(batch.keys), loader=self.name)
+            batch.results = self.batch_load(batch.keys)
+        except BaseException as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self._running -= 1
+                for key in batch.keys:
+                    if self._in_flight.get(key) is batch:
+                        del self._in_flight[key]
+            batch.done.set()
+
+
+class AsyncDataLoader:
+
+    def __init__(self, name: str, batch_load: AsyncBatchLoad, max_batch_size: int = DATALOADER_MAX_BATCH_SIZE):
+        self.name = name
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._pending: Optional[Dict[Hashable, asyncio.Future]] = None
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        loader_keys.inc(loader=self.name)
+        future = self._in_flight.get(key)
+        if future is not None:
+            loader_coalesced.inc(loader=self.name)
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._in_flight[key] = loop.create_future()
+            if self._pending is None:
+                self._pending = {}
+                loop.call_soon(self._dispatch_pending)
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch_pending()
+        return await asyncio.shield(future)
+
+    def _dispatch_pending(self) -> None:
+        batch, self._pending = self._pending, None
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        try:
+            loader_batch_size.observe(len(batch), loader=self.name)
+            results = await self.batch_load(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        finally:
+            for key, future in batch.items():
+                if not future.done():
+                    future.cancel()
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.metrics import counter
+
+periodic_runs = counter(
+    "periodic_task_runs_total",
+    "Runs of background periodic tasks by outcome",
+    ("task", "outcome")
+)
+
+
+class PeriodicTask:
+
+    def __init__(self, name: str, interval_seconds: float, run: Callable[[], Awaitable[bool]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.run = run
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name=f"periodic-{self.name}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                outcome = "done" if await self.run() else "skipped"
+            except Exception:
+                outcome = "failed"
+            periodic_runs.inc(task=self.name, outcome=outcome)
@@ -0,0 +1,50 @@
+import functools
+import os
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+
+from app.service.auth import AuthService, AsyncAuthService
+from app.service.book import BookService, AsyncBookService
+from app.service.review import ReviewService, AsyncReviewService
+
+IO_MODE = os.getenv('IO_MODE', 'sync')
+
+
+class ThreadpoolService:
+
+    def __init__(self, service: Any):
+        self._service = service
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._service, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def call(*args, **kwargs):
+            return await run_in_threadpool(attribute, *args, **kwargs)
+
+        return call
+
+
+def is_async_mode() -> bool:
+    return IO_MODE == 'async'
+
+
+def create_book_service():
+    if is_async_mode():
+        return AsyncBookService()
+    return ThreadpoolService(BookService())
+
+
+def create_review_service():
+    if is_async_mode():
+        return AsyncReviewService()
+    return ThreadpoolService(ReviewService())
+
+
+def create_auth_service():
+    if is_async_mode():
+        return AsyncAuthService()
+    return ThreadpoolService(AuthService())
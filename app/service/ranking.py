@@ -0,0 +1,43 @@
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+RATING_VALUES = 101
+
+
+class RatingMatrix:
+
+    def __init__(self, rows: Sequence[Sequence[Any]]):
+        self.book_ids = [row[0] for row in rows]
+        self.review_nums = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        self.histograms = np.array([row[2] for row in rows], dtype=np.int32).reshape(len(rows), RATING_VALUES)
+
+    def __len__(self) -> int:
+        return len(self.book_ids)
+
+    def medians(self) -> np.ndarray:
+        cumulative = np.cumsum(self.histograms, axis=1)
+        lower = self._ratings_at(cumulative, (self.review_nums - 1) // 2)
+        upper = self._ratings_at(cumulative, self.review_nums // 2)
+        return (lower + upper) / 2
+
+    def _ratings_at(self, cumulative: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        return (cumulative <= positions[:, None]).sum(axis=1)
+
+    def weighted_ratings(self, weighting: Dict[str, Any]) -> np.ndarray:
+        max_weighted = weighting["max_weighted_review_num"]
+        review_num_weight = weighting["review_num_rate"] * max_weighted / np.maximum(self.review_nums, max_weighted)
+        return self.medians() * (weighting["base_rate"] + review_num_weight)
+
+
+def top_rated(matrix: RatingMatrix, limit: int, weighting: Dict[str, Any]) -> List[Any]:
+    if len(matrix) == 0:
+        return []
+    scores = matrix.weighted_ratings(weighting)
+    if limit < len(matrix):
+        threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+    ranked = sorted(candidates.tolist(), key=lambda i: (-scores[i], matrix.book_ids[i]))
+    return [matrix.book_ids[i] for i in ranked[:limit]]
@@ -1,16 +1,55 @@
-import statistics
-from typing import Any, Union, Dict, List
+import heapq
+import logging
+import os
+import time
+import uuid
+from typing import Any, Union, Dict, List, Optional, Set, Tuple
 
+import psycopg
 from fastapi import HTTPException
+from psycopg.rows import tuple_row
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-from app.repository.book import BookRepository
-from app.repository.review import ReviewRepository
-from app.repository.user import UserRepository
+from app.metrics import gauge, histogram
+from app.model.bulk import BulkError, BulkResult
+from app.model.row import (
+    BOOK_ROW_COLUMNS, NO_RATING, REVIEW_ROW_COLUMNS, BookRow, RatedBookRow, RatingSummary, ReviewRow, review_row
+)
+from app.repository.book import BookRepository, AsyncBookRepository
+from app.repository.rating import BookRatingRepository, AsyncBookRatingRepository
+from app.repository.review import ReviewRepository, AsyncReviewRepository
+from app.repository.similarity import BookSimilarityRepository, AsyncBookSimilarityRepository
+from app.repository.user import UserRepository, AsyncUserRepository
+from app.service.cache import LoadingCache
+
+logger = logging.getLogger(__name__)
 
 MAX_WEIGHTED_REVIEW_NUM = 10
 REVIEW_NUM_INFLUENCE_RATE = 20
 TOP_RATED_BOOKS_NUM = 5
+MAX_RECOMMENDATIONS_NUM = 100
+REVIEW_COLUMNS = ("book_id", "user_id", "rating", "review")
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv('RECOMMENDATION_CACHE_TTL_SECONDS', 60))
+RECOMMENDATION_ENGINE = os.getenv('RECOMMENDATION_ENGINE', 'python')
+SIMILARITY_NEIGHBORS = int(os.getenv('SIMILARITY_NEIGHBORS', 50))
+SIMILARITY_MIN_SUPPORT = int(os.getenv('SIMILARITY_MIN_SUPPORT', 3))
+SIMILARITY_REBUILD_THRESHOLD = float(os.getenv('SIMILARITY_REBUILD_THRESHOLD', 0.1))
+SIMILARITY_REFRESH_SECONDS = float(os.getenv('SIMILARITY_REFRESH_SECONDS', 300))
+SIMILARITY_INDEX_TTL_SECONDS = float(os.getenv('SIMILARITY_INDEX_TTL_SECONDS', 3600))
+SIMILARITY_INDEX_KEY = "index"
+
+recommendation_cache = LoadingCache("recommendations", ttl_seconds=RECOMMENDATION_CACHE_TTL_SECONDS)
+similarity_cache = LoadingCache("book_similarity", ttl_seconds=SIMILARITY_INDEX_TTL_SECONDS)
+rated_books_count = gauge(
+    "recommendation_rated_books",
+    "Books with ratings considered by the last recommendation ranking"
+)
+similarity_build_seconds = histogram(
+    "similarity_index_build_seconds",
+    "Time to read reviews, build and store the item-item similarity index",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
 
 
 class Review(BaseModel):
@@ -25,13 +64,203 @@ class ReviewService:
         self.review_repository = ReviewRepository()
         self.book_repository = BookRepository()
         self.user_repository = UserRepository()
+        self.rating_repository = BookRatingRepository()
+        self.similarity_repository = BookSimilarityRepository()
+        self.recommendation_cache = recommendation_cache
+        self.similarity_cache = similarity_cache
 
     def add_review(self, user_id: str, review: Review) -> None:
-        if self.review_repository.find_by_user_id_and_book_id(user_id, review.book_id) is not None:
+        with self.review_repository.transaction(pipelined=True):
+            try:
+                self._validate_new_review(review)
+            except Exception:
+                self._check_not_reviewed(user_id, review.book_id)
+                raise
+            created = self.review_repository.create_if_absent(self._review_data(user_id, review))
+            if created is None:
+                self._check_not_reviewed(user_id, review.book_id)
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Book with id '{review.book_id}' not found"
+                )
+            self.rating_repository.add_rating(review.book_id, review.rating)
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    def _check_not_reviewed(self, user_id: str, book_id: Optional[str]) -> None:
+        if self.review_repository.find_by_user_id_and_book_id(user_id, book_id, ("book_id",)) is not None:
             raise HTTPException(
                 status_code=409,
-                detail=f"Review for book {review.book_id} already exists"
+                detail=f"Review for book {book_id} already exists"
+            )
+
+    def add_reviews(self, user_id: str, reviews: List[Tuple[int, Review]]) -> BulkResult:
+        book_ids = self._bulk_book_ids(reviews)
+        reviewed_book_ids = set()
+        existing_book_ids = set()
+        if book_ids:
+            with self.review_repository.primary_reads():
+                reviewed_book_ids = {
+                    str(r["book_id"]) for r in self.review_repository.find_reviewed_book_ids(user_id, book_ids)
+                }
+                existing_book_ids = {
+                    str(b["id"]) for b in self.book_repository.find_all_by_id(book_ids, ("id",))
+                }
+        rows, indices, result = self._plan_bulk_reviews(
+            user_id, reviews, reviewed_book_ids, existing_book_ids
+        )
+        if rows:
+            written_book_ids = {row[0] for row in rows}
+            try:
+                self.review_repository.copy_rows(
+                    REVIEW_COLUMNS,
+                    rows,
+                    after=self.rating_repository.build_refresh_commands(written_book_ids)
+                )
+            except psycopg.Error:
+                logger.exception("Bulk copy of %d reviews failed", len(rows))
+                return self._failed_bulk_reviews(indices, result)
+            result.created = len(rows)
+            self.review_repository.record_write()
+            self.recommendation_cache.invalidate()
+        return result
+
+    def get_review(self, user_id: str, book_id: str) -> ReviewRow:
+        key = self._ensure_book_id(book_id)
+        with self.review_repository.read_your_writes():
+            with self.review_repository.pipeline(read_only=True) as pipeline:
+                book = pipeline.defer(self.book_repository.find_by_id, key, ("id",))
+                review = pipeline.defer(
+                    self.review_repository.find_by_user_id_and_book_id, user_id, key, REVIEW_ROW_COLUMNS, review_row
+                )
+        return self._ensure_review_found(book.result(), review.result(), book_id)
+
+    def _ensure_book_id(self, book_id: str) -> str:
+        key = self._canonical_id(book_id)
+        if key is None:
+            raise HTTPException(status_code=400, detail=f"Book with id '{book_id}' not found")
+        return key
+
+    def _ensure_review_updated(self, updated_reviews: List[Any], book_id: str) -> None:
+        if not updated_reviews:
+            raise HTTPException(status_code=404, detail=f"Review of the book '{book_id}' not found")
+
+    def _ensure_review_found(self, book: Optional[Any], review: Optional[ReviewRow], book_id: str) -> ReviewRow:
+        if book is None:
+            raise HTTPException(status_code=400, detail=f"Book with id '{book_id}' not found")
+        if review is None:
+            raise HTTPException(status_code=404, detail=f"Review of the book '{book_id}' not found")
+        return review
+
+    def get_all_reviews(self, user_id: str) -> List[ReviewRow]:
+        with self.review_repository.read_your_writes():
+            return self.review_repository.find_by_user_id(user_id, REVIEW_ROW_COLUMNS, review_row)
+
+    def update_review(self, user_id: str, book_id: str, updated_review: Review) -> None:
+        with self.review_repository.transaction(pipelined=True):
+            self.get_review(user_id, book_id)
+            updated_fields = self._build_updated_fields(updated_review)
+            updated_reviews = self.review_repository.update_by_user_id_and_book_id(
+                user_id, book_id, updated_fields
             )
+            self._ensure_review_updated(updated_reviews, book_id)
+            for updated in updated_reviews:
+                if updated["old_rating"] != updated["rating"]:
+                    self.rating_repository.remove_rating(book_id, updated["old_rating"])
+                    self.rating_repository.add_rating(book_id, updated["rating"])
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    def delete_review(self, user_id: str, book_id: str) -> None:
+        with self.review_repository.transaction(pipelined=True):
+            deleted_reviews = self.review_repository.delete_by_user_id_and_book_id(user_id, book_id)
+            for deleted in deleted_reviews:
+                self.rating_repository.remove_rating(book_id, deleted["rating"])
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    def rebuild_rating_aggregates(self) -> None:
+        self.rating_repository.rebuild()
+        self.recommendation_cache.invalidate()
+
+    def get_recommendations(self, limit: int = TOP_RATED_BOOKS_NUM) -> list[dict[str, Any]]:
+        self._validate_recommendations_limit(limit)
+        return self.recommendation_cache.get(limit, lambda: self._compute_recommendations(limit))
+
+    def get_recommendation_cache_stats(self) -> Dict[str, float]:
+        return self.recommendation_cache.stats()
+
+    def get_personal_recommendations(self, user_id: str, limit: int = TOP_RATED_BOOKS_NUM) -> list[dict[str, Any]]:
+        self._validate_recommendations_limit(limit)
+        index = self.similarity_cache.get(SIMILARITY_INDEX_KEY, self._load_similarity_index)
+        with self.review_repository.read_your_writes():
+            reviews = self.review_repository.find_by_user_id(user_id, ("book_id", "rating"), tuple_row)
+        book_ids = [] if index is None else index.recommend(reviews, limit)
+        books = self.book_repository.find_all_by_id(book_ids, BOOK_ROW_COLUMNS) if book_ids else []
+        recommended = self._ordered_books(book_ids, books)
+        if len(recommended) < limit:
+            fallback = self.get_recommendations(MAX_RECOMMENDATIONS_NUM)
+            self._fill_recommendations(recommended, reviews, fallback, limit)
+        return recommended
+
+    def refresh_similarity_index(self) -> bool:
+        with self.similarity_repository.pipeline(read_only=True) as pipeline:
+            built = pipeline.defer(self.similarity_repository.find_index_changes)
+            current = pipeline.defer(self.similarity_repository.find_review_changes)
+        if not self._similarity_index_stale(built.result(), current.result()["review_changes"]):
+            return False
+        return self.rebuild_similarity_index()
+
+    def rebuild_similarity_index(self) -> bool:
+        started_at = time.perf_counter()
+        with self.similarity_repository.transaction():
+            if not self.similarity_repository.try_lock()["locked"]:
+                return False
+            review_changes = self.similarity_repository.find_review_changes()["review_changes"]
+            rows = self.similarity_repository.find_packed_ratings()
+        review_num, payload = self._build_similarity_index(rows)
+        del rows
+        with self.similarity_repository.transaction():
+            self.similarity_repository.lock()
+            self.similarity_repository.save_index(review_num, review_changes, payload)
+        similarity_build_seconds.observe(time.perf_counter() - started_at)
+        self.similarity_cache.invalidate()
+        return True
+
+    def _load_similarity_index(self) -> Optional[Any]:
+        row = self.similarity_repository.find_index()
+        return None if row is None else self._read_similarity_index(row["payload"], row["review_num"])
+
+    def get_rated_books(self, books: List[BookRow]) -> List[RatedBookRow]:
+        if not books:
+            return []
+        ratings = self.rating_repository.find_by_book_ids([book.id for book in books])
+        return self._rated_books(books, ratings)
+
+    def _compute_recommendations(self, limit: int) -> list[dict[str, Any]]:
+        if RECOMMENDATION_ENGINE == 'sql':
+            return self.review_repository.find_top_rated_books(limit, self._weighting())
+        top_rated_book_ids = self.top_rated_books(limit)
+        if not top_rated_book_ids:
+            return []
+        books = self.book_repository.find_all_by_id(top_rated_book_ids, BOOK_ROW_COLUMNS)
+        return self._ordered_books(top_rated_book_ids, books)
+
+    def top_rated_books(self, limit: int = TOP_RATED_BOOKS_NUM) -> List[str]:
+        if RECOMMENDATION_ENGINE == 'numpy':
+            all_ratings = self.rating_repository.find_all_rated_columns()
+            return self._rank_top_rated_vectorized(all_ratings, limit)
+        all_ratings = self.rating_repository.find_all_rated()
+        return self._rank_top_rated(all_ratings, limit)
+
+    def _validate_recommendations_limit(self, limit: int) -> None:
+        if limit < 1 or limit > MAX_RECOMMENDATIONS_NUM:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Recommendations limit should be in range [1, {MAX_RECOMMENDATIONS_NUM}]"
+            )
+
+    def _validate_new_review(self, review: Review) -> None:
         if review.book_id is None:
             raise HTTPException(status_code=400, detail="Review should have a book_id")
         if review.rating is None:
@@ -41,35 +270,70 @@ class ReviewService:
                 status_code=400,
                 detail="Review rating should be in range [0, 100]"
             )
-        if len(review.review) > 500:
+        if review.review is not None and len(review.review) > 500:
             raise HTTPException(status_code=400, detail="Review text should not exceed 500 symbols")
-        book = self.book_repository.find_by_id(review.book_id)
-        if book is None:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Book with id '{review.book_id}' not found"
-            )
-        self.review_repository.create({
+
+    def _review_data(self, user_id: str, review: Review) -> Dict[str, Any]:
+        return {
             "book_id": review.book_id,
             "user_id": user_id,
             "rating": review.rating,
             "review": review.review
+        }
+
+    def _bulk_book_ids(self, reviews: List[Tuple[int, Review]]) -> List[str]:
+        return list({
+            book_id for book_id in (self._canonical_id(r.book_id) for _, r in reviews)
+            if book_id is not None
         })
 
-    def get_review(self, user_id: str, book_id: str) -> dict[str, Any]:
-        book = self.book_repository.find_by_id(book_id)
-        if book is None:
-            raise HTTPException(status_code=400, detail=f"Book with id '{book_id}' not found")
-        review = self.review_repository.find_by_user_id_and_book_id(user_id, book_id)
-        if review is None:
-            raise HTTPException(status_code=404, detail=f"Review of the book '{book_id}' not found")
-        return review
+    def _canonical_id(self, entity_id: Optional[str]) -> Optional[str]:
+        if entity_id is None:
+            return None
+        try:
+            return str(uuid.UUID(entity_id))
+        except ValueError:
+            return None
 
-    def get_all_reviews(self, user_id: str) -> list[dict[str, Any]]:
-        return self.review_repository.find_by_user_id(user_id)
+    def _plan_bulk_reviews(
+            self,
+            user_id: str,
+            reviews: List[Tuple[int, Review]],
+            reviewed_book_ids: Set[str],
+            existing_book_ids: Set[str]
+    ) -> Tuple[List[tuple], List[int], BulkResult]:
+        rows = []
+        indices = []
+        result = BulkResult()
+        for index, review in reviews:
+            book_id = self._canonical_id(review.book_id)
+            try:
+                if book_id in reviewed_book_ids:
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Review for book {review.book_id} already exists"
+                    )
+                self._validate_new_review(review)
+                if book_id not in existing_book_ids:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Book with id '{review.book_id}' not found"
+                    )
+            except HTTPException as e:
+                result.errors.append(BulkError(index=index, status_code=e.status_code, detail=e.detail))
+                continue
+            reviewed_book_ids.add(book_id)
+            rows.append((book_id, user_id, review.rating, review.review))
+            indices.append(index)
+        return rows, indices, result
 
-    def update_review(self, user_id: str, book_id: str, updated_review: Review) -> None:
-        self.get_review(user_id, book_id)
+    def _failed_bulk_reviews(self, indices: List[int], result: BulkResult) -> BulkResult:
+        for index in indices:
+            result.errors.append(BulkError(index=index, status_code=500, detail="Failed to write reviews"))
+        result.errors.sort(key=lambda error: error.index)
+        return result
+
+    def _build_updated_fields(self, updated_review: Review) -> Dict[str, Any]:
         updated_fields = {}
         if updated_review.rating is not None:
             if updated_review.rating < 0 or updated_review.rating > 100:
@@ -85,51 +349,299 @@ class ReviewService:
                     detail="Review text should not exceed 500 symbols"
                 )
             updated_fields["review"] = updated_review.review
-        self.review_repository.update_by_user_id_and_book_id(user_id, book_id, updated_fields)
+        return updated_fields
 
-    def delete_review(self, user_id: str, book_id: str) -> None:
-        self.review_repository.delete_by_user_id_and_book_id(user_id, book_id)
-
-    def get_recommendations(self) -> list[dict[str, Any]]:
-        top_rated_book_ids = self.top_rated_books()
-        return self.book_repository.find_all_by_id(top_rated_book_ids)
-
-    def top_rated_books(self) -> List[str]:
-        all_reviews = self.review_repository.find_all()
-        print("All reviews " + str(len(all_reviews)))
-        all_reviews_by_book: Dict[List] = {}
-        for reviews in all_reviews:
-            book_id = reviews["book_id"]
-            if book_id in all_reviews_by_book:
-                all_reviews_by_book[book_id].append(reviews)
-            else:
-                all_reviews_by_book[book_id] = [reviews]
+    def _ordered_books(self, book_ids: List[str], books: List[Dict]) -> List[Dict]:
+        by_id = {str(book["id"]): book for book in books}
+        ordered = (by_id.get(str(book_id)) for book_id in book_ids)
+        return [book for book in ordered if book is not None]
+
+    def _fill_recommendations(
+            self,
+            recommended: List[Dict],
+            reviews: List[tuple],
+            fallback: List[Dict],
+            limit: int
+    ) -> None:
+        excluded = {str(book_id) for book_id, _ in reviews} | {str(book["id"]) for book in recommended}
+        for book in fallback:
+            if len(recommended) >= limit:
+                return
+            if str(book["id"]) not in excluded:
+                recommended.append(book)
+
+    def _similarity_index_stale(self, built: Optional[Dict], review_changes: int) -> bool:
+        if built is None:
+            return review_changes > 0
+        changed = review_changes - built["review_changes"]
+        return changed > SIMILARITY_REBUILD_THRESHOLD * max(built["review_num"], 1)
+
+    def _build_similarity_index(self, rows: List[Tuple[bytes]]) -> Tuple[int, bytes]:
+        from app.service.similarity import Ratings, build_similarity_index
+        ratings = Ratings.from_packed(chunk for chunk, in rows)
+        index = build_similarity_index(ratings, SIMILARITY_NEIGHBORS, SIMILARITY_MIN_SUPPORT)
+        return index.review_num, index.to_bytes()
+
+    def _read_similarity_index(self, payload: bytes, review_num: int) -> Any:
+        from app.service.similarity import SimilarityIndex
+        return SimilarityIndex.from_bytes(payload, review_num)
+
+    def _rank_top_rated_vectorized(self, all_ratings: List[tuple], limit: int) -> List[str]:
+        from app.service.ranking import RatingMatrix, top_rated
+        rated_books_count.set(len(all_ratings))
+        return top_rated(RatingMatrix(all_ratings), limit, self._weighting())
+
+    def _rank_top_rated(self, all_ratings: List[Dict], limit: int) -> List[str]:
+        rated_books_count.set(len(all_ratings))
+        weighting = self._weighting()
         all_books_weighted_rating: List[Dict] = []
-        for book_id, reviews in all_reviews_by_book.items():
-            median_rating = self.__median_rating(reviews)
-            weighted_rating = self.__weighted_rating(median_rating, len(reviews))
+        for book_rating in all_ratings:
+            review_num = book_rating["review_num"]
+            median_rating = self.__median_rating(book_rating["histogram"], review_num)
+            weighted_rating = self.__weighted_rating(median_rating, review_num, weighting)
             all_books_weighted_rating.append(
-                {"book_id": book_id, "value": weighted_rating}
+                {"book_id": book_rating["book_id"], "value": weighted_rating}
             )
-        print("All weighted ratings " + str(len(all_books_weighted_rating)))
-        top_rated_books = sorted(
+        top_rated_books = heapq.nsmallest(
+            limit,
             all_books_weighted_rating,
-            key=lambda r: r["value"],
-            reverse=True
-        )[:TOP_RATED_BOOKS_NUM]
+            key=lambda r: (-r["value"], r["book_id"])
+        )
         return list(map(lambda b: b["book_id"], top_rated_books))
 
-    def __median_rating(self, reviews: List[Dict]):
-        all_ratings = []
-        for review in reviews:
-            all_ratings.append(review["rating"])
-        return statistics.median(all_ratings)
+    def _rated_books(self, books: List[BookRow], ratings: List[Dict]) -> List[RatedBookRow]:
+        weighting = self._weighting()
+        summaries = {
+            rating["book_id"]: self._rating_summary(rating["histogram"], rating["review_num"], weighting)
+            for rating in ratings
+        }
+        return [
+            RatedBookRow(book.id, book.title, book.description, summaries.get(book.id, NO_RATING))
+            for book in books
+        ]
 
-    def __weighted_rating(self, rating: int, review_num: int):
-        base_rate = (100 - REVIEW_NUM_INFLUENCE_RATE) / 100
-        review_num_dependant_rate = 1 - base_rate
+    def _rating_summary(self, histogram: List[int], review_num: int, weighting: Dict[str, Any]) -> RatingSummary:
+        if review_num == 0:
+            return NO_RATING
+        median_rating = self.__median_rating(histogram, review_num)
+        return RatingSummary(
+            review_num=review_num,
+            mean=sum(rating * count for rating, count in enumerate(histogram)) / review_num,
+            median=median_rating,
+            weighted_rating=self.__weighted_rating(median_rating, review_num, weighting)
+        )
+
+    def __median_rating(self, histogram: List[int], review_num: int):
+        lower = self.__rating_at(histogram, (review_num - 1) // 2)
+        if review_num % 2 == 1:
+            return lower
+        upper = self.__rating_at(histogram, review_num // 2)
+        return (lower + upper) / 2
+
+    def __rating_at(self, histogram: List[int], position: int) -> int:
+        seen = 0
+        for rating, count in enumerate(histogram):
+            seen += count
+            if seen > position:
+                return rating
+        raise ValueError(f"Rating histogram has less than {position + 1} reviews")
+
+    def __weighted_rating(self, rating: int, review_num: int, weighting: Dict[str, Any]):
         return rating * (
-                base_rate
-                + review_num_dependant_rate
+                weighting["base_rate"]
+                + weighting["review_num_rate"]
                 * MAX_WEIGHTED_REVIEW_NUM / max(review_num, MAX_WEIGHTED_REVIEW_NUM)
         )
+
+    def _weighting(self) -> Dict[str, Any]:
+        base_rate = (100 - REVIEW_NUM_INFLUENCE_RATE) / 100
+        return {
+            "base_rate": base_rate,
+            "review_num_rate": 1 - base_rate,
+            "max_weighted_review_num": MAX_WEIGHTED_REVIEW_NUM
+        }
+
+
+class AsyncReviewService(ReviewService):
+
+    def __init__(self):
+        self.review_repository = AsyncReviewRepository()
+        self.book_repository = AsyncBookRepository()
+        self.user_repository = AsyncUserRepository()
+        self.rating_repository = AsyncBookRatingRepository()
+        self.similarity_repository = AsyncBookSimilarityRepository()
+        self.recommendation_cache = recommendation_cache
+        self.similarity_cache = similarity_cache
+
+    async def add_review(self, user_id: str, review: Review) -> None:
+        async with self.review_repository.transaction(pipelined=True):
+            try:
+                self._validate_new_review(review)
+            except Exception:
+                await self._check_not_reviewed(user_id, review.book_id)
+                raise
+            created = await self.review_repository.create_if_absent(self._review_data(user_id, review))
+            if created is None:
+                await self._check_not_reviewed(user_id, review.book_id)
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Book with id '{review.book_id}' not found"
+                )
+            await self.rating_repository.add_rating(review.book_id, review.rating)
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    async def _check_not_reviewed(self, user_id: str, book_id: Optional[str]) -> None:
+        if await self.review_repository.find_by_user_id_and_book_id(user_id, book_id, ("book_id",)) is not None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Review for book {book_id} already exists"
+            )
+
+    async def add_reviews(self, user_id: str, reviews: List[Tuple[int, Review]]) -> BulkResult:
+        book_ids = self._bulk_book_ids(reviews)
+        reviewed_book_ids = set()
+        existing_book_ids = set()
+        if book_ids:
+            with self.review_repository.primary_reads():
+                reviewed_book_ids = {
+                    str(r["book_id"]) for r in await self.review_repository.find_reviewed_book_ids(user_id, book_ids)
+                }
+                existing_book_ids = {
+                    str(b["id"]) for b in await self.book_repository.find_all_by_id(book_ids, ("id",))
+                }
+        rows, indices, result = self._plan_bulk_reviews(
+            user_id, reviews, reviewed_book_ids, existing_book_ids
+        )
+        if rows:
+            written_book_ids = {row[0] for row in rows}
+            try:
+                await self.review_repository.copy_rows(
+                    REVIEW_COLUMNS,
+                    rows,
+                    after=self.rating_repository.build_refresh_commands(written_book_ids)
+                )
+            except psycopg.Error:
+                logger.exception("Bulk copy of %d reviews failed", len(rows))
+                return self._failed_bulk_reviews(indices, result)
+            result.created = len(rows)
+            self.review_repository.record_write()
+            self.recommendation_cache.invalidate()
+        return result
+
+    async def get_review(self, user_id: str, book_id: str) -> ReviewRow:
+        key = self._ensure_book_id(book_id)
+        with self.review_repository.read_your_writes():
+            async with self.review_repository.pipeline(read_only=True) as pipeline:
+                book = await pipeline.defer(self.book_repository.find_by_id, key, ("id",))
+                review = await pipeline.defer(
+                    self.review_repository.find_by_user_id_and_book_id, user_id, key, REVIEW_ROW_COLUMNS, review_row
+                )
+        return self._ensure_review_found(book.result(), review.result(), book_id)
+
+    async def get_all_reviews(self, user_id: str) -> List[ReviewRow]:
+        with self.review_repository.read_your_writes():
+            return await self.review_repository.find_by_user_id(user_id, REVIEW_ROW_COLUMNS, review_row)
+
+    async def update_review(self, user_id: str, book_id: str, updated_review: Review) -> None:
+        async with self.review_repository.transaction(pipelined=True):
+            await self.get_review(user_id, book_id)
+            updated_fields = self._build_updated_fields(updated_review)
+            updated_reviews = await self.review_repository.update_by_user_id_and_book_id(
+                user_id, book_id, updated_fields
+            )
+            self._ensure_review_updated(updated_reviews, book_id)
+            for updated in updated_reviews:
+                if updated["old_rating"] != updated["rating"]:
+                    await self.rating_repository.remove_rating(book_id, updated["old_rating"])
+                    await self.rating_repository.add_rating(book_id, updated["rating"])
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    async def delete_review(self, user_id: str, book_id: str) -> None:
+        async with self.review_repository.transaction(pipelined=True):
+            deleted_reviews = await self.review_repository.delete_by_user_id_and_book_id(user_id, book_id)
+            for deleted in deleted_reviews:
+                await self.rating_repository.remove_rating(book_id, deleted["rating"])
+        self.review_repository.record_write()
+        self.recommendation_cache.invalidate()
+
+    async def rebuild_rating_aggregates(self) -> None:
+        await self.rating_repository.rebuild()
+        self.recommendation_cache.invalidate()
+
+    async def get_recommendations(self, limit: int = TOP_RATED_BOOKS_NUM) -> list[dict[str, Any]]:
+        self._validate_recommendations_limit(limit)
+        return await self.recommendation_cache.aget(limit, lambda: self._compute_recommendations(limit))
+
+    async def get_recommendation_cache_stats(self) -> Dict[str, float]:
+        return self.recommendation_cache.stats()
+
+    async def get_personal_recommendations(
+            self,
+            user_id: str,
+            limit: int = TOP_RATED_BOOKS_NUM
+    ) -> list[dict[str, Any]]:
+        self._validate_recommendations_limit(limit)
+        index = await self.similarity_cache.aget(SIMILARITY_INDEX_KEY, self._load_similarity_index)
+        with self.review_repository.read_your_writes():
+            reviews = await self.review_repository.find_by_user_id(user_id, ("book_id", "rating"), tuple_row)
+        book_ids = [] if index is None else index.recommend(reviews, limit)
+        books = await self.book_repository.find_all_by_id(book_ids, BOOK_ROW_COLUMNS) if book_ids else []
+        recommended = self._ordered_books(book_ids, books)
+        if len(recommended) < limit:
+            fallback = await self.get_recommendations(MAX_RECOMMENDATIONS_NUM)
+            self._fill_recommendations(recommended, reviews, fallback, limit)
+        return recommended
+
+    async def refresh_similarity_index(self) -> bool:
+        async with self.similarity_repository.pipeline(read_only=True) as pipeline:
+            built = await pipeline.defer(self.similarity_repository.find_index_changes)
+            current = await pipeline.defer(self.similarity_repository.find_review_changes)
+        if not self._similarity_index_stale(built.result(), current.result()["review_changes"]):
+            return False
+        return await self.rebuild_similarity_index()
+
+    async def rebuild_similarity_index(self) -> bool:
+        started_at = time.perf_counter()
+        async with self.similarity_repository.transaction():
+            if not (await self.similarity_repository.try_lock())["locked"]:
+                return False
+            review_changes = (await self.similarity_repository.find_review_changes())["review_changes"]
+            rows = await self.similarity_repository.find_packed_ratings()
+        review_num, payload = await run_in_threadpool(self._build_similarity_index, rows)
+        del rows
+        async with self.similarity_repository.transaction():
+            await self.similarity_repository.lock()
+            await self.similarity_repository.save_index(review_num, review_changes, payload)
+        similarity_build_seconds.observe(time.perf_counter() - started_at)
+        self.similarity_cache.invalidate()
+        return True
+
+    async def _load_similarity_index(self) -> Optional[Any]:
+        row = await self.similarity_repository.find_index()
+        if row is None:
+            return None
+        return await run_in_threadpool(self._read_similarity_index, row["payload"], row["review_num"])
+
+    async def get_rated_books(self, books: List[BookRow]) -> List[RatedBookRow]:
+        if not books:
+            return []
+        ratings = await self.rating_repository.find_by_book_ids([book.id for book in books])
+        return self._rated_books(books, ratings)
+
+    async def _compute_recommendations(self, limit: int) -> list[dict[str, Any]]:
+        if RECOMMENDATION_ENGINE == 'sql':
+            return await self.review_repository.find_top_rated_books(limit, self._weighting())
+        top_rated_book_ids = await self.top_rated_books(limit)
+        if not top_rated_book_ids:
+            return []
+        books = await self.book_repository.find_all_by_id(top_rated_book_ids, BOOK_ROW_COLUMNS)
+        return self._ordered_books(top_rated_book_ids, books)
+
+    async def top_rated_books(self, limit: int = TOP_RATED_BOOKS_NUM) -> List[str]:
+        if RECOMMENDATION_ENGINE == 'numpy':
+            all_ratings = await self.rating_repository.find_all_rated_columns()
+            return self._rank_top_rated_vectorized(all_ratings, limit)
+        all_ratings = await self.rating_repository.find_all_rated()
+        return self._rank_top_rated(all_ratings, limit)
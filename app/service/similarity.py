@@ -0,0 +1,195 @@
+import io
+from typing import Iterable, List, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+RATING_RECORD = np.dtype([("user_id", "V16"), ("book_id", "V16"), ("rating", ">i4")])
+BUILD_BLOCK_PAIRS = 4_000_000
+DENSE_BLOCK_CELLS = 16_000_000
+MIN_DENSE_BLOCK_BOOKS = 64
+
+
+class Ratings:
+
+    def __init__(self, user_ids: np.ndarray, book_ids: np.ndarray, ratings: np.ndarray):
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self.ratings = ratings
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    @classmethod
+    def from_packed(cls, chunks: Iterable[bytes]) -> "Ratings":
+        records = np.frombuffer(b"".join(chunks), dtype=RATING_RECORD)
+        return cls(records["user_id"], records["book_id"], records["rating"])
+
+
+class SimilarityIndex:
+
+    def __init__(
+            self,
+            book_ids: np.ndarray,
+            indptr: np.ndarray,
+            neighbors: np.ndarray,
+            similarities: np.ndarray,
+            review_num: int = 0
+    ):
+        self.book_ids = book_ids
+        self.indptr = indptr
+        self.neighbors = neighbors
+        self.similarities = similarities
+        self.review_num = review_num
+
+    def __len__(self) -> int:
+        return len(self.book_ids)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            book_ids=self.book_ids,
+            indptr=self.indptr,
+            neighbors=self.neighbors,
+            similarities=self.similarities
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, review_num: int) -> "SimilarityIndex":
+        with np.load(io.BytesIO(payload)) as arrays:
+            return cls(
+                arrays["book_ids"],
+                arrays["indptr"],
+                arrays["neighbors"],
+                arrays["similarities"],
+                review_num
+            )
+
+    def recommend(self, rated: Sequence[Tuple[UUID, int]], limit: int) -> List[str]:
+        if not rated or len(self) == 0:
+            return []
+        keys = np.frombuffer(b"".join(book_id.bytes for book_id, _ in rated), dtype="V16")
+        positions = np.minimum(np.searchsorted(self.book_ids, keys), len(self) - 1)
+        found = self.book_ids[positions] == keys
+        books = positions[found]
+        weights = np.fromiter((rating for _, rating in rated), dtype=np.float32, count=len(rated))[found] / 100
+        starts = self.indptr[books]
+        sizes = self.indptr[books + 1] - starts
+        if sizes.sum() == 0:
+            return []
+        edges = _ranges(starts, sizes)
+        candidates, inverse = np.unique(self.neighbors[edges], return_inverse=True)
+        scores = np.bincount(inverse, weights=self.similarities[edges] * np.repeat(weights, sizes))
+        unrated = ~np.isin(candidates, books)
+        candidates, scores = candidates[unrated], scores[unrated]
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        ranked = np.lexsort((candidates, -scores))
+        return [str(UUID(bytes=self.book_ids[i].tobytes())) for i in candidates[ranked]]
+
+
+def build_similarity_index(ratings: Ratings, neighbors: int, min_support: int) -> SimilarityIndex:
+    book_ids, books = np.unique(ratings.book_ids, return_inverse=True)
+    book_num = len(book_ids)
+    _, users = np.unique(ratings.user_ids, return_inverse=True)
+    user_sizes = np.bincount(users)
+    kept = user_sizes[users] > 1
+    users, books, values = users[kept], books[kept], ratings.ratings[kept].astype(np.float64)
+
+    by_user = np.argsort(users, kind="stable")
+    users, books, values = users[by_user], books[by_user].astype(np.int64), values[by_user]
+    user_sizes = np.bincount(users, minlength=len(user_sizes))
+    user_starts = np.cumsum(user_sizes) - user_sizes
+    means = np.bincount(users, weights=values, minlength=len(user_sizes)) / np.maximum(user_sizes, 1)
+    centered = values - means[users]
+    norms = np.sqrt(np.bincount(books, weights=centered ** 2, minlength=book_num))
+
+    by_book = np.argsort(books, kind="stable")
+    book_starts = np.concatenate(([0], np.cumsum(np.bincount(books, minlength=book_num))))
+    pair_starts = np.concatenate(([0], np.cumsum(np.bincount(books, weights=user_sizes[users], minlength=book_num))))
+
+    dense_block_books = DENSE_BLOCK_CELLS // max(book_num, 1)
+
+    rows: List[np.ndarray] = []
+    columns: List[np.ndarray] = []
+    similarities: List[np.ndarray] = []
+    first_book = 0
+    while first_book < book_num:
+        end_book = int(np.searchsorted(pair_starts, pair_starts[first_book] + BUILD_BLOCK_PAIRS, side="right")) - 1
+        if dense_block_books >= MIN_DENSE_BLOCK_BOOKS:
+            end_book = min(end_book, first_book + dense_block_books)
+        end_book = min(max(end_book, first_book + 1), book_num)
+        row, column, similarity = _similarity_block(
+            by_book[book_starts[first_book]:book_starts[end_book]], first_book, end_book,
+            users, books, centered, user_starts, user_sizes, norms, neighbors, min_support
+        )
+        rows.append(row)
+        columns.append(column)
+        similarities.append(similarity)
+        first_book = end_book
+
+    row = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(row, minlength=book_num)))).astype(np.int64)
+    return SimilarityIndex(
+        book_ids,
+        indptr,
+        (np.concatenate(columns) if columns else np.empty(0, dtype=np.int64)).astype(np.int32),
+        (np.concatenate(similarities) if similarities else np.empty(0)).astype(np.float32),
+        len(ratings)
+    )
+
+
+def _similarity_block(
+        positions: np.ndarray,
+        first_book: int,
+        end_book: int,
+        users: np.ndarray,
+        books: np.ndarray,
+        centered: np.ndarray,
+        user_starts: np.ndarray,
+        user_sizes: np.ndarray,
+        norms: np.ndarray,
+        neighbors: int,
+        min_support: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    book_num = len(norms)
+    counts = user_sizes[users[positions]]
+    left = np.repeat(positions, counts)
+    right = _ranges(user_starts[users[positions]], counts)
+    distinct = books[left] != books[right]
+    left, right = left[distinct], right[distinct]
+    keys = (books[left] - first_book) * book_num + books[right]
+    products = centered[left] * centered[right]
+
+    cells = (end_book - first_book) * book_num
+    if cells <= DENSE_BLOCK_CELLS:
+        support = np.bincount(keys, minlength=cells)
+        dots = np.bincount(keys, weights=products, minlength=cells)
+        keys = np.flatnonzero(support)
+        dots, support = dots[keys], support[keys]
+    else:
+        keys, inverse = np.unique(keys, return_inverse=True)
+        dots = np.bincount(inverse, weights=products)
+        support = np.bincount(inverse)
+
+    row = keys // book_num + first_book
+    column = keys % book_num
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarity = dots / (norms[row] * norms[column])
+    kept = (support >= min_support) & (similarity > 0)
+    row, column, similarity = row[kept], column[kept], similarity[kept]
+
+    order = np.lexsort((column, -similarity, row))
+    row, column, similarity = row[order], column[order], similarity[order]
+    row_starts = np.searchsorted(row, row)
+    top = np.arange(len(row)) - row_starts < neighbors
+    return row[top], column[top], similarity[top]
+
+
+def _ranges(starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    total = int(sizes.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return np.repeat(starts, sizes) + offsets
@@ -0,0 +1,120 @@
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from uuid import UUID
+
+from app.api.bulk import BULK_CHUNK_SIZE
+from app.service.book import Book, BookService
+from app.service.review import Review, ReviewService
+from bench.common import print_results, write_results
+from bench.datagen import TITLE_WORDS
+
+TITLE_MARKER = "bench-bulk"
+COMPARISONS = (("books.add_book", "books.add_books.copy"), ("reviews.add_review", "reviews.add_reviews.copy"))
+
+
+def chunks(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def timed_rows(results: Dict[str, Dict[str, Any]], name: str, rows: int, call: Callable[[], Any]) -> Any:
+    started_at = time.perf_counter()
+    value = call()
+    elapsed = time.perf_counter() - started_at
+    results[name] = {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else 0.0}
+    return value
+
+
+def new_books(rng: random.Random, rows: int) -> List[Tuple[int, Book]]:
+    return [
+        (index, Book(title=f"{TITLE_MARKER} {' '.join(rng.sample(TITLE_WORDS, 3))}", description="bulk benchmark"))
+        for index in range(rows)
+    ]
+
+
+def add_books_per_row(service: BookService, books: List[Tuple[int, Book]]) -> List[UUID]:
+    return [service.add_book(book) for _, book in books]
+
+
+def add_books_copy(service: BookService, books: List[Tuple[int, Book]], chunk_size: int) -> List[UUID]:
+    book_ids: List[UUID] = []
+    for chunk in chunks(books, chunk_size):
+        result = service.add_books(chunk)
+        if result.errors:
+            raise RuntimeError(f"Bulk book insert failed: {result.errors[0].detail}")
+        book_ids.extend(result.book_ids.values())
+    return book_ids
+
+
+def add_reviews_per_row(service: ReviewService, user_id: str, reviews: List[Tuple[int, Review]]) -> None:
+    for _, review in reviews:
+        service.add_review(user_id, review)
+
+
+def add_reviews_copy(
+        service: ReviewService,
+        user_id: str,
+        reviews: List[Tuple[int, Review]],
+        chunk_size: int
+) -> None:
+    for chunk in chunks(reviews, chunk_size):
+        result = service.add_reviews(user_id, chunk)
+        if result.errors:
+            raise RuntimeError(f"Bulk review insert failed: {result.errors[0].detail}")
+
+
+def run(rows: int, chunk_size: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(seed)
+    book_service = BookService()
+    review_service = ReviewService()
+    reviewer = book_service.repository.execute_query_one("SELECT id FROM users.identity LIMIT 1")
+    if reviewer is None:
+        raise RuntimeError("No users to write reviews as, run bench.datagen first")
+    user_id = str(reviewer["id"])
+    results: Dict[str, Dict[str, Any]] = {}
+    book_ids: List[UUID] = []
+    try:
+        book_ids.extend(timed_rows(
+            results, "books.add_book", rows, lambda: add_books_per_row(book_service, new_books(rng, rows))
+        ))
+        book_ids.extend(timed_rows(
+            results, "books.add_books.copy", rows,
+            lambda: add_books_copy(book_service, new_books(rng, rows), chunk_size)
+        ))
+        reviews = [
+            (index, Review(book_id=str(book_id), rating=rng.randint(0, 100), review="bulk benchmark"))
+            for index, book_id in enumerate(book_ids)
+        ]
+        timed_rows(
+            results, "reviews.add_review", rows, lambda: add_reviews_per_row(review_service, user_id, reviews[:rows])
+        )
+        timed_rows(
+            results, "reviews.add_reviews.copy", rows,
+            lambda: add_reviews_copy(review_service, user_id, reviews[rows:], chunk_size)
+        )
+    finally:
+        for chunk in chunks(book_ids, chunk_size):
+            book_service.repository.execute_command(
+                "DELETE FROM catalog.book WHERE id = ANY(%(ids)s)", {"ids": chunk}
+            )
+    for per_row, copy in COMPARISONS:
+        results[copy]["speedup"] = results[copy]["rows_per_second"] / results[per_row]["rows_per_second"]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-row inserts against COPY bulk inserts of books and reviews")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows written by each method")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Rows per COPY, as in */bulk")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench/results/bulk.json")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.chunk_size, args.seed)
+    print_results(results)
+    write_results(args.output, "bulk", results, {"rows": args.rows, "chunk_size": args.chunk_size})
+
+
+if __name__ == "__main__":
+    main()
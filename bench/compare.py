@@ -0,0 +1,58 @@
+import argparse
+import json
+import shutil
+import sys
+from typing import Dict, List
+
+LOWER_IS_BETTER = ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "cpu_ms", "peak_alloc_kb")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in current["results"].items():
+        expected = baseline["results"].get(name)
+        if expected is None:
+            print(f"{name:56} no baseline")
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metric not in result or metric not in expected or not expected[metric]:
+                continue
+            change = (result[metric] - expected[metric]) / expected[metric]
+            worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+            marker = "REGRESSION" if worse else ""
+            print(
+                f"{name:56} {metric:14} {expected[metric]:12.2f} -> {result[metric]:12.2f} "
+                f"({change:+.1%}) {marker}"
+            )
+            if worse:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare benchmark results with a stored baseline")
+    parser.add_argument("results")
+    parser.add_argument("baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative change")
+    parser.add_argument("--update-baseline", action="store_true", help="Store results as the new baseline")
+    args = parser.parse_args()
+
+    if args.update_baseline:
+        shutil.copyfile(args.results, args.baseline)
+        print(f"Baseline {args.baseline} updated")
+        return
+
+    regressions = compare(load(args.baseline), load(args.results), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import random
+import time
+import uuid
+from typing import List
+
+import psycopg
+from passlib.context import CryptContext
+from psycopg import sql
+
+from app.repository.db import DB_CONNINFO
+from app.repository.rating import REBUILD_QUERY
+
+BENCH_PASSWORD = "bench-password"
+BENCH_USERNAME_PREFIX = "bench_user_"
+REVIEW_TEXTS = (
+    "Excellent book, highly recommended!",
+    "Good read, but could be better",
+    "Average quality",
+    "Not my favorite"
+)
+
+TITLE_WORDS = (
+    "silent", "river", "golden", "shadow", "winter", "garden", "broken", "crown", "hidden", "empire",
+    "distant", "star", "lost", "city", "crimson", "sea", "iron", "forest", "secret", "harbor",
+    "northern", "light", "ancient", "road", "burning", "sky", "quiet", "storm", "wild", "heart",
+    "glass", "tower", "last", "kingdom", "pale", "horizon", "second", "voyage", "bitter", "orchard",
+    "hollow", "mountain", "velvet", "night", "scarlet", "letter", "endless", "summer", "frozen", "valley",
+    "little", "prince", "dark", "water", "paper", "moon", "salt", "bridge", "long", "journey",
+    "emerald", "island", "stone", "song"
+)
+
+
+def book_title(n: int) -> str:
+    first = TITLE_WORDS[n % len(TITLE_WORDS)]
+    second = TITLE_WORDS[n // len(TITLE_WORDS) % len(TITLE_WORDS)]
+    return f"{first.capitalize()} {second} {n}"
+
+
+def review_counts(books: int, users: int, reviews: int, skew: float) -> List[int]:
+    weights = [1 / (rank + 1) ** skew for rank in range(books)]
+    total_weight = sum(weights)
+    counts = [min(users, int(reviews * weight / total_weight)) for weight in weights]
+    remainder = reviews - sum(counts)
+    rank = 0
+    while remainder > 0 and rank < books:
+        extra = min(users - counts[rank], remainder)
+        counts[rank] += extra
+        remainder -= extra
+        rank += 1
+    return counts
+
+
+def random_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def generate(users: int, books: int, reviews: int, skew: float, seed: int, truncate: bool) -> None:
+    rng = random.Random(seed)
+    secret_hash = CryptContext(schemes=["bcrypt"]).hash(BENCH_PASSWORD)
+    user_ids = [random_uuid(rng) for _ in range(users)]
+    book_ids = [random_uuid(rng) for _ in range(books)]
+    counts = review_counts(books, users, reviews, skew)
+    rng.shuffle(book_ids)
+
+    started_at = time.perf_counter()
+    with psycopg.connect(DB_CONNINFO) as conn:
+        with conn.cursor() as cursor:
+            if truncate:
+                cursor.execute("TRUNCATE users.identity, catalog.book CASCADE")
+            with cursor.copy("COPY users.identity (id, username, secret_hash) FROM STDIN") as copy:
+                for n, user_id in enumerate(user_ids):
+                    copy.write_row((user_id, f"{BENCH_USERNAME_PREFIX}{n}", secret_hash))
+            with cursor.copy("COPY catalog.book (id, title, description) FROM STDIN") as copy:
+                for n, book_id in enumerate(book_ids):
+                    copy.write_row((book_id, book_title(n), REVIEW_TEXTS[n % len(REVIEW_TEXTS)]))
+            with cursor.copy("COPY catalog.book_review (book_id, user_id, rating, review) FROM STDIN") as copy:
+                for book_id, count in zip(book_ids, counts):
+                    for user_index in rng.sample(range(users), count):
+                        copy.write_row((
+                            book_id,
+                            user_ids[user_index],
+                            rng.randint(0, 100),
+                            rng.choice(REVIEW_TEXTS)
+                        ))
+            cursor.execute("DELETE FROM catalog.book_rating")
+            cursor.execute(REBUILD_QUERY.format(sql.SQL("TRUE")))
+            cursor.execute("ANALYZE")
+    print(
+        f"Generated {users} users, {books} books, {sum(counts)} reviews "
+        f"(max {max(counts, default=0)} per book) in {time.perf_counter() - started_at:.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Populate the database with benchmark data")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of reviews per book")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="Remove existing users and books first")
+    args = parser.parse_args()
+    generate(args.users, args.books, args.reviews, args.skew, args.seed, args.truncate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+import psycopg
+
+from app.main import app
+from app.repository.db import DB_CONNINFO
+from bench.common import print_results, summarize, write_results
+from bench.datagen import BENCH_PASSWORD, BENCH_USERNAME_PREFIX
+
+HOT_BOOKS_NUM = 10
+
+Scenario = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+class LoadContext:
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.book_ids: List[str] = []
+        self.auth_headers: Dict[str, str] = {}
+        self.username = f"{BENCH_USERNAME_PREFIX}0"
+
+    async def prepare(self, client: httpx.AsyncClient) -> None:
+        with psycopg.connect(DB_CONNINFO) as conn:
+            rows = conn.execute("SELECT id FROM catalog.book ORDER BY random() LIMIT 1000").fetchall()
+        self.book_ids = [str(row[0]) for row in rows]
+        response = await self.authenticate(client)
+        if response.status_code != 200:
+            raise RuntimeError(f"Cannot authenticate {self.username}, run bench.datagen first")
+        self.auth_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def authenticate(self, client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.post("/auth", data={"username": self.username, "password": BENCH_PASSWORD})
+
+    def scenarios(self) -> Dict[str, Scenario]:
+        return {
+            "books_page": lambda client: client.get("/books/", params={"limit": 100}),
+            "book_by_id": lambda client: client.get(f"/books/{self.rng.choice(self.book_ids)}"),
+            "hot_book_by_id": lambda client: client.get(f"/books/{self.rng.choice(self.book_ids[:HOT_BOOKS_NUM])}"),
+            "reviews": lambda client: client.get("/reviews/", headers=self.auth_headers),
+            "recommendations": lambda client: client.get("/recommendations"),
+            "auth": self.authenticate
+        }
+
+
+async def run_scenario(
+        client: httpx.AsyncClient,
+        scenario: Scenario,
+        requests: int,
+        concurrency: int
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started_at = time.perf_counter()
+            response = await scenario(client)
+            latencies.append(time.perf_counter() - started_at)
+            if response.status_code >= 400:
+                errors += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    return summarize(latencies, elapsed, errors)
+
+
+async def measure_allocations(client: httpx.AsyncClient, scenario: Scenario, requests: int) -> float:
+    tracemalloc.start()
+    for _ in range(requests):
+        await scenario(client)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+async def run(names: List[str], requests: int, concurrency: int, seed: int) -> Dict[str, Dict[str, float]]:
+    context = LoadContext(seed)
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await context.prepare(client)
+            scenarios = context.scenarios()
+            for name in names:
+                scenario_requests = max(concurrency, requests // 10) if name == "auth" else requests
+                await run_scenario(client, scenarios[name], concurrency, concurrency)
+                results[name] = await run_scenario(client, scenarios[name], scenario_requests, concurrency)
+                results[name]["peak_alloc_kb"] = await measure_allocations(client, scenarios[name], 5)
+    return results
+
+
+def main() -> None:
+    scenario_names = list(LoadContext(0).scenarios())
+    parser = argparse.ArgumentParser(description="Drive load against app.main:app in-process over ASGI")
+    parser.add_argument("--scenario", action="append", choices=scenario_names)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario (auth runs 1/10)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench/results/load.json")
+    args = parser.parse_args()
+
+    names = args.scenario or scenario_names
+    results = asyncio.run(run(names, args.requests, args.concurrency, args.seed))
+    print_results(results)
+    write_results(args.output, "load", results, {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from psycopg import sql
+
+from app.repository.book import BookRepository
+from app.repository.review import ReviewRepository
+from app.service.review import ReviewService
+from bench.common import print_results, summarize, write_results
+from bench.datagen import TITLE_WORDS
+
+BENCHMARKS: Dict[str, Callable[["MicroContext"], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def register(factory: Callable[["MicroContext"], Callable[[], object]]):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+class MicroContext:
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.book_repository = BookRepository()
+        self.review_repository = ReviewRepository()
+        self.review_service = ReviewService()
+        reviews = self.review_repository.execute_query(
+            "SELECT book_id, user_id FROM catalog.book_review ORDER BY random() LIMIT 1000"
+        )
+        self.review_keys = [(str(r["user_id"]), str(r["book_id"])) for r in reviews]
+        self.book_ids = [book_id for _, book_id in self.review_keys]
+
+    def search_text(self) -> str:
+        return " ".join(self.rng.sample(TITLE_WORDS, 2))
+
+    def review_key(self):
+        return self.rng.choice(self.review_keys)
+
+
+@benchmark("review_service.top_rated_books")
+def top_rated_books(context: MicroContext):
+    return context.review_service.top_rated_books
+
+
+@benchmark("base_repository.find_by_id")
+def find_by_id(context: MicroContext):
+    return lambda: context.book_repository.find_by_id(context.rng.choice(context.book_ids))
+
+
+@benchmark("base_repository.find_by_id.uncached")
+def find_by_id_uncached(context: MicroContext):
+    def call():
+        query = sql.SQL("SELECT * FROM {} WHERE id = %(id)s").format(sql.Identifier("catalog", "book"))
+        return context.book_repository.execute_query_one(
+            query, {"id": context.rng.choice(context.book_ids)}, prepare=False
+        )
+    return call
+
+
+@benchmark("base_repository.find_page")
+def find_page(context: MicroContext):
+    return lambda: context.book_repository.find_page(100)
+
+
+@benchmark("book_repository.search")
+def search(context: MicroContext):
+    return lambda: context.book_repository.search(context.search_text(), 20, columns=("id", "title"))
+
+
+@benchmark("book_repository.search.unindexed")
+def search_unindexed(context: MicroContext):
+    def call():
+        query = sql.SQL(
+            "SELECT id, title FROM catalog.book, websearch_to_tsquery('simple', %(text)s) AS q(query) "
+            "WHERE to_tsvector('simple', title || ' ' || coalesce(description, '')) @@ q.query "
+            "ORDER BY ts_rank_cd(to_tsvector('simple', title || ' ' || coalesce(description, '')), q.query) DESC, id "
+            "LIMIT 20"
+        ).format()
+        return context.book_repository.execute_query(query, {"text": context.search_text()}, prepare=False)
+    return call
+
+
+@benchmark("book_repository.find_by_title_prefix")
+def find_by_title_prefix(context: MicroContext):
+    return lambda: context.book_repository.find_by_title_prefix(
+        context.rng.choice(TITLE_WORDS)[:3], 20, columns=("id", "title")
+    )
+
+
+@benchmark("review_repository.find_by_user_id")
+def find_by_user_id(context: MicroContext):
+    return lambda: context.review_repository.find_by_user_id(context.review_key()[0])
+
+
+@benchmark("review_repository.find_by_user_id_and_book_id")
+def find_by_user_id_and_book_id(context: MicroContext):
+    return lambda: context.review_repository.find_by_user_id_and_book_id(*context.review_key())
+
+
+@benchmark("review_repository.find_by_user_id_and_book_id.uncached")
+def find_by_user_id_and_book_id_uncached(context: MicroContext):
+    def call():
+        user_id, book_id = context.review_key()
+        query = sql.SQL(
+            "SELECT * FROM catalog.book_review WHERE book_id = %(book_id)s AND user_id = %(user_id)s"
+        ).format()
+        return context.review_repository.execute_query_one(
+            query, {"book_id": book_id, "user_id": user_id}, prepare=False
+        )
+    return call
+
+
+def run_benchmark(call: Callable[[], object], iterations: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        call()
+    latencies: List[float] = []
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    for _ in range(iterations):
+        call_started_at = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_started_at)
+    cpu = time.process_time() - cpu_started_at
+    elapsed = time.perf_counter() - started_at
+
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(latencies, elapsed)
+    result["cpu_ms"] = cpu * 1000 / iterations
+    result["peak_alloc_kb"] = peak / 1024
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of services and repositories")
+    parser.add_argument("--benchmark", action="append", choices=list(BENCHMARKS))
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench/results/micro.json")
+    args = parser.parse_args()
+
+    context = MicroContext(args.seed)
+    results = {}
+    for name in args.benchmark or list(BENCHMARKS):
+        iterations = max(1, args.iterations // 50) if name == "review_service.top_rated_books" else args.iterations
+        results[name] = run_benchmark(BENCHMARKS[name](context), iterations, min(args.warmup, iterations))
+    print_results(results)
+    write_results(args.output, "micro", results, {
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "seed": args.seed
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from app.main import app
+from bench.common import print_results, summarize, write_results
+
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+def query_count(response: httpx.Response) -> int:
+    match = QUERIES_PATTERN.search(response.headers.get("server-timing", ""))
+    if match is None:
+        raise RuntimeError("No query count in Server-Timing, run with DB_INSTRUMENTATION=true")
+    return int(match.group(1))
+
+
+async def rated_page(client: httpx.AsyncClient, limit: int) -> Tuple[int, int]:
+    response = await client.get("/books/", params={"limit": limit, "include_rating": "true"})
+    return query_count(response), len(response.json())
+
+
+async def page_then_book_ratings(client: httpx.AsyncClient, limit: int) -> Tuple[int, int]:
+    response = await client.get("/books/", params={"limit": limit})
+    queries = query_count(response)
+    books = response.json()
+    for book in books:
+        queries += query_count(await client.get(f"/books/{book['id']}", params={"include_rating": "true"}))
+    return queries, len(books)
+
+
+async def measure(client: httpx.AsyncClient, scenario, limit: int, iterations: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    queries = set()
+    books = 0
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        page_queries, books = await scenario(client, limit)
+        latencies.append(time.perf_counter() - started_at)
+        queries.add(page_queries)
+    result = summarize(latencies, sum(latencies))
+    result["books"] = books
+    result["queries"] = max(queries)
+    return result
+
+
+async def run(limits: List[int], iterations: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for limit in limits:
+                results[f"books_rated.{limit}"] = await measure(client, rated_page, limit, iterations)
+                results[f"books_per_book_rating.{limit}"] = await measure(
+                    client, page_then_book_ratings, limit, max(1, iterations // 10)
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Queries per page of GET /books with rating summaries")
+    parser.add_argument("--limit", type=int, action="append", help="Page sizes, by default 10, 50 and 100")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", default="bench/results/queries.json")
+    args = parser.parse_args()
+
+    limits = args.limit or [10, 50, 100]
+    results = asyncio.run(run(limits, args.iterations))
+    print_results(results)
+    write_results(args.output, "queries", results, {"limits": limits, "iterations": args.iterations})
+    rated_queries = {results[f"books_rated.{limit}"]["queries"] for limit in limits}
+    if len(rated_queries) > 1:
+        print(f"Query count depends on the page size: {sorted(rated_queries)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+os.environ["DB_POOL_MIN_SIZE"] = os.environ["DB_POOL_MAX_SIZE"] = "1"
+
+import httpx
+import psycopg
+from psycopg import pq
+
+from app.main import app
+from app.repository.async_db import async_pools
+from app.repository.db import DB_CONNINFO, sync_pools
+from app.service.provider import is_async_mode
+from bench.common import write_results
+from bench.datagen import BENCH_PASSWORD, BENCH_USERNAME_PREFIX
+
+Request = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+
+class Tracer:
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(mode="w+")
+
+    def attach(self, conn: Any) -> None:
+        conn.pgconn.trace(self.file.fileno())
+        conn.pgconn.set_trace_flags(pq.Trace.SUPPRESS_TIMESTAMPS | pq.Trace.REGRESS_MODE)
+
+    def reset(self) -> None:
+        self.file.seek(0)
+        self.file.truncate()
+
+    def round_trips(self) -> Tuple[int, int]:
+        self.file.seek(0)
+        directions = [line.split("\t", 1)[0] for line in self.file.read().splitlines() if line]
+        round_trips = sum(
+            1 for previous, current in zip(["B"] + directions, directions) if previous == "B" and current == "F"
+        )
+        return round_trips, directions.count("F")
+
+
+async def attach_tracer(tracer: Tracer) -> None:
+    if is_async_mode():
+        pool, _ = await async_pools.get(False)
+        conn = await pool.getconn()
+        tracer.attach(conn)
+        await pool.putconn(conn)
+    else:
+        pool, _ = sync_pools.get(False)
+        conn = pool.getconn()
+        tracer.attach(conn)
+        pool.putconn(conn)
+
+
+def bench_requests(user_id: str) -> List[Request]:
+    with psycopg.connect(DB_CONNINFO) as conn:
+        book_id = str(conn.execute("SELECT id FROM catalog.book ORDER BY id LIMIT 1").fetchone()[0])
+        reviewed_book_id = str(conn.execute(
+            "SELECT book_id FROM catalog.book_review WHERE user_id = %s ORDER BY book_id LIMIT 1", (user_id,)
+        ).fetchone()[0])
+        new_book_id = str(conn.execute(
+            "SELECT id FROM catalog.book b WHERE NOT EXISTS "
+            "(SELECT 1 FROM catalog.book_review r WHERE r.book_id = b.id AND r.user_id = %s) ORDER BY id LIMIT 1",
+            (user_id,)
+        ).fetchone()[0])
+    return [
+        ("GET /books/{id}", "GET", f"/books/{book_id}", None),
+        ("GET /books/{id}?include_rating", "GET", f"/books/{book_id}?include_rating=true", None),
+        ("GET /books", "GET", "/books/?limit=10", None),
+        ("GET /books?include_rating", "GET", "/books/?limit=10&include_rating=true", None),
+        ("PATCH /books/{id}", "PATCH", f"/books/{book_id}", {"description": "round trips"}),
+        ("GET /reviews/{book_id}", "GET", f"/reviews/{reviewed_book_id}", None),
+        ("GET /reviews", "GET", "/reviews/", None),
+        ("PATCH /reviews/{book_id}", "PATCH", f"/reviews/{reviewed_book_id}", {"rating": None}),
+        ("POST /reviews", "POST", "/reviews/", {"book_id": new_book_id, "rating": 50, "review": "round trips"}),
+        ("DELETE /reviews/{book_id}", "DELETE", f"/reviews/{new_book_id}", None),
+        ("GET /recommendations", "GET", "/recommendations", None)
+    ]
+
+
+async def run(runs: int) -> Dict[str, Dict[str, float]]:
+    tracer = Tracer()
+    results: Dict[str, Dict[str, float]] = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            username = f"{BENCH_USERNAME_PREFIX}0"
+            response = await client.post("/auth", data={"username": username, "password": BENCH_PASSWORD})
+            if response.status_code != 200:
+                raise RuntimeError(f"Cannot authenticate {username}, run bench.datagen first")
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            with psycopg.connect(DB_CONNINFO) as conn:
+                user_id = str(conn.execute(
+                    "SELECT id FROM users.identity WHERE username = %s", (username,)
+                ).fetchone()[0])
+            requests = bench_requests(user_id)
+            await attach_tracer(tracer)
+            for run_index in range(runs + 1):
+                for name, method, url, body in requests:
+                    if body is not None and "rating" in body and body["rating"] is None:
+                        body = {"rating": 40 + run_index % 2}
+                    tracer.reset()
+                    response = await client.request(method, url, json=body, headers=headers)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text}")
+                    round_trips, messages = tracer.round_trips()
+                    if run_index > 0:
+                        result = results.setdefault(name, {"round_trips": 0, "messages": 0})
+                        result["round_trips"] = max(result["round_trips"], round_trips)
+                        result["messages"] = max(result["messages"], messages)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Client-server round trips per endpoint, from a libpq trace")
+    parser.add_argument("--runs", type=int, default=3, help="Measured runs after one warm-up run")
+    parser.add_argument("--output", default="bench/results/roundtrips.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.runs))
+    for name, result in results.items():
+        print(f"{name:40} round_trips={result['round_trips']} messages={result['messages']}")
+    write_results(args.output, "roundtrips", results, {"runs": args.runs})
+
+
+if __name__ == "__main__":
+    main()
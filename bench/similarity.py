@@ -0,0 +1,106 @@
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from psycopg.rows import tuple_row
+
+from app.service.review import SIMILARITY_MIN_SUPPORT, SIMILARITY_NEIGHBORS, ReviewService
+from app.service.similarity import Ratings, SimilarityIndex, build_similarity_index
+from bench.common import print_results, summarize, write_results
+
+
+def timed(results: Dict[str, Dict[str, Any]], name: str, call, *args: Any) -> Any:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    value = call(*args)
+    elapsed = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results[name] = {"seconds": elapsed, "peak_mb": peak / 2 ** 20}
+    return value
+
+
+def sample_users(service: ReviewService, users: int, seed: int) -> List[str]:
+    rows = service.review_repository.execute_query(
+        "SELECT DISTINCT user_id FROM catalog.book_review"
+    )
+    user_ids = [str(row["user_id"]) for row in rows]
+    random.Random(seed).shuffle(user_ids)
+    return user_ids[:users]
+
+
+def run(requests: int, users: int, limit: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    service = ReviewService()
+    results: Dict[str, Dict[str, Any]] = {}
+    service.similarity_repository.find_index_changes()
+
+    rows = timed(results, "find_packed_ratings", service.similarity_repository.find_packed_ratings)
+    results["find_packed_ratings"]["chunks"] = len(rows)
+    ratings = timed(results, "unpack_ratings", Ratings.from_packed, [chunk for chunk, in rows])
+    results["unpack_ratings"]["reviews"] = len(ratings)
+    index = timed(
+        results, "build_index", build_similarity_index, ratings, SIMILARITY_NEIGHBORS, SIMILARITY_MIN_SUPPORT
+    )
+    results["build_index"]["books"] = len(index)
+    results["build_index"]["edges"] = len(index.neighbors)
+    payload = timed(results, "serialize_index", index.to_bytes)
+    results["serialize_index"]["mb"] = len(payload) / 2 ** 20
+    timed(results, "deserialize_index", SimilarityIndex.from_bytes, payload, index.review_num)
+    del rows, ratings, payload
+
+    started_at = time.perf_counter()
+    if not service.rebuild_similarity_index():
+        raise RuntimeError("Similarity index is being rebuilt by another process")
+    results["rebuild_similarity_index"] = {"seconds": time.perf_counter() - started_at}
+
+    user_ids = sample_users(service, users, seed)
+    rng = random.Random(seed)
+    service.get_personal_recommendations(user_ids[0], limit)
+    latencies: List[float] = []
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        user_id = rng.choice(user_ids)
+        request_started_at = time.perf_counter()
+        service.get_personal_recommendations(user_id, limit)
+        latencies.append(time.perf_counter() - request_started_at)
+    results["get_personal_recommendations"] = summarize(latencies, time.perf_counter() - started_at)
+
+    reviews = [
+        service.review_repository.find_by_user_id(user_id, ("book_id", "rating"), tuple_row)
+        for user_id in user_ids
+    ]
+    latencies = []
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        rated = rng.choice(reviews)
+        request_started_at = time.perf_counter()
+        index.recommend(rated, limit)
+        latencies.append(time.perf_counter() - request_started_at)
+    results["similarity_index.recommend"] = summarize(latencies, time.perf_counter() - started_at)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Item-item similarity index build time, size and serving latency")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=1000, help="Distinct reviewers to request recommendations for")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench/results/similarity.json")
+    args = parser.parse_args()
+
+    results = run(args.requests, args.users, args.limit, args.seed)
+    print_results(results)
+    write_results(args.output, "similarity", results, {
+        "requests": args.requests,
+        "users": args.users,
+        "limit": args.limit,
+        "neighbors": SIMILARITY_NEIGHBORS,
+        "min_support": SIMILARITY_MIN_SUPPORT
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from bench.common import print_results, summarize, write_results
+
+PHASES = ("import", "lifespan", "first_request", "second_request")
+
+
+async def measure_startup(path: str) -> Dict[str, float]:
+    started_at = time.perf_counter()
+    import httpx
+    from app.main import app
+    timings = {"import": time.perf_counter() - started_at}
+
+    started_at = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["lifespan"] = time.perf_counter() - started_at
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for phase in ("first_request", "second_request"):
+                started_at = time.perf_counter()
+                response = await client.get(path)
+                timings[phase] = time.perf_counter() - started_at
+                if response.status_code >= 400:
+                    raise RuntimeError(f"GET {path} returned {response.status_code}")
+    return timings
+
+
+def run_child(path: str) -> Dict[str, float]:
+    output = subprocess.check_output(
+        [sys.executable, "-m", "bench.startup", "--child", "--path", path],
+        text=True
+    )
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold start benchmark: import, lifespan and first requests")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/books/?limit=10")
+    parser.add_argument("--output", default="bench/results/startup.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure_startup(args.path))))
+        return
+
+    latencies: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    for _ in range(args.runs):
+        for phase, seconds in run_child(args.path).items():
+            latencies[phase].append(seconds)
+    results = {f"startup.{phase}": summarize(values, sum(values)) for phase, values in latencies.items()}
+    print_results(results)
+    write_results(args.output, "startup", results, {"runs": args.runs, "path": args.path})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+CREATE TABLE IF NOT EXISTS catalog.book_rating
+(
+    book_id    uuid PRIMARY KEY REFERENCES catalog.book (id) ON DELETE CASCADE,
+    review_num int4   NOT NULL DEFAULT 0,
+    -- histogram[rating + 1] holds the number of reviews with the given rating
+    histogram  int4[] NOT NULL DEFAULT array_fill(0, ARRAY [101]),
+    CHECK (review_num >= 0)
+);
+
+INSERT INTO catalog.book_rating (book_id, review_num, histogram)
+WITH rating_counts AS (
+    SELECT book_id, rating, count(*)::int4 AS review_num
+    FROM catalog.book_review
+    GROUP BY book_id, rating
+)
+SELECT
+    b.book_id,
+    sum(coalesce(c.review_num, 0))::int4,
+    array_agg(coalesce(c.review_num, 0) ORDER BY r.rating)
+FROM (SELECT DISTINCT book_id FROM rating_counts) AS b
+CROSS JOIN generate_series(0, 100) AS r(rating)
+LEFT JOIN rating_counts c ON c.book_id = b.book_id AND c.rating = r.rating
+GROUP BY b.book_id;
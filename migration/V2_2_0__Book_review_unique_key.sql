@@ -0,0 +1,25 @@
+DELETE FROM catalog.book_review r
+USING catalog.book_review d
+WHERE r.user_id = d.user_id
+  AND r.book_id = d.book_id
+  AND r.ctid > d.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS book_review_user_id_book_id_key
+    ON catalog.book_review (user_id, book_id);
+
+DELETE FROM catalog.book_rating;
+
+INSERT INTO catalog.book_rating (book_id, review_num, histogram)
+WITH rating_counts AS (
+    SELECT book_id, rating, count(*)::int4 AS review_num
+    FROM catalog.book_review
+    GROUP BY book_id, rating
+)
+SELECT
+    b.book_id,
+    sum(coalesce(c.review_num, 0))::int4,
+    array_agg(coalesce(c.review_num, 0) ORDER BY r.rating)
+FROM (SELECT DISTINCT book_id FROM rating_counts) AS b
+CROSS JOIN generate_series(0, 100) AS r(rating)
+LEFT JOIN rating_counts c ON c.book_id = b.book_id AND c.rating = r.rating
+GROUP BY b.book_id;
@@ -0,0 +1,11 @@
+-- book_review (user_id, book_id) is covered by book_review_user_id_book_id_key,
+-- which also serves lookups by user_id alone.
+CREATE INDEX IF NOT EXISTS book_review_book_id_idx
+    ON catalog.book_review (book_id);
+
+-- Serves exact title lookups together with the keyset pagination by id.
+CREATE INDEX IF NOT EXISTS book_title_id_idx
+    ON catalog.book (title, id);
+
+ANALYZE catalog.book;
+ANALYZE catalog.book_review;
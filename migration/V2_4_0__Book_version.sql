@@ -0,0 +1,32 @@
+ALTER TABLE catalog.book
+    ADD COLUMN IF NOT EXISTS version    int8        NOT NULL DEFAULT 1,
+    ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+-- Single row counter bumped by every statement that changes catalog.book,
+-- so book lists can be revalidated without reading them.
+CREATE TABLE IF NOT EXISTS catalog.book_catalog_version
+(
+    id      boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version int8    NOT NULL
+);
+
+INSERT INTO catalog.book_catalog_version (version)
+VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION catalog.bump_book_catalog_version() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    UPDATE catalog.book_catalog_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_catalog_version ON catalog.book;
+
+CREATE TRIGGER book_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+    ON catalog.book
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.bump_book_catalog_version();
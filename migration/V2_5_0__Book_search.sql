@@ -0,0 +1,18 @@
+-- Title and description words for full-text search. The 'simple' configuration
+-- does not stem, so it works the same for titles in any language.
+ALTER TABLE catalog.book
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED;
+
+CREATE INDEX IF NOT EXISTS book_search_vector_idx
+    ON catalog.book USING gin (search_vector);
+
+-- Case-insensitive title prefix lookups in title order together with the keyset
+-- pagination by id. The "C" collation lets LIKE 'prefix%' use the index as a range.
+CREATE INDEX IF NOT EXISTS book_lower_title_id_idx
+    ON catalog.book ((lower(title) COLLATE "C"), id);
+
+ANALYZE catalog.book;
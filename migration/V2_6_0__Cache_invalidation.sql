@@ -0,0 +1,56 @@
+-- Change events for the in-process caches of every application worker,
+-- published on commit to the cache_invalidation channel.
+CREATE OR REPLACE FUNCTION catalog.notify_recommendations_changed() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', '{"cache": "recommendations"}');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_cache_invalidation ON catalog.book;
+
+CREATE TRIGGER book_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+    ON catalog.book
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+DROP TRIGGER IF EXISTS book_review_cache_invalidation ON catalog.book_review;
+
+CREATE TRIGGER book_review_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+    ON catalog.book_review
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+DROP TRIGGER IF EXISTS book_rating_cache_invalidation ON catalog.book_rating;
+
+CREATE TRIGGER book_rating_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+    ON catalog.book_rating
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE OR REPLACE FUNCTION users.notify_identity_changed() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('cache_invalidation', json_build_object('cache', 'users', 'key', OLD.username)::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('cache_invalidation', json_build_object('cache', 'users', 'key', NEW.username)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS identity_cache_invalidation ON users.identity;
+
+CREATE TRIGGER identity_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE
+    ON users.identity
+    FOR EACH ROW
+EXECUTE FUNCTION users.notify_identity_changed();
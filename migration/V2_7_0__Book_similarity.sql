@@ -0,0 +1,27 @@
+-- Single row with the serialized item-item similarity index used by /recommendations/me.
+-- review_num is the number of reviews the index was built from, so workers can tell
+-- how far the reviews have drifted since the last build.
+CREATE TABLE IF NOT EXISTS catalog.book_similarity_index
+(
+    id         boolean     PRIMARY KEY DEFAULT TRUE CHECK (id),
+    review_num int8        NOT NULL,
+    built_at   timestamptz NOT NULL DEFAULT now(),
+    payload    bytea       NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION catalog.notify_book_similarity_changed() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', '{"cache": "book_similarity"}');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_similarity_cache_invalidation ON catalog.book_similarity_index;
+
+CREATE TRIGGER book_similarity_cache_invalidation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE
+    ON catalog.book_similarity_index
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_book_similarity_changed();
@@ -0,0 +1,54 @@
+-- The catalog version becomes a sequence: bumping it no longer takes a row lock
+-- held until commit, so concurrent book writes and bulk imports do not queue
+-- behind each other. Statements that change no rows leave the version alone.
+CREATE SEQUENCE IF NOT EXISTS catalog.book_catalog_version_seq;
+
+SELECT setval('catalog.book_catalog_version_seq', version)
+FROM catalog.book_catalog_version;
+
+-- setval WAL-logs the exact value, so replicas see every bump; nextval alone
+-- logs values in batches of 32 ahead.
+CREATE OR REPLACE FUNCTION catalog.bump_book_catalog_version() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT FROM changed_rows) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    PERFORM setval('catalog.book_catalog_version_seq', nextval('catalog.book_catalog_version_seq'));
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_catalog_version ON catalog.book;
+
+CREATE TRIGGER book_catalog_version_insert
+    AFTER INSERT
+    ON catalog.book
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.bump_book_catalog_version();
+
+CREATE TRIGGER book_catalog_version_update
+    AFTER UPDATE
+    ON catalog.book
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.bump_book_catalog_version();
+
+CREATE TRIGGER book_catalog_version_delete
+    AFTER DELETE
+    ON catalog.book
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.bump_book_catalog_version();
+
+CREATE TRIGGER book_catalog_version_truncate
+    AFTER TRUNCATE
+    ON catalog.book
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.bump_book_catalog_version();
+
+DROP TABLE IF EXISTS catalog.book_catalog_version;
@@ -0,0 +1,146 @@
+-- Cache invalidation notifications only for statements that changed rows:
+-- per-event statement triggers see the affected rows through transition tables,
+-- TRUNCATE (which has none) keeps its own trigger.
+CREATE OR REPLACE FUNCTION catalog.notify_recommendations_changed() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT FROM changed_rows) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    PERFORM pg_notify('cache_invalidation', '{"cache": "recommendations"}');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_cache_invalidation ON catalog.book;
+
+CREATE TRIGGER book_cache_invalidation_insert
+    AFTER INSERT
+    ON catalog.book
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_cache_invalidation_update
+    AFTER UPDATE
+    ON catalog.book
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_cache_invalidation_delete
+    AFTER DELETE
+    ON catalog.book
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_cache_invalidation_truncate
+    AFTER TRUNCATE
+    ON catalog.book
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+DROP TRIGGER IF EXISTS book_review_cache_invalidation ON catalog.book_review;
+
+CREATE TRIGGER book_review_cache_invalidation_insert
+    AFTER INSERT
+    ON catalog.book_review
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_review_cache_invalidation_update
+    AFTER UPDATE
+    ON catalog.book_review
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_review_cache_invalidation_delete
+    AFTER DELETE
+    ON catalog.book_review
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_review_cache_invalidation_truncate
+    AFTER TRUNCATE
+    ON catalog.book_review
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+DROP TRIGGER IF EXISTS book_rating_cache_invalidation ON catalog.book_rating;
+
+CREATE TRIGGER book_rating_cache_invalidation_insert
+    AFTER INSERT
+    ON catalog.book_rating
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_rating_cache_invalidation_update
+    AFTER UPDATE
+    ON catalog.book_rating
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_rating_cache_invalidation_delete
+    AFTER DELETE
+    ON catalog.book_rating
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE TRIGGER book_rating_cache_invalidation_truncate
+    AFTER TRUNCATE
+    ON catalog.book_rating
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_recommendations_changed();
+
+CREATE OR REPLACE FUNCTION catalog.notify_book_similarity_changed() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT FROM changed_rows) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    PERFORM pg_notify('cache_invalidation', '{"cache": "book_similarity"}');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_similarity_cache_invalidation ON catalog.book_similarity_index;
+
+CREATE TRIGGER book_similarity_cache_invalidation_insert
+    AFTER INSERT
+    ON catalog.book_similarity_index
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_book_similarity_changed();
+
+CREATE TRIGGER book_similarity_cache_invalidation_update
+    AFTER UPDATE
+    ON catalog.book_similarity_index
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_book_similarity_changed();
+
+CREATE TRIGGER book_similarity_cache_invalidation_delete
+    AFTER DELETE
+    ON catalog.book_similarity_index
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_book_similarity_changed();
+
+CREATE TRIGGER book_similarity_cache_invalidation_truncate
+    AFTER TRUNCATE
+    ON catalog.book_similarity_index
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.notify_book_similarity_changed();
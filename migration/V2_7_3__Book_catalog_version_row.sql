@@ -0,0 +1,29 @@
+-- Back to a transactional version row: a sequence bump is visible to readers
+-- before the writing transaction commits, so an ETag could be built from the
+-- new version and the old rows. Statements that change no rows still skip
+-- the bump, so only real catalog writes take the row lock.
+CREATE TABLE IF NOT EXISTS catalog.book_catalog_version
+(
+    id      boolean PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version int8    NOT NULL
+);
+
+INSERT INTO catalog.book_catalog_version (version)
+SELECT last_value FROM catalog.book_catalog_version_seq
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION catalog.bump_book_catalog_version() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT FROM changed_rows) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    UPDATE catalog.book_catalog_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+DROP SEQUENCE IF EXISTS catalog.book_catalog_version_seq;
@@ -0,0 +1,65 @@
+-- Counts review rows written (inserted, rated or deleted), so the similarity index
+-- can tell how far the reviews have drifted since its build even when the number
+-- of reviews stays the same. A sequence takes no row lock, so concurrent review
+-- writes do not queue behind the counter; values used by rolled back writes are
+-- not returned, which at worst makes the next rebuild come a little early.
+CREATE SEQUENCE IF NOT EXISTS catalog.book_review_change_seq;
+
+SELECT setval('catalog.book_review_change_seq', count(*))
+FROM catalog.book_review
+HAVING count(*) > 0;
+
+ALTER TABLE catalog.book_similarity_index
+    ADD COLUMN IF NOT EXISTS review_changes int8 NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION catalog.count_book_review_changes() RETURNS trigger
+    LANGUAGE plpgsql AS
+$$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM nextval('catalog.book_review_change_seq') FROM catalog.book_review;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM nextval('catalog.book_review_change_seq')
+        FROM old_rows AS o
+                 JOIN changed_rows AS n ON n.user_id = o.user_id AND n.book_id = o.book_id
+        WHERE n.rating IS DISTINCT FROM o.rating;
+    ELSE
+        PERFORM nextval('catalog.book_review_change_seq') FROM changed_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS book_review_changes_insert ON catalog.book_review;
+DROP TRIGGER IF EXISTS book_review_changes_update ON catalog.book_review;
+DROP TRIGGER IF EXISTS book_review_changes_delete ON catalog.book_review;
+DROP TRIGGER IF EXISTS book_review_changes_truncate ON catalog.book_review;
+
+CREATE TRIGGER book_review_changes_insert
+    AFTER INSERT
+    ON catalog.book_review
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.count_book_review_changes();
+
+-- Only rows whose rating changed count: text edits do not move the index.
+CREATE TRIGGER book_review_changes_update
+    AFTER UPDATE
+    ON catalog.book_review
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.count_book_review_changes();
+
+CREATE TRIGGER book_review_changes_delete
+    AFTER DELETE
+    ON catalog.book_review
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.count_book_review_changes();
+
+-- The rows are gone after TRUNCATE, so they are counted before it.
+CREATE TRIGGER book_review_changes_truncate
+    BEFORE TRUNCATE
+    ON catalog.book_review
+    FOR EACH STATEMENT
+EXECUTE FUNCTION catalog.count_book_review_changes();
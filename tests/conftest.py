@@ -0,0 +1,75 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import psycopg
+import pytest
+from psycopg import sql
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+TEST_DATABASE_DSN = os.getenv('TEST_DATABASE_DSN')
+TEST_DB_NAME = os.getenv('TEST_DB_NAME', 'library_test')
+MIGRATION_DIR = Path(__file__).resolve().parent.parent / "migration"
+MIGRATION_VERSION = re.compile(r"^V([0-9_]+)__")
+
+if TEST_DATABASE_DSN:
+    _dsn_params = conninfo_to_dict(TEST_DATABASE_DSN)
+    os.environ.update({
+        "DB_HOST": str(_dsn_params.get("host", "localhost")),
+        "DB_PORT": str(_dsn_params.get("port", 5432)),
+        "DB_USER": str(_dsn_params.get("user", "postgres")),
+        "DB_PASSWORD": str(_dsn_params.get("password", "")),
+        "DB_NAME": TEST_DB_NAME
+    })
+    TEST_CONNINFO = make_conninfo(TEST_DATABASE_DSN, dbname=TEST_DB_NAME)
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("SIMILARITY_REFRESH_SECONDS", "0")
+
+
+def migration_version(path: Path) -> Tuple[int, ...]:
+    return tuple(int(part) for part in MIGRATION_VERSION.match(path.name).group(1).split("_"))
+
+
+def migrations() -> List[Path]:
+    return sorted(MIGRATION_DIR.glob("V*.sql"), key=migration_version)
+
+
+def recreate_database(drop_only: bool = False) -> None:
+    with psycopg.connect(TEST_DATABASE_DSN, autocommit=True) as conn:
+        conn.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(TEST_DB_NAME)))
+        if not drop_only:
+            conn.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(TEST_DB_NAME)))
+
+
+@pytest.fixture(scope="session")
+def database() -> Iterator[str]:
+    if not TEST_DATABASE_DSN:
+        pytest.skip("TEST_DATABASE_DSN is not set")
+    recreate_database()
+    with psycopg.connect(TEST_CONNINFO, autocommit=True) as conn:
+        for path in migrations():
+            conn.execute(path.read_text())
+    try:
+        yield TEST_CONNINFO
+    finally:
+        from app.repository.db import sync_pools
+        sync_pools.close()
+        recreate_database(drop_only=True)
+
+
+@pytest.fixture
+def db(database: str) -> Iterator[psycopg.Connection]:
+    with psycopg.connect(database, autocommit=True) as conn:
+        yield conn
+
+
+@pytest.fixture
+def empty_catalog(db: psycopg.Connection) -> psycopg.Connection:
+    from app.service.cache import invalidate_all_caches
+    db.execute(
+        "TRUNCATE catalog.book_review, catalog.book_rating, catalog.book_similarity_index, "
+        "catalog.book, users.identity CASCADE"
+    )
+    invalidate_all_caches()
+    return db
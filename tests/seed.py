@@ -0,0 +1,34 @@
+import uuid
+from typing import List, Sequence, Tuple
+
+import psycopg
+
+
+def insert_books(db: psycopg.Connection, count: int, title: str = "Book") -> List[str]:
+    book_ids = [str(uuid.uuid4()) for _ in range(count)]
+    with db.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO catalog.book (id, title, description) VALUES (%s, %s, %s)",
+            [(book_id, f"{title} {n}", f"Description {n}") for n, book_id in enumerate(book_ids)]
+        )
+    return book_ids
+
+
+def insert_users(db: psycopg.Connection, count: int) -> List[str]:
+    user_ids = [str(uuid.uuid4()) for _ in range(count)]
+    with db.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO users.identity (id, username, secret_hash) VALUES (%s, %s, 'x')",
+            [(user_id, f"user_{user_id}") for user_id in user_ids]
+        )
+    return user_ids
+
+
+def insert_reviews(db: psycopg.Connection, reviews: Sequence[Tuple[str, str, int]]) -> None:
+    with db.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO catalog.book_review (book_id, user_id, rating, review) VALUES (%s, %s, %s, 'test')",
+            reviews
+        )
+    from app.repository.rating import BookRatingRepository
+    BookRatingRepository().rebuild()
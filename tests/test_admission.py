@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.admission import EXPENSIVE, INTERACTIVE, AdmissionController, AdmissionRejected
+from app.middleware import AdmissionControlMiddleware
+
+
+async def serve(controller: AdmissionController, priority, service_seconds: float) -> None:
+    await controller.acquire(priority)
+    controller.release(priority, service_seconds)
+
+
+def test_slow_expensive_requests_do_not_shed_interactive_ones():
+    async def main():
+        controller = AdmissionController(max_concurrency=1, queue_size=10)
+        for _ in range(5):
+            await serve(controller, EXPENSIVE, 4.0)
+            await serve(controller, INTERACTIVE, 0.01)
+        await controller.acquire(INTERACTIVE)
+        waiter = asyncio.create_task(controller.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        controller.release(INTERACTIVE, 0.01)
+        await waiter
+        controller.release(INTERACTIVE, 0.01)
+
+    asyncio.run(main())
+
+
+def test_expected_wait_counts_each_queued_class_at_its_own_service_time():
+    async def main():
+        controller = AdmissionController(max_concurrency=1, queue_size=10)
+        await serve(controller, EXPENSIVE, 4.0)
+        await serve(controller, INTERACTIVE, 0.01)
+        await controller.acquire(INTERACTIVE)
+        waiter = asyncio.create_task(controller.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(EXPENSIVE)
+        assert controller._expected_wait(INTERACTIVE) == pytest.approx(0.02)
+        assert controller._expected_wait(EXPENSIVE) == pytest.approx(4.01)
+        controller.release(INTERACTIVE, 0.01)
+        await waiter
+        controller.release(INTERACTIVE, 0.01)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("path,query_string,recorded", [
+    ("/books", b"stream=true", False),
+    ("/books/bulk", b"", False),
+    ("/books", b"", True),
+])
+def test_streaming_and_bulk_durations_are_not_recorded(path, query_string, recorded):
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.01)
+
+    async def main():
+        controller = AdmissionController(max_concurrency=1, queue_size=10)
+        method = "POST" if path.endswith("/bulk") else "GET"
+        scope = {"type": "http", "method": method, "path": path, "query_string": query_string}
+        await AdmissionControlMiddleware(app, controller)(scope, None, None)
+        return controller._service_seconds[EXPENSIVE.name]
+
+    assert (asyncio.run(main()) > 0) == recorded
@@ -0,0 +1,97 @@
+import asyncio
+from typing import List, Optional
+
+import httpx
+import psycopg
+import pytest
+from fastapi import HTTPException
+
+from app.main import app
+from app.repository.async_db import async_pools
+from app.service.book import AsyncBookService, BookFilter, BookPage, BookService, encode_cursor
+
+FILTERS = {
+    "title_prefix": BookFilter(title_prefix="alp"),
+    "search": BookFilter(search="needle")
+}
+
+
+@pytest.fixture
+def paged_catalog(empty_catalog: psycopg.Connection) -> psycopg.Connection:
+    with empty_catalog.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO catalog.book (id, title, description) VALUES (gen_random_uuid(), %s, %s)",
+            [(f"Alpha {n:02}", "needle " * (n % 3 + 1)) for n in range(10)]
+        )
+    return empty_catalog
+
+
+def page(book_filter: BookFilter, limit: int, after: Optional[str] = None) -> BookPage:
+    return BookService().get_books(book_filter, limit, after)
+
+
+async def async_page(book_filter: BookFilter, limit: int, after: Optional[str] = None) -> BookPage:
+    try:
+        return await AsyncBookService().get_books(book_filter, limit, after)
+    finally:
+        await async_pools.close()
+
+
+def ids(books) -> List[str]:
+    return [str(book.id) for book in books]
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_pages_cover_the_whole_result_in_order(paged_catalog, name):
+    book_filter = FILTERS[name]
+    expected = ids(page(book_filter, 100).books)
+    assert len(expected) == 10
+    seen, cursor = [], None
+    while True:
+        current = page(book_filter, 3, cursor)
+        seen.extend(ids(current.books))
+        if current.next_cursor is None:
+            break
+        cursor = current.next_cursor
+    assert seen == expected
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_deleting_the_cursor_book_does_not_end_pagination(paged_catalog, name):
+    book_filter = FILTERS[name]
+    expected = ids(page(book_filter, 100).books)
+    first = page(book_filter, 3)
+    paged_catalog.execute("DELETE FROM catalog.book WHERE id = %s", (first.books[-1].id,))
+    assert ids(page(book_filter, 3, first.next_cursor).books) == expected[3:6]
+    assert ids(asyncio.run(async_page(book_filter, 3, first.next_cursor)).books) == expected[3:6]
+
+
+def test_renaming_the_cursor_book_does_not_end_pagination(paged_catalog):
+    book_filter = FILTERS["title_prefix"]
+    expected = ids(page(book_filter, 100).books)
+    first = page(book_filter, 3)
+    paged_catalog.execute("UPDATE catalog.book SET title = 'Renamed' WHERE id = %s", (first.books[-1].id,))
+    assert ids(page(book_filter, 3, first.next_cursor).books) == expected[3:6]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(1.5, "not-a-uuid")])
+def test_invalid_cursor_is_rejected(paged_catalog, cursor):
+    with pytest.raises(HTTPException) as error:
+        page(FILTERS["title_prefix"], 3, cursor)
+    assert error.value.status_code == 400
+
+
+def test_api_returns_next_cursor_header(paged_catalog):
+    async def main():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                first = await client.get("/books/", params={"title_prefix": "alp", "limit": 6})
+                second = await client.get(
+                    "/books/", params={"title_prefix": "alp", "limit": 6, "after": first.headers["x-next-cursor"]}
+                )
+        return first, second
+
+    first, second = asyncio.run(main())
+    titles = [book["title"] for book in first.json() + second.json()]
+    assert titles == [f"Alpha {n:02}" for n in range(10)]
+    assert "x-next-cursor" not in second.headers
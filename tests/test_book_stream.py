@@ -0,0 +1,61 @@
+import asyncio
+import gc
+import inspect
+
+import psycopg
+import pytest
+
+from app.api.book import ClosingStreamingResponse, to_ndjson
+from app.repository.async_db import async_pools
+from app.service.book import AsyncBookService, BookFilter, BookService
+from seed import insert_books
+
+SCOPE = {"type": "http", "method": "GET", "path": "/books", "query_string": b"stream=true"}
+
+
+def open_transactions(db: psycopg.Connection) -> int:
+    return db.execute(
+        "SELECT count(*) FROM pg_stat_activity "
+        "WHERE datname = current_database() AND state LIKE 'idle in transaction%'"
+    ).fetchone()[0]
+
+
+async def stream_until_disconnect(books) -> int:
+    body_sent = asyncio.Event()
+    chunks = []
+
+    async def receive():
+        await body_sent.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message["body"])
+            body_sent.set()
+            await asyncio.sleep(0.05)
+
+    await ClosingStreamingResponse(to_ndjson(books), media_type="application/x-ndjson")(SCOPE, receive, send)
+    return len(chunks)
+
+
+@pytest.mark.parametrize("service_class", [BookService, AsyncBookService])
+def test_disconnect_releases_the_stream_connection(empty_catalog: psycopg.Connection, service_class):
+    insert_books(empty_catalog, 5000)
+
+    async def main() -> int:
+        try:
+            books = service_class().stream_books(BookFilter())
+            if inspect.iscoroutine(books):
+                books = await books
+            sent = await stream_until_disconnect(books)
+            assert open_transactions(empty_catalog) == 0
+            return sent
+        finally:
+            await async_pools.close()
+
+    gc.disable()
+    try:
+        sent = asyncio.run(main())
+    finally:
+        gc.enable()
+    assert 0 < sent < 5000
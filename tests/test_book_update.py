@@ -0,0 +1,39 @@
+import asyncio
+import uuid
+
+import psycopg
+import pytest
+from fastapi import HTTPException
+
+from app.repository.async_db import async_pools
+from app.service.book import AsyncBookService, Book, BookService
+from seed import insert_books
+
+
+def book_row(db: psycopg.Connection, book_id: str):
+    return db.execute("SELECT description, version FROM catalog.book WHERE id = %s", (book_id,)).fetchone()
+
+
+async def async_update(book_id: str, book: Book) -> None:
+    try:
+        await AsyncBookService().update_book(book_id, book)
+    finally:
+        await async_pools.close()
+
+
+def test_update_changes_the_book_and_its_version(empty_catalog: psycopg.Connection):
+    book_id = insert_books(empty_catalog, 1)[0]
+    BookService().update_book(book_id, Book(description="Sync"))
+    assert book_row(empty_catalog, book_id) == ("Sync", 2)
+    asyncio.run(async_update(book_id, Book(description="Async")))
+    assert book_row(empty_catalog, book_id) == ("Async", 3)
+
+
+@pytest.mark.parametrize("book_id", [str(uuid.uuid4()), "not-a-uuid"])
+def test_update_of_missing_book_is_not_found(empty_catalog: psycopg.Connection, book_id: str):
+    insert_books(empty_catalog, 1)
+    with pytest.raises(HTTPException) as sync_error:
+        BookService().update_book(book_id, Book(description="Missing"))
+    with pytest.raises(HTTPException) as async_error:
+        asyncio.run(async_update(book_id, Book(description="Missing")))
+    assert sync_error.value.status_code == async_error.value.status_code == 404
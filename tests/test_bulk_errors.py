@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+import psycopg
+import pytest
+
+from app.service.book import AsyncBookService, Book, BookService
+from app.service.review import Review, ReviewService
+from seed import insert_books, insert_users
+
+BOOKS = [(0, Book(title="First")), (1, Book()), (2, Book(title="Third"))]
+
+
+def failing_copy(error: Exception):
+    def copy_rows(*args, **kwargs):
+        raise error
+
+    async def acopy_rows(*args, **kwargs):
+        raise error
+
+    return copy_rows, acopy_rows
+
+
+def add_books(service_class, error: Exception):
+    copy_rows, acopy_rows = failing_copy(error)
+    if service_class is BookService:
+        service = BookService()
+        service.repository.copy_rows = copy_rows
+        return service.add_books(BOOKS)
+    service = AsyncBookService()
+    service.repository.copy_rows = acopy_rows
+    return asyncio.run(service.add_books(BOOKS))
+
+
+@pytest.mark.parametrize("service_class", [BookService, AsyncBookService])
+def test_database_error_fails_the_copied_books_and_is_logged(caplog, service_class):
+    with caplog.at_level(logging.ERROR, logger="app.service.book"):
+        result = add_books(service_class, psycopg.errors.UniqueViolation("duplicate"))
+    assert result.created == 0
+    assert result.book_ids == {}
+    assert [(error.index, error.status_code) for error in result.errors] == [(0, 500), (1, 400), (2, 500)]
+    assert [record.exc_info[0] for record in caplog.records] == [psycopg.errors.UniqueViolation]
+
+
+@pytest.mark.parametrize("service_class", [BookService, AsyncBookService])
+def test_programming_error_is_not_reported_as_a_failed_write(service_class):
+    with pytest.raises(TypeError):
+        add_books(service_class, TypeError("bug"))
+
+
+def test_database_error_fails_the_copied_reviews_and_is_logged(caplog, empty_catalog: psycopg.Connection):
+    book_ids = insert_books(empty_catalog, 2)
+    user_id = insert_users(empty_catalog, 1)[0]
+    service = ReviewService()
+    service.review_repository.copy_rows = failing_copy(psycopg.errors.ForeignKeyViolation("deleted"))[0]
+    reviews = [(index, Review(book_id=book_id, rating=50, review="ok")) for index, book_id in enumerate(book_ids)]
+    with caplog.at_level(logging.ERROR, logger="app.service.review"):
+        result = service.add_reviews(user_id, reviews)
+    assert result.created == 0
+    assert [(error.index, error.status_code) for error in result.errors] == [(0, 500), (1, 500)]
+    assert [record.exc_info[0] for record in caplog.records] == [psycopg.errors.ForeignKeyViolation]
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import pytest
+
+from app.service.cache import LoadingCache
+
+
+class Loader:
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await self.release.wait()
+        return f"value-{self.calls}"
+
+
+class BlockingLoader:
+
+    def __init__(self, error: Optional[Exception] = None):
+        self.calls = 0
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self) -> str:
+        self.calls += 1
+        call = self.calls
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f"value-{call}"
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_load():
+    async def main():
+        cache = LoadingCache("test_shared_load", ttl_seconds=60)
+        loader = Loader()
+        callers = [asyncio.create_task(cache.aget("key", loader)) for _ in range(5)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        assert await asyncio.gather(*callers) == ["value-1"] * 5
+        assert await cache.aget("key", loader) == "value-1"
+        assert loader.calls == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        cache = LoadingCache("test_cancelled_leader", ttl_seconds=60)
+        loader = Loader()
+        leader = asyncio.create_task(cache.aget("key", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.aget("key", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        loader.release.set()
+        assert await follower == "value-1"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await cache.aget("key", loader) == "value-1"
+        assert loader.calls == 1
+
+    asyncio.run(main())
+
+
+def test_loader_error_reaches_every_caller():
+    async def main():
+        cache = LoadingCache("test_loader_error", ttl_seconds=60)
+        release = asyncio.Event()
+
+        async def failing_loader():
+            await release.wait()
+            raise ValueError("broken")
+
+        callers = [asyncio.create_task(cache.aget("key", failing_loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(main())
+
+
+def test_value_loaded_before_invalidation_is_not_stored():
+    async def main():
+        cache = LoadingCache("test_invalidated_load", ttl_seconds=60)
+        loader = Loader()
+        caller = asyncio.create_task(cache.aget("key", loader))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        loader.release.set()
+        assert await caller == "value-1"
+        assert await cache.aget("key", loader) == "value-2"
+
+    asyncio.run(main())
+
+
+def test_concurrent_threads_share_one_load():
+    cache = LoadingCache("test_threads_shared_load", ttl_seconds=60)
+    loader = BlockingLoader()
+    with ThreadPoolExecutor(5) as executor:
+        callers = [executor.submit(cache.get, "key", loader) for _ in range(5)]
+        wait_for(lambda: cache.stats()["misses"] == 5)
+        loader.release.set()
+        assert [caller.result() for caller in callers] == ["value-1"] * 5
+    assert cache.get("key", loader) == "value-1"
+    assert loader.calls == 1
+
+
+def test_loader_error_reaches_every_waiting_thread():
+    cache = LoadingCache("test_threads_loader_error", ttl_seconds=60)
+    loader = BlockingLoader(ValueError("broken"))
+    with ThreadPoolExecutor(3) as executor:
+        callers = [executor.submit(cache.get, "key", loader) for _ in range(3)]
+        wait_for(lambda: cache.stats()["misses"] == 3)
+        loader.release.set()
+        assert all(isinstance(caller.exception(), ValueError) for caller in callers)
+    assert loader.calls == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_value_loaded_by_a_thread_before_invalidation_is_not_stored():
+    cache = LoadingCache("test_threads_invalidated_load", ttl_seconds=60)
+    loader = BlockingLoader()
+    with ThreadPoolExecutor(1) as executor:
+        caller = executor.submit(cache.get, "key", loader)
+        assert loader.started.wait(5)
+        cache.invalidate()
+        loader.release.set()
+        assert caller.result() == "value-1"
+    assert cache.get("key", loader) == "value-2"
+    assert cache.get("key", loader) == "value-2"
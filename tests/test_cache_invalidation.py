@@ -0,0 +1,150 @@
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Iterator, List, Tuple
+
+import psycopg
+import pytest
+
+from app.service.hashing import hash_password
+from seed import insert_books, insert_reviews, insert_users
+
+WORKERS = 3
+USERNAME = "worker_user"
+PASSWORD = "worker-password"
+REPLY_TIMEOUT_SECONDS = 30
+PROPAGATION_TIMEOUT_SECONDS = 5
+EMPTY_STATEMENT_COLUMNS = (
+    ("book", "title"), ("book_review", "rating"), ("book_rating", "book_id"), ("book_similarity_index", "payload")
+)
+
+
+def worker(conn: Connection) -> None:
+    import httpx
+
+    from app.main import app
+    from app.repository.notifications import listener_connects
+    from app.service.invalidation import INVALIDATION_CHANNEL
+
+    async def serve() -> None:
+        async with app.router.lifespan_context(app):
+            while not listener_connects.value(channel=INVALIDATION_CHANNEL):
+                await asyncio.sleep(0.05)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                conn.send("ready")
+                loop = asyncio.get_running_loop()
+                while True:
+                    command = await loop.run_in_executor(None, conn.recv)
+                    if command is None:
+                        return
+                    method, url, kwargs = command
+                    response = await client.request(method, url, **kwargs)
+                    conn.send((response.status_code, response.json() if response.content else None))
+
+    asyncio.run(serve())
+
+
+def call(conn: Connection, method: str, url: str, **kwargs: Any) -> Tuple[int, Any]:
+    conn.send((method, url, kwargs))
+    assert conn.poll(REPLY_TIMEOUT_SECONDS)
+    return conn.recv()
+
+
+def wait_until(condition: Callable[[], bool]) -> bool:
+    deadline = time.monotonic() + PROPAGATION_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return condition()
+
+
+def cache_sizes(workers: List[Connection]) -> List[int]:
+    return [call(conn, "GET", "/recommendations/cache")[1]["size"] for conn in workers]
+
+
+def prime_recommendations(workers: List[Connection]) -> None:
+    for conn in workers:
+        assert call(conn, "GET", "/recommendations", params={"limit": 3})[0] == 200
+    assert cache_sizes(workers) == [1] * len(workers)
+
+
+def authenticate(conn: Connection) -> int:
+    return call(conn, "POST", "/auth", data={"username": USERNAME, "password": PASSWORD})[0]
+
+
+@pytest.fixture
+def catalog(empty_catalog: psycopg.Connection) -> List[str]:
+    book_ids = insert_books(empty_catalog, 5)
+    user_ids = insert_users(empty_catalog, 3)
+    insert_reviews(empty_catalog, [(book_id, user_id, 50) for book_id in book_ids for user_id in user_ids])
+    empty_catalog.execute(
+        "INSERT INTO users.identity (id, username, secret_hash) VALUES (%s, %s, %s)",
+        (uuid.uuid4(), USERNAME, hash_password(PASSWORD))
+    )
+    return book_ids
+
+
+@pytest.fixture
+def workers(monkeypatch: pytest.MonkeyPatch, catalog: List[str]) -> Iterator[List[Connection]]:
+    monkeypatch.setenv("CACHE_INVALIDATION", "true")
+    context = multiprocessing.get_context("spawn")
+    pipes, processes = [], []
+    try:
+        for _ in range(WORKERS):
+            parent, child = context.Pipe()
+            process = context.Process(target=worker, args=(child,), daemon=True)
+            process.start()
+            pipes.append(parent)
+            processes.append(process)
+        for conn in pipes:
+            assert conn.poll(REPLY_TIMEOUT_SECONDS)
+            assert conn.recv() == "ready"
+        yield pipes
+    finally:
+        for conn, process in zip(pipes, processes):
+            if process.is_alive():
+                conn.send(None)
+            process.join(REPLY_TIMEOUT_SECONDS)
+            if process.is_alive():
+                process.kill()
+
+
+def test_statements_without_changed_rows_send_no_notification(database, catalog):
+    with psycopg.connect(database, autocommit=True) as listener, psycopg.connect(database, autocommit=True) as db:
+        listener.execute("LISTEN cache_invalidation")
+        for table, column in EMPTY_STATEMENT_COLUMNS:
+            db.execute(f"UPDATE catalog.{table} SET {column} = {column} WHERE false")
+            db.execute(f"DELETE FROM catalog.{table} WHERE false")
+        assert [notify.payload for notify in listener.notifies(timeout=0.5)] == []
+        db.execute("UPDATE catalog.book SET description = 'Changed' WHERE id = %s", (catalog[0],))
+        payloads = [json.loads(notify.payload) for notify in listener.notifies(timeout=0.5)]
+    assert payloads == [{"cache": "recommendations"}]
+
+
+def test_book_write_on_one_worker_invalidates_the_others(workers, catalog):
+    prime_recommendations(workers)
+    status, _ = call(workers[0], "PATCH", f"/books/{catalog[0]}", json={"description": "Changed"})
+    assert status == 204
+    assert wait_until(lambda: cache_sizes(workers) == [0] * WORKERS)
+
+
+def test_direct_password_change_reaches_every_worker(database, workers):
+    assert [authenticate(conn) for conn in workers] == [200] * WORKERS
+    with psycopg.connect(database, autocommit=True) as db:
+        db.execute(
+            "UPDATE users.identity SET secret_hash = %s WHERE username = %s",
+            (hash_password("changed-password"), USERNAME)
+        )
+    assert wait_until(lambda: [authenticate(conn) for conn in workers] == [401] * WORKERS)
+
+
+def test_statement_without_changed_rows_keeps_worker_caches(database, workers):
+    prime_recommendations(workers)
+    with psycopg.connect(database, autocommit=True) as db:
+        db.execute("UPDATE catalog.book SET description = 'Missing' WHERE id = %s", (uuid.uuid4(),))
+    time.sleep(1.5)
+    assert cache_sizes(workers) == [1] * WORKERS
@@ -0,0 +1,41 @@
+import uuid
+
+import psycopg
+
+from app.repository.book import BookRepository
+from seed import insert_books
+
+
+def catalog_version() -> int:
+    return BookRepository().find_catalog_version()["version"]
+
+
+def test_statements_without_changed_rows_keep_the_version(empty_catalog: psycopg.Connection):
+    insert_books(empty_catalog, 3)
+    version = catalog_version()
+    missing = uuid.uuid4()
+    empty_catalog.execute("UPDATE catalog.book SET title = 'Missing' WHERE id = %s", (missing,))
+    empty_catalog.execute("DELETE FROM catalog.book WHERE id = %s", (missing,))
+    empty_catalog.execute("INSERT INTO catalog.book (id, title) SELECT %s, 'Missing' WHERE false", (missing,))
+    assert catalog_version() == version
+
+
+def test_each_changing_statement_bumps_the_version(empty_catalog: psycopg.Connection):
+    book_ids = insert_books(empty_catalog, 3)
+    version = catalog_version()
+    empty_catalog.execute("UPDATE catalog.book SET title = 'Renamed' WHERE id = %s", (book_ids[0],))
+    assert catalog_version() == version + 1
+    empty_catalog.execute("DELETE FROM catalog.book WHERE id = ANY(%s)", (book_ids[1:],))
+    assert catalog_version() == version + 2
+    empty_catalog.execute("TRUNCATE catalog.book CASCADE")
+    assert catalog_version() == version + 3
+
+
+def test_uncommitted_write_is_not_visible_in_the_version(database: str, empty_catalog: psycopg.Connection):
+    book_id = insert_books(empty_catalog, 1)[0]
+    version = catalog_version()
+    with psycopg.connect(database) as writer:
+        writer.execute("UPDATE catalog.book SET title = 'Uncommitted' WHERE id = %s", (book_id,))
+        assert catalog_version() == version
+        writer.commit()
+    assert catalog_version() == version + 1
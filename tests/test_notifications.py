@@ -0,0 +1,35 @@
+import threading
+from typing import List
+
+import psycopg
+
+from app.repository.notifications import NotificationListener, listener_connects, listener_handler_errors
+
+CHANNEL = "test_listener"
+WAIT_SECONDS = 5
+
+
+def test_handler_error_does_not_stop_the_listener(db: psycopg.Connection):
+    received: List[str] = []
+    delivered = threading.Event()
+
+    def handler(payload: str) -> None:
+        if payload == "fail":
+            raise RuntimeError("handler failed")
+        received.append(payload)
+        delivered.set()
+
+    listener = NotificationListener(CHANNEL, handler, lambda: None)
+    connects = listener_connects.value(channel=CHANNEL)
+    listener.start()
+    try:
+        while listener_connects.value(channel=CHANNEL) == connects:
+            threading.Event().wait(0.05)
+        db.execute("SELECT pg_notify(%s, 'fail')", (CHANNEL,))
+        db.execute("SELECT pg_notify(%s, 'ok')", (CHANNEL,))
+        assert delivered.wait(WAIT_SECONDS)
+        assert received == ["ok"]
+        assert listener_handler_errors.value(channel=CHANNEL) == 1
+        assert listener_connects.value(channel=CHANNEL) == connects + 1
+    finally:
+        listener.stop()
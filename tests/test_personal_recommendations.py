@@ -0,0 +1,121 @@
+import asyncio
+import random
+import uuid
+from typing import List, Tuple
+
+import psycopg
+import pytest
+
+from app.repository.async_db import async_pools
+from app.service.periodic import PeriodicTask
+from app.service.review import SIMILARITY_INDEX_KEY, AsyncReviewService, ReviewService
+from seed import insert_books, insert_reviews, insert_users
+
+
+@pytest.fixture
+def reader_catalog(empty_catalog: psycopg.Connection) -> Tuple[str, List[str]]:
+    rng = random.Random(25)
+    book_ids = insert_books(empty_catalog, 20)
+    user_ids = insert_users(empty_catalog, 31)
+    reviews = [
+        (book_id, user_id, rng.randint(0, 100))
+        for user_id in user_ids[1:]
+        for book_id in rng.sample(book_ids, 10)
+    ]
+    insert_reviews(empty_catalog, reviews)
+    rated = ranked_book_ids(ReviewService())[:3]
+    insert_reviews(empty_catalog, [(book_id, user_ids[0], 90) for book_id in rated])
+    return user_ids[0], rated
+
+
+def ranked_book_ids(service: ReviewService) -> List[str]:
+    return [str(row["id"]) for row in service.review_repository.find_top_rated_books(100, service._weighting())]
+
+
+def personal_ids(user_id: str, limit: int) -> List[str]:
+    return [str(book["id"]) for book in ReviewService().get_personal_recommendations(user_id, limit)]
+
+
+async def async_personal_ids(user_id: str, limit: int) -> List[str]:
+    try:
+        return [str(book["id"]) for book in await AsyncReviewService().get_personal_recommendations(user_id, limit)]
+    finally:
+        await async_pools.close()
+
+
+def expected_fallback(chosen: List[str], rated: List[str], limit: int) -> List[str]:
+    excluded = set(chosen) | set(rated)
+    unrated = [book_id for book_id in ranked_book_ids(ReviewService()) if book_id not in excluded]
+    return chosen + unrated[:limit - len(chosen)]
+
+
+def test_fallback_picks_highest_ranked_unrated_books(reader_catalog):
+    reader, rated = reader_catalog
+    expected = expected_fallback([], rated, 5)
+    assert personal_ids(reader, 5) == expected
+    assert asyncio.run(async_personal_ids(reader, 5)) == expected
+
+
+def test_similar_books_come_first_and_fallback_fills_in_rank_order(reader_catalog):
+    reader, rated = reader_catalog
+    service = ReviewService()
+    assert service.rebuild_similarity_index()
+    index = service.similarity_cache.get(SIMILARITY_INDEX_KEY, service._load_similarity_index)
+    similar = index.recommend([(uuid.UUID(book_id), 90) for book_id in rated], 15)
+    assert similar
+    expected = expected_fallback(similar, rated, 15)
+    assert personal_ids(reader, 15) == expected
+    assert asyncio.run(async_personal_ids(reader, 15)) == expected
+
+
+def test_periodic_task_waits_one_interval_before_first_run():
+    runs = []
+
+    async def run() -> bool:
+        runs.append(asyncio.get_running_loop().time())
+        return True
+
+    async def main() -> float:
+        task = PeriodicTask("test", 0.2, run)
+        started_at = asyncio.get_running_loop().time()
+        task.start()
+        await asyncio.sleep(0.1)
+        assert runs == []
+        await asyncio.sleep(0.2)
+        await task.stop()
+        return started_at
+
+    started_at = asyncio.run(main())
+    assert len(runs) == 1
+    assert runs[0] - started_at >= 0.2
+
+
+def test_rating_changes_make_the_index_stale(reader_catalog, empty_catalog: psycopg.Connection):
+    service = ReviewService()
+    assert service.rebuild_similarity_index()
+    assert not service.refresh_similarity_index()
+    empty_catalog.execute(
+        "UPDATE catalog.book_review SET rating = 100 - rating "
+        "WHERE ctid IN (SELECT ctid FROM catalog.book_review ORDER BY user_id, book_id LIMIT 40)"
+    )
+    assert service.refresh_similarity_index()
+    assert not service.refresh_similarity_index()
+
+
+def test_index_is_built_outside_the_transaction(reader_catalog, empty_catalog: psycopg.Connection):
+    service = ReviewService()
+    build = service._build_similarity_index
+    observed = []
+
+    def checked_build(rows):
+        observed.append(empty_catalog.execute(
+            "SELECT count(*) FILTER (WHERE state LIKE 'idle in transaction%%'), "
+            "(SELECT count(*) FROM pg_locks WHERE locktype = 'advisory') "
+            "FROM pg_stat_activity WHERE datname = current_database()"
+        ).fetchone())
+        return build(rows)
+
+    service._build_similarity_index = checked_build
+    assert service.rebuild_similarity_index()
+    assert observed == [(0, 0)]
+    assert empty_catalog.execute("SELECT review_changes > 0 FROM catalog.book_similarity_index").fetchone() == (True,)
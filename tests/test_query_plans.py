@@ -0,0 +1,76 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+import psycopg
+import pytest
+
+from app.repository.book import BookRepository
+from app.repository.review import ReviewRepository
+from seed import insert_books, insert_reviews, insert_users
+
+INDEX_SCANS = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+@pytest.fixture
+def catalog(empty_catalog: psycopg.Connection) -> Tuple[psycopg.Connection, List[str], List[str]]:
+    book_ids = insert_books(empty_catalog, 50)
+    user_ids = insert_users(empty_catalog, 100)
+    insert_reviews(empty_catalog, [
+        (book_id, user_id, (n * 7) % 101)
+        for n, (book_id, user_id) in enumerate((b, u) for b in book_ids for u in user_ids)
+    ])
+    empty_catalog.execute("ANALYZE catalog.book")
+    empty_catalog.execute("ANALYZE catalog.book_review")
+    return empty_catalog, book_ids, user_ids
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+def explain(db: psycopg.Connection, query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with db.transaction():
+        db.execute("SET LOCAL enable_seqscan = off")
+        plan = db.execute("EXPLAIN (FORMAT JSON) " + query, params).fetchone()[0][0]["Plan"]
+    return list(plan_nodes(plan))
+
+
+def assert_index_scan(nodes: List[Dict[str, Any]], table: str, *columns: str) -> None:
+    assert not [node for node in nodes if node["Node Type"] == "Seq Scan" and node["Relation Name"] == table]
+    conditions = [node.get("Index Cond", "") for node in nodes if node["Node Type"] in INDEX_SCANS]
+    assert any(all(f"{column} = " in condition for column in columns) for condition in conditions), conditions
+
+
+def test_find_by_user_id_uses_index(catalog):
+    db, _, user_ids = catalog
+    query = ReviewRepository().build_find_by_user_id_query(("book_id", "rating"))
+    assert_index_scan(explain(db, query, {"user_id": user_ids[0]}), "book_review", "user_id")
+
+
+def test_find_by_user_id_and_book_id_uses_index(catalog):
+    db, book_ids, user_ids = catalog
+    query = ReviewRepository().build_find_by_user_id_and_book_id_query(None)
+    params = {"user_id": user_ids[0], "book_id": book_ids[0]}
+    assert_index_scan(explain(db, query, params), "book_review", "user_id", "book_id")
+
+
+def test_update_by_user_id_and_book_id_uses_index(catalog):
+    db, book_ids, user_ids = catalog
+    query = ReviewRepository().build_update_by_user_id_and_book_id_query(("rating",))
+    params = {"user_id": user_ids[0], "book_id": book_ids[0], "rating": 10}
+    assert_index_scan(explain(db, query, params), "book_review", "user_id", "book_id")
+
+
+def test_delete_by_user_id_and_book_id_uses_index(catalog):
+    db, book_ids, user_ids = catalog
+    query = ReviewRepository().build_delete_by_user_id_and_book_id_query()
+    params = {"user_id": user_ids[0], "book_id": book_ids[0]}
+    assert_index_scan(explain(db, query, params), "book_review", "user_id", "book_id")
+
+
+def test_find_by_title_uses_index(catalog):
+    db, _, _ = catalog
+    query = BookRepository().build_find_by_title_query(None, True)
+    params = {"title": "Book 1", "limit": 10, "after": "00000000-0000-0000-0000-000000000000"}
+    assert_index_scan(explain(db, query, params), "book", "title")
@@ -0,0 +1,100 @@
+import asyncio
+from typing import List, Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.middleware import ReadYourWritesMiddleware
+from app.repository import topology
+from app.repository.topology import (
+    READ_YOUR_WRITES_COOKIE, WriteMarker, build_write_cookie, parse_write_cookie, primary_reads_required,
+    read_your_writes, record_write
+)
+from app.service.cache import LoadingCache
+
+
+def sync_write() -> None:
+    record_write()
+
+
+def sync_read() -> bool:
+    with read_your_writes():
+        return primary_reads_required()
+
+
+async def write(request: Request) -> JSONResponse:
+    await run_in_threadpool(sync_write)
+    return JSONResponse({"primary": await run_in_threadpool(sync_read)})
+
+
+async def read(request: Request) -> JSONResponse:
+    return JSONResponse({"primary": await run_in_threadpool(sync_read)})
+
+
+def build_worker() -> ReadYourWritesMiddleware:
+    return ReadYourWritesMiddleware(Starlette(routes=[Route("/write", write, methods=["POST"]), Route("/read", read)]))
+
+
+async def request(worker: ReadYourWritesMiddleware, method: str, url: str, cookie: Optional[str] = None):
+    cookies = {READ_YOUR_WRITES_COOKIE: cookie} if cookie else None
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=worker), base_url="http://test") as client:
+        return await client.request(method, url, cookies=cookies)
+
+
+def test_signed_cookie_round_trips_and_rejects_tampering():
+    marker = WriteMarker(1000.5)
+    cookie = build_write_cookie(marker)
+    assert parse_write_cookie(cookie) == 1000.5
+    assert parse_write_cookie(cookie.replace("1000.500", "9999.500")) == 0
+    assert parse_write_cookie("garbage") == 0
+    assert parse_write_cookie(None) == 0
+
+
+def test_write_on_one_worker_sends_reads_on_another_to_the_primary():
+    async def main():
+        written = await request(build_worker(), "POST", "/write")
+        assert written.json() == {"primary": True}
+        cookie = written.cookies[READ_YOUR_WRITES_COOKIE]
+        other_worker = build_worker()
+        with_marker = await request(other_worker, "GET", "/read", cookie)
+        without_marker = await request(other_worker, "GET", "/read")
+        return with_marker.json(), without_marker.json(), with_marker.headers.get("set-cookie")
+
+    with_marker, without_marker, set_cookie = asyncio.run(main())
+    assert with_marker == {"primary": True}
+    assert without_marker == {"primary": False}
+    assert set_cookie is None
+
+
+def test_expired_marker_reads_from_the_replica(monkeypatch):
+    monkeypatch.setattr(topology, "READ_YOUR_WRITES_SECONDS", -1)
+
+    async def main():
+        written = await request(build_worker(), "POST", "/write")
+        return await request(build_worker(), "GET", "/read", written.cookies[READ_YOUR_WRITES_COOKIE])
+
+    assert asyncio.run(main()).json() == {"primary": False}
+
+
+def test_cache_fills_after_invalidation_read_from_the_primary():
+    cache = LoadingCache("test_primary_fill", ttl_seconds=60)
+    assert cache.get("key", primary_reads_required) is False
+    cache.invalidate()
+    assert cache.get("key", primary_reads_required) is True
+
+
+def test_async_cache_fills_after_invalidation_read_from_the_primary():
+    async def load() -> bool:
+        return primary_reads_required()
+
+    async def main() -> List[bool]:
+        cache = LoadingCache("test_async_primary_fill", ttl_seconds=60)
+        before = await cache.aget("key", load)
+        cache.invalidate()
+        return [before, await cache.aget("key", load)]
+
+    assert asyncio.run(main()) == [False, True]
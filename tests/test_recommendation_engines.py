@@ -0,0 +1,84 @@
+import asyncio
+import random
+from typing import List
+
+import httpx
+import psycopg
+import pytest
+
+import app.service.review as review_service
+from app.main import app
+from app.repository.async_db import async_pools
+from app.service.cache import invalidate_all_caches
+from app.service.review import MAX_RECOMMENDATIONS_NUM, AsyncReviewService, ReviewService
+from seed import insert_books, insert_reviews, insert_users
+
+ENGINES = ("python", "numpy", "sql")
+
+
+@pytest.fixture
+def ranked_catalog(empty_catalog: psycopg.Connection) -> List[str]:
+    rng = random.Random(12)
+    user_ids = insert_users(empty_catalog, 20)
+    book_ids = insert_books(empty_catalog, 60)
+    reviews = []
+    for book_id in book_ids:
+        for user_id in rng.sample(user_ids, rng.randint(1, 12)):
+            reviews.append((book_id, user_id, rng.choice((10, 20, 25, 30, 39))))
+    spread, low, high = insert_books(empty_catalog, 3, "Even")
+    for book_id, ratings in ((spread, (0, 100)), (low, (49, 49)), (high, (51, 51))):
+        reviews.extend((book_id, user_id, rating) for user_id, rating in zip(user_ids, ratings))
+    insert_reviews(empty_catalog, reviews)
+    return [high, spread, low]
+
+
+def service_recommendations(limit: int) -> List[str]:
+    return [str(book["id"]) for book in ReviewService()._compute_recommendations(limit)]
+
+
+async def async_service_recommendations(limit: int) -> List[str]:
+    try:
+        return [str(book["id"]) for book in await AsyncReviewService()._compute_recommendations(limit)]
+    finally:
+        await async_pools.close()
+
+
+async def api_recommendations(limit: int) -> List[str]:
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/recommendations", params={"limit": limit})
+    assert response.status_code == 200
+    return [book["id"] for book in response.json()]
+
+
+def engine_results(monkeypatch: pytest.MonkeyPatch, engine: str, limit: int) -> List[List[str]]:
+    monkeypatch.setattr(review_service, "RECOMMENDATION_ENGINE", engine)
+    invalidate_all_caches()
+    return [
+        service_recommendations(limit),
+        asyncio.run(async_service_recommendations(limit)),
+        asyncio.run(api_recommendations(limit))
+    ]
+
+
+@pytest.mark.parametrize("limit", [3, 10, MAX_RECOMMENDATIONS_NUM])
+def test_engines_rank_identically(monkeypatch, ranked_catalog, limit):
+    expected = engine_results(monkeypatch, "sql", limit)[0]
+    assert len(expected) == min(limit, 63)
+    for engine in ENGINES:
+        for ids in engine_results(monkeypatch, engine, limit):
+            assert ids == expected, engine
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_even_review_count_median_averages_middle_ratings(monkeypatch, ranked_catalog, engine):
+    for ids in engine_results(monkeypatch, engine, 5):
+        assert ids[:3] == ranked_catalog
+
+
+@pytest.mark.parametrize("engine", ("python", "numpy"))
+def test_ranked_ids_match_sql_query(monkeypatch, ranked_catalog, engine):
+    monkeypatch.setattr(review_service, "RECOMMENDATION_ENGINE", engine)
+    service = ReviewService()
+    sql_ids = [str(row["id"]) for row in service.review_repository.find_top_rated_books(20, service._weighting())]
+    assert [str(book_id) for book_id in service.top_rated_books(20)] == sql_ids
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Callable, List
+
+import psycopg
+import pytest
+from fastapi import HTTPException
+
+from app.service.review import Review, ReviewService
+from seed import insert_books, insert_reviews, insert_users
+
+
+@pytest.fixture
+def review(empty_catalog: psycopg.Connection):
+    book_id = insert_books(empty_catalog, 1)[0]
+    user_id = insert_users(empty_catalog, 1)[0]
+    insert_reviews(empty_catalog, [(book_id, user_id, 50)])
+    return user_id, book_id
+
+
+def wait_for_lock(db: psycopg.Connection) -> None:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        waiting = db.execute(
+            "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND wait_event_type = 'Lock'"
+        ).fetchone()[0]
+        if waiting:
+            return
+        time.sleep(0.05)
+    raise AssertionError("update did not wait for the concurrent transaction")
+
+
+def update_behind(database: str, db: psycopg.Connection, statements, update: Callable[[], None]):
+    errors: List[BaseException] = []
+
+    def run() -> None:
+        try:
+            update()
+        except BaseException as e:
+            errors.append(e)
+
+    with psycopg.connect(database) as concurrent:
+        for statement, params in statements:
+            concurrent.execute(statement, params)
+        thread = threading.Thread(target=run)
+        thread.start()
+        wait_for_lock(db)
+        concurrent.commit()
+    thread.join()
+    return errors
+
+
+def histogram(db: psycopg.Connection, book_id: str):
+    return db.execute("SELECT histogram FROM catalog.book_rating WHERE book_id = %s", (book_id,)).fetchone()[0]
+
+
+def test_update_after_concurrent_change_adjusts_rating(database, empty_catalog, review):
+    user_id, book_id = review
+    errors = update_behind(
+        database, empty_catalog,
+        [
+            ("UPDATE catalog.book_review SET rating = 70 WHERE user_id = %s AND book_id = %s", review),
+            (
+                "UPDATE catalog.book_rating SET histogram[51] = histogram[51] - 1, histogram[71] = histogram[71] + 1 "
+                "WHERE book_id = %s", (book_id,)
+            )
+        ],
+        lambda: ReviewService().update_review(user_id, book_id, Review(rating=90))
+    )
+    assert errors == []
+    assert empty_catalog.execute(
+        "SELECT rating FROM catalog.book_review WHERE user_id = %s AND book_id = %s", review
+    ).fetchone() == (90,)
+    maintained = histogram(empty_catalog, book_id)
+    ReviewService().rebuild_rating_aggregates()
+    assert maintained == histogram(empty_catalog, book_id)
+
+
+def test_update_of_concurrently_deleted_review_is_not_found(database, empty_catalog, review):
+    user_id, book_id = review
+    errors = update_behind(
+        database, empty_catalog,
+        [("DELETE FROM catalog.book_review WHERE user_id = %s AND book_id = %s", review)],
+        lambda: ReviewService().update_review(user_id, book_id, Review(rating=90))
+    )
+    assert len(errors) == 1
+    assert isinstance(errors[0], HTTPException) and errors[0].status_code == 404
@@ -0,0 +1,41 @@
+import asyncio
+
+import psycopg
+
+from app.repository.async_db import async_pools
+from app.service.review import AsyncReviewService, Review, ReviewService
+from seed import insert_books, insert_users
+
+
+async def async_add_review(user_id: str, review: Review) -> None:
+    try:
+        await AsyncReviewService().add_review(user_id, review)
+    finally:
+        await async_pools.close()
+
+
+def review_texts(db: psycopg.Connection, user_id: str):
+    return db.execute(
+        "SELECT book_id::text, review FROM catalog.book_review WHERE user_id = %s", (user_id,)
+    ).fetchall()
+
+
+def test_review_without_text_is_created(empty_catalog: psycopg.Connection):
+    book_ids = insert_books(empty_catalog, 2)
+    user_id = insert_users(empty_catalog, 1)[0]
+    ReviewService().add_review(user_id, Review(book_id=book_ids[0], rating=70))
+    asyncio.run(async_add_review(user_id, Review(book_id=book_ids[1], rating=80)))
+    assert sorted(review_texts(empty_catalog, user_id)) == sorted((book_id, None) for book_id in book_ids)
+
+
+def test_bulk_reviews_report_invalid_rows_and_write_the_rest(empty_catalog: psycopg.Connection):
+    book_ids = insert_books(empty_catalog, 3)
+    user_id = insert_users(empty_catalog, 1)[0]
+    result = ReviewService().add_reviews(user_id, [
+        (0, Review(book_id=book_ids[0], rating=50)),
+        (1, Review(book_id=book_ids[1], rating=50, review="x" * 501)),
+        (2, Review(book_id=book_ids[2], rating=50, review="fine"))
+    ])
+    assert result.created == 2
+    assert [(error.index, error.status_code) for error in result.errors] == [(1, 400)]
+    assert sorted(review_texts(empty_catalog, user_id)) == sorted([(book_ids[0], None), (book_ids[2], "fine")])
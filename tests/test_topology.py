@@ -0,0 +1,16 @@
+import pytest
+
+from app.repository.topology import worker_pool_max_size
+
+
+def test_pool_budget_is_split_across_worker_pools():
+    assert worker_pool_max_size(10, 0, 4, True, 2) == 10
+    assert worker_pool_max_size(10, 40, 4, False) == 10
+    assert worker_pool_max_size(10, 40, 4, True) == 9
+    assert worker_pool_max_size(10, 40, 4, True, 2) == 4
+    assert 4 * (2 * worker_pool_max_size(100, 40, 4, True, 2) + 1) <= 40
+
+
+def test_budget_without_a_connection_per_pool_is_rejected():
+    with pytest.raises(ValueError):
+        worker_pool_max_size(10, 8, 4, True, 2)